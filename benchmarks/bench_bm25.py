@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la recherche BM25 (listes inversées + MaxScore) sur de gros index synthétiques.
+
+Pour chaque taille d'index (même génération que bench_recherche.py : termes
+tirés selon une loi de Zipf) et chaque nombre de termes par question, compare :
+  - tfidf : IndexIncremental.rechercher_tfidf (produit creux par la transposée) ;
+  - bm25 complet : toutes les listes des termes de la question sont lues en
+    entier (pas d'élagage), puis sélection des k meilleurs ;
+  - bm25 MaxScore : IndexIncremental.rechercher_bm25 ;
+  - hybride : BM25 + TF-IDF (config.HYBRID_METHODS = bm25,tfidf).
+Les scores des k meilleurs de MaxScore sont vérifiés identiques à ceux de la lecture complète.
+La dernière colonne donne le nombre moyen de chunks candidats gardés par
+MaxScore, comparé au nombre de couples (terme, chunk) des listes de la question.
+
+Usage : python benchmarks/bench_bm25.py [--tailles 10000 100000 1000000] [--termes 2 4 8 16] [--k 10]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from bench_recherche import construire_index, vocabulaire
+
+import config
+from indexation import meilleurs_scores
+
+
+def questions(mots, nb, nb_termes, rng):
+    # mots fréquents et rares mélangés, comme une vraie question (mots outils + termes précis)
+    return [" ".join(rng.choice(mots[:5000], size=nb_termes)) for _ in range(nb)]
+
+
+def bm25_complet(index, question, k):
+    postings = index.postings_bm25()
+    requete = index.vectorizer.transform([question]).tocsr()
+    termes, poids, _, total = postings._termes(requete.indices, requete.data)
+    cumul = np.zeros(postings.nb_chunks)
+    for terme, p in zip(termes, poids):
+        debut, fin = postings.indptr[terme], postings.indptr[terme + 1]
+        cumul[postings.indices[debut:fin]] += p * postings.impacts[debut:fin]
+    candidats = np.flatnonzero(cumul)
+    _, scores = meilleurs_scores(candidats, cumul[candidats] / max(total, 1e-12), k, 0.0)
+    return scores
+
+
+def chronometrer(fonction, qs):
+    durees = []
+    for q in qs:
+        debut = time.perf_counter()
+        fonction(q)
+        durees.append(time.perf_counter() - debut)
+    durees = np.array(durees) * 1000
+    return np.percentile(durees, 50), np.percentile(durees, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--termes", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--nnz-par-chunk", type=int, default=40)
+    parser.add_argument("--vocabulaire", type=int, default=50_000)
+    args = parser.parse_args()
+
+    config.HYBRID_METHODS = ["bm25", "tfidf"]
+    rng = np.random.default_rng(0)
+    mots = vocabulaire(args.vocabulaire)
+    k = args.k
+    print(f"{'chunks':>9} | {'termes':>6} | {'tfidf p50/p99':>15} | {'bm25 complet':>15} | {'bm25 MaxScore':>15} | "
+          f"{'hybride':>15} | {'candidats / postings':>20}")
+    print("-" * 112)
+    for taille in args.tailles:
+        index = construire_index(taille, mots, args.nnz_par_chunk, rng)
+        debut = time.perf_counter()
+        postings = index.postings_bm25()
+        construction = time.perf_counter() - debut
+        for nb_termes in args.termes:
+            qs = questions(mots, args.questions, nb_termes, rng)
+            candidats, lus = [], []
+            for q in qs:
+                # comparaison des scores (à score égal, argpartition peut retenir d'autres chunks)
+                maxscore = [score for _, score in index.rechercher_bm25([q], k)[0]]
+                assert np.allclose(maxscore, bm25_complet(index, q, k)), q
+                requete = index.vectorizer.transform([q]).tocsr()
+                candidats.append(len(postings.candidats(requete.indices, requete.data, k)[0]))
+                lus.append(sum(postings.indptr[t + 1] - postings.indptr[t] for t in requete.indices))
+            mesures = [
+                chronometrer(lambda q: index.rechercher_tfidf([q], k), qs),
+                chronometrer(lambda q: bm25_complet(index, q, k), qs),
+                chronometrer(lambda q: index.rechercher_bm25([q], k), qs),
+                chronometrer(lambda q: index.rechercher_hybride([q], k), qs),
+            ]
+            colonnes = " | ".join(f"{p50:>6.2f} / {p99:>6.2f}" for p50, p99 in mesures)
+            print(f"{taille:>9} | {nb_termes:>6} | {colonnes} | {np.mean(candidats):>9.0f} / {np.mean(lus):>8.0f}")
+        print(f"  (listes BM25 : {postings.octets() / 2**20:.1f} Mo, construites en {construction:.2f} s)")
+        del index, postings
+
+
+if __name__ == "__main__":
+    sys.exit(main())
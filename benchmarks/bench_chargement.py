@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du temps de chargement des documents dans le chatbot.
+
+Compare, pour 1, 100 et 1000 documents :
+  - l'ancien chemin : re-découpage de tout le corpus et fit_transform complet
+    d'un TfidfVectorizer à chaque document ajouté (coût quadratique) ;
+  - le chemin actuel : Chatbot.ajouter_contenu avec l'index incrémental, les
+    poids IDF étant recalculés selon config.IDF_REFRESH_DRIFT ;
+  - le même chemin avec les poids recalculés sur tout l'index à chaque ajout
+    (IDF_REFRESH_DRIFT = 0).
+
+Usage : python benchmarks/bench_chargement.py [--tailles 1 100 1000] [--max-ancien 100]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from corpus_synthetique import corpus
+
+import config
+from chatbotcol import Chatbot
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+def creer_bot(dossier):
+    """Instancie un Chatbot isolé (pas de documents, stats dans un dossier temporaire)."""
+    config.DATA_DIR = os.path.join(dossier, "data")
+    config.STATS_FILE = os.path.join(dossier, "stats.json")
+    # index vide pour chaque mesure (instantané dans un nouveau dossier)
+    config.INDEX_DIR = tempfile.mkdtemp(dir=dossier)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Chatbot()
+
+
+def charger_ancien(bot, documents):
+    """Reproduit l'ancien ajouter_contenu : tout est re-découpé et ré-entraîné à chaque ajout."""
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+    contenu = ""
+    debut = time.perf_counter()
+    for _, texte in documents:
+        contenu += "\n" + texte
+        chunks = bot.decouper_chunks(contenu)
+        vectorizer.fit_transform(chunks)
+    return time.perf_counter() - debut
+
+
+def charger_incremental(bot, documents):
+    """Chemin actuel, y compris le premier recalcul paresseux de la matrice."""
+    debut = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for nom, texte in documents:
+            bot.ajouter_contenu(texte, nom)
+    bot.index.matrice()
+    return time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--max-ancien", type=int, default=300,
+                        help="au-delà de ce nombre de documents, l'ancien chemin n'est pas mesuré")
+    args = parser.parse_args()
+
+    print(f"{'documents':>10} | {'ancien (s)':>12} | {'incrémental (s)':>16} | {'gain':>8} | "
+          f"{'IDF à chaque ajout (s)':>22}")
+    print("-" * 83)
+    derive = config.IDF_REFRESH_DRIFT
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in args.tailles:
+            documents = corpus(taille)
+            config.IDF_REFRESH_DRIFT = derive
+            t_incr = charger_incremental(creer_bot(dossier), documents)
+            config.IDF_REFRESH_DRIFT = 0.0
+            t_complet = charger_incremental(creer_bot(dossier), documents)
+            config.IDF_REFRESH_DRIFT = derive
+            if taille <= args.max_ancien:
+                t_ancien = charger_ancien(creer_bot(dossier), documents)
+                gain = f"x{t_ancien / t_incr:.1f}"
+                t_ancien = f"{t_ancien:.3f}"
+            else:
+                t_ancien, gain = "-", "-"
+            print(f"{taille:>10} | {t_ancien:>12} | {t_incr:>16.3f} | {gain:>8} | {t_complet:>22.3f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la recherche dense : rappel@k et latence, comparés à la recherche exhaustive.
+
+Pour chaque taille, les chunks synthétiques (5 phrases) et les questions sont
+encodés avec l'encodeur configuré (config.DENSE_MODEL_PATH, ou l'encodeur
+intégré par hachage). La vérité de référence est la recherche exhaustive en
+float32 (les k vecteurs de plus grande similarité). On mesure ensuite :
+  - exhaustive int8 : perte de rappel due à la quantification ;
+  - IVF (int8 et float32) pour plusieurs valeurs de nprobe : rappel@k et latences.
+Le débit d'encodage et le temps de construction de l'IVF (k-means) sont aussi affichés.
+
+--aleatoires remplace les textes par des vecteurs aléatoires regroupés autour de
+centres (beaucoup plus rapide à générer, pour tester 1M vecteurs).
+
+Usage : python benchmarks/bench_dense.py [--tailles 10000 50000] [--k 10] [--nprobe 4 8 16 32] [--aleatoires]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from corpus_synthetique import phrase, questions
+
+import numpy as np
+
+import config
+from indexation import meilleurs_scores
+from recherche_dense import VecteursDenses, normaliser_lignes
+
+
+def textes_chunks(nb, rng):
+    return [" ".join(phrase(rng) for _ in range(5)) for _ in range(nb)]
+
+
+def vecteurs_aleatoires(nb, dimension, rng, nb_centres=500):
+    """Vecteurs normalisés regroupés autour de nb_centres centres (structure proche de vrais embeddings)."""
+    centres = rng.standard_normal((nb_centres, dimension)).astype(np.float32)
+    vecteurs = centres[rng.integers(0, nb_centres, nb)] + 0.8 * rng.standard_normal((nb, dimension)).astype(np.float32)
+    return normaliser_lignes(vecteurs).astype(np.float32)
+
+
+def construire(vecteurs, quantification, ivf):
+    config.DENSE_IVF_MIN_VECTORS = 0 if ivf else len(vecteurs) + 1
+    denses = VecteursDenses(vecteurs.shape[1], quantification).ajouter(vecteurs)
+    debut = time.perf_counter()
+    denses.preparer()
+    return denses, time.perf_counter() - debut
+
+
+def rechercher(denses, requete, k, nprobe):
+    """Même calcul que IndexIncremental.rechercher_dense, pour une question."""
+    candidats = denses.candidats(requete, nprobe)
+    if candidats is None:
+        candidats = np.arange(len(denses))
+        scores = denses.scores(requete[None, :])[:, 0]
+    else:
+        scores = denses.scores(requete[None, :], candidats)[:, 0]
+    indices, _ = meilleurs_scores(candidats, scores, k, -1.0)
+    return indices
+
+
+def mesurer(denses, requetes, k, nprobe, references):
+    durees, rappels = [], []
+    for requete, reference in zip(requetes, references):
+        debut = time.perf_counter()
+        trouves = rechercher(denses, requete, k, nprobe)
+        durees.append(time.perf_counter() - debut)
+        rappels.append(len(set(trouves.tolist()) & reference) / len(reference))
+    durees = np.array(durees) * 1000
+    return np.mean(rappels), np.percentile(durees, 50), np.percentile(durees, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--aleatoires", action="store_true", help="vecteurs aléatoires au lieu de textes encodés")
+    args = parser.parse_args()
+
+    config.RETRIEVAL_MODE = "dense"
+    from recherche_dense import encodeur_configure
+    encodeur = encodeur_configure()
+    rng = random.Random(0)
+    rng_np = np.random.default_rng(0)
+    for taille in args.tailles:
+        if args.aleatoires:
+            vecteurs = vecteurs_aleatoires(taille, encodeur.dimension, rng_np)
+            requetes = vecteurs_aleatoires(args.questions, encodeur.dimension, rng_np)
+            print(f"\n{taille} vecteurs aléatoires de dimension {encodeur.dimension}")
+        else:
+            textes = textes_chunks(taille, rng)
+            debut = time.perf_counter()
+            vecteurs = encodeur.encoder(textes)
+            duree = time.perf_counter() - debut
+            requetes = encodeur.encoder(questions(args.questions))
+            print(f"\n{taille} chunks encodés par {encodeur.nom} en {duree:.1f} s ({taille / duree:.0f} chunks/s)")
+
+        # vérité de référence : recherche exhaustive en float32
+        exhaustif, _ = construire(vecteurs, "float32", ivf=False)
+        references = [set(rechercher(exhaustif, requete, args.k, 0).tolist()) for requete in requetes]
+
+        print(f"{'méthode':<26} | {'rappel@' + str(args.k):>9} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'mémoire (Mo)':>12}")
+        print("-" * 78)
+        for quantification in ("float32", "int8"):
+            denses, _ = construire(vecteurs, quantification, ivf=False)
+            rappel, p50, p99 = mesurer(denses, requetes, args.k, 0, references)
+            print(f"{'exhaustive ' + quantification:<26} | {rappel:>9.3f} | {p50:>9.3f} | {p99:>9.3f} | "
+                  f"{denses.octets() / 2**20:>12.1f}")
+        for quantification in ("float32", "int8"):
+            denses, construction = construire(vecteurs, quantification, ivf=True)
+            for nprobe in args.nprobe:
+                rappel, p50, p99 = mesurer(denses, requetes, args.k, nprobe, references)
+                methode = f"IVF {quantification} nprobe={nprobe}"
+                print(f"{methode:<26} | {rappel:>9.3f} | {p50:>9.3f} | {p99:>9.3f} | {denses.octets() / 2**20:>12.1f}")
+            print(f"  ({len(denses.centroides)} listes, construction {construction:.2f} s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
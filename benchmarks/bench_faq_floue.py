@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark et jeu de non-régression de la recherche approximative dans la FAQ.
+
+Génère une base de connaissances synthétique (clés nettoyées comme dans
+Chatbot._load_data) et des questions obtenues en altérant des clés (fautes de
+frappe, mots supprimés ou ajoutés). Pour chaque question, compare la
+correspondance de difflib.get_close_matches (ancien chemin) à celle de
+IndexFlou (chemin actuel), puis mesure le temps moyen par question.
+
+Usage : python benchmarks/bench_faq_floue.py [--tailles 100 1000 10000] [--questions 300]
+"""
+
+import argparse
+import difflib
+import random
+import sys
+import time
+
+from corpus_synthetique import VOCABULAIRE, LIAISONS
+
+import config
+from recherche_floue import IndexFlou
+
+
+def base_connaissances(taille, rng):
+    mots = VOCABULAIRE + LIAISONS
+    cles = set()
+    while len(cles) < taille:
+        cles.add(" ".join(rng.choice(mots) for _ in range(rng.randint(3, 9))))
+    return sorted(cles)
+
+
+def alterer(cle, rng):
+    mots = cle.split()
+    operation = rng.random()
+    if operation < 0.4 and len(mots) > 2:
+        del mots[rng.randrange(len(mots))]
+    elif operation < 0.7:
+        mots.insert(rng.randrange(len(mots) + 1), rng.choice(LIAISONS))
+    texte = list(" ".join(mots))
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(texte))
+        texte[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(texte)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--questions", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    cutoff = config.SIMILARITY_CUTOFF
+    print(f"{'clés':>6} | {'identiques':>11} | {'difflib (ms)':>13} | {'index (ms)':>11} | {'construction (ms)':>18}")
+    print("-" * 72)
+    for taille in args.tailles:
+        cles = base_connaissances(taille, rng)
+        questions = [alterer(rng.choice(cles), rng) for _ in range(args.questions // 2)]
+        questions += [" ".join(rng.choice(VOCABULAIRE) for _ in range(rng.randint(2, 6))) for _ in range(args.questions // 2)]
+
+        debut = time.perf_counter()
+        index = IndexFlou(cles)
+        t_construction = (time.perf_counter() - debut) * 1000
+
+        debut = time.perf_counter()
+        attendus = [(difflib.get_close_matches(q, cles, n=1, cutoff=cutoff) or [None])[0] for q in questions]
+        t_difflib = (time.perf_counter() - debut) * 1000 / len(questions)
+
+        debut = time.perf_counter()
+        obtenus = [index.meilleure_correspondance(q, cutoff) for q in questions]
+        t_index = (time.perf_counter() - debut) * 1000 / len(questions)
+
+        identiques = sum(a == b for a, b in zip(attendus, obtenus))
+        print(f"{taille:>6} | {identiques:>5}/{len(questions):<5} | {t_difflib:>13.3f} | {t_index:>11.3f} | {t_construction:>18.1f}")
+        for q, a, b in zip(questions, attendus, obtenus):
+            if a != b:
+                print(f"    différence: {q!r}: difflib={a!r} index={b!r}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark de la détection des intentions.
+
+Génère nb_intentions intentions synthétiques de phrases_par_intention phrases
+chacune, puis compare sur des messages aléatoires :
+  - l'ancien chemin : any(phrase in message ...) intention par intention (sur
+    des limites de mots, comme l'automate) ;
+  - le chemin actuel : AutomateIntentions (un seul passage sur le message).
+Les deux doivent trouver les mêmes intentions.
+
+Usage : python benchmarks/bench_intentions.py [--intentions 10 100 500] [--phrases 8]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from corpus_synthetique import VOCABULAIRE, LIAISONS
+
+from intentions import AutomateIntentions
+
+
+def generer_intentions(nb, phrases_par_intention, rng):
+    mots = VOCABULAIRE + LIAISONS
+    return {
+        f"intention_{i}": [" ".join(rng.choice(mots) for _ in range(rng.randint(1, 3))) for _ in range(phrases_par_intention)]
+        for i in range(nb)
+    }
+
+
+def ancien(intents, message):
+    return [nom for nom, phrases in intents.items() if any(f" {phrase} " in f" {message} " for phrase in phrases)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intentions", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--phrases", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    mots = VOCABULAIRE + LIAISONS
+    messages = [" ".join(rng.choice(mots) for _ in range(rng.randint(3, 15))) for _ in range(args.messages)]
+    print(f"{'intentions':>10} | {'phrases':>8} | {'ancien (µs/msg)':>16} | {'automate (µs/msg)':>18} | {'construction (ms)':>18}")
+    print("-" * 84)
+    for nb in args.intentions:
+        intents = generer_intentions(nb, args.phrases, rng)
+        debut = time.perf_counter()
+        automate = AutomateIntentions(intents)
+        t_construction = (time.perf_counter() - debut) * 1000
+
+        debut = time.perf_counter()
+        attendus = [ancien(intents, m) for m in messages]
+        t_ancien = (time.perf_counter() - debut) * 1e6 / len(messages)
+        debut = time.perf_counter()
+        obtenus = [automate.intentions(m) for m in messages]
+        t_automate = (time.perf_counter() - debut) * 1e6 / len(messages)
+
+        assert attendus == obtenus, "l'automate ne trouve pas les mêmes intentions"
+        print(f"{nb:>10} | {nb * args.phrases:>8} | {t_ancien:>16.1f} | {t_automate:>18.1f} | {t_construction:>18.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du stockage des chunks (magasin_chunks.MagasinChunks) comparé aux anciennes listes Python.
+
+Sur un corpus synthétique découpé en chunks, compare :
+  - la mémoire : listes de chaînes (textes), de noms de documents et de
+    dictionnaires de sources (objets Python comptés avec sys.getsizeof, les
+    objets partagés une seule fois) contre les tableaux du magasin ;
+  - le rechargement d'un instantané : json.load des trois listes contre
+    l'ouverture en mmap des tableaux .npy ;
+  - la lecture des passages : décodage des k chunks retournés par question
+    (magasin[i], document(i), source(i)) contre l'accès direct aux listes.
+Le contenu relu (textes, documents, sources) est vérifié identique.
+
+Usage : python benchmarks/bench_magasin_chunks.py [--documents 5000] [--lectures 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from corpus_synthetique import corpus
+
+import numpy as np
+
+from decoupage import decouper_segments
+from magasin_chunks import MagasinChunks
+
+MO = 2**20
+
+
+def taille_objets(*listes):
+    """Octets des listes et des objets qu'elles contiennent (chaque objet compté une fois)."""
+    vus, total = set(), 0
+    pile = list(listes)
+    while pile:
+        objet = pile.pop()
+        if id(objet) in vus:
+            continue
+        vus.add(id(objet))
+        total += sys.getsizeof(objet)
+        if isinstance(objet, (list, tuple)):
+            pile.extend(objet)
+        elif isinstance(objet, dict):
+            pile.extend(objet.keys())
+            pile.extend(objet.values())
+    return total
+
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--lectures", type=int, default=100000, help="nombre de passages lus")
+    args = parser.parse_args()
+
+    documents = []
+    for nom, texte in corpus(args.documents):
+        segments = list(decouper_segments([(texte, ("page", 1))]))
+        documents.append((nom, [chunk for chunk, _ in segments], [source for _, source in segments]))
+    chunks = [chunk for _, textes, _ in documents for chunk in textes]
+    chunk_docs = [nom for nom, textes, _ in documents for _ in textes]
+    chunk_sources = [source for _, _, sources in documents for source in sources]
+    magasin, duree_ajout = chronometrer(lambda: MagasinChunks().ajouter(documents))
+    octets_texte = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+    print(f"{len(documents)} documents, {len(chunks)} chunks, {octets_texte / MO:.1f} Mo de texte UTF-8, "
+          f"magasin construit en {duree_ajout:.2f} s")
+
+    with tempfile.TemporaryDirectory() as dossier:
+        with open(os.path.join(dossier, "chunks.json"), "w", encoding="utf-8") as f:
+            json.dump({"chunks": chunks, "chunk_docs": chunk_docs, "chunk_sources": chunk_sources}, f, ensure_ascii=False)
+        for nom, tableau in magasin.tableaux().items():
+            np.save(os.path.join(dossier, f"{nom}.npy"), tableau)
+
+        def charger_json():
+            with open(os.path.join(dossier, "chunks.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        def charger_mmap():
+            return MagasinChunks.depuis_tableaux(
+                magasin.description(), lambda nom: np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode="r"))
+
+        listes, duree_json = chronometrer(charger_json)
+        relu, duree_mmap = chronometrer(charger_mmap)
+        assert list(relu) == chunks
+        assert [relu.document(i) for i in range(len(relu))] == chunk_docs
+        assert [relu.source(i) for i in range(len(relu))] == chunk_sources
+
+        rng = np.random.default_rng(0)
+        lus = rng.integers(0, len(chunks), size=args.lectures)
+        _, duree_listes = chronometrer(lambda: [(listes["chunks"][i], listes["chunk_docs"][i], listes["chunk_sources"][i])
+                                                for i in lus])
+        _, duree_magasin = chronometrer(lambda: [(relu[i], relu.document(i), relu.source(i)) for i in lus])
+
+        octets_listes = taille_objets(listes["chunks"], listes["chunk_docs"], listes["chunk_sources"])
+        print(f"{'':<30} | {'listes Python':>14} | {'magasin':>14}")
+        print("-" * 66)
+        print(f"{'mémoire (Mo)':<30} | {octets_listes / MO:>14.1f} | {magasin.octets() / MO:>14.1f}")
+        print(f"{'rechargement (ms)':<30} | {duree_json * 1000:>14.1f} | {duree_mmap * 1000:>14.1f}")
+        print(f"{'lecture d un passage (µs)':<30} | {duree_listes / len(lus) * 1e6:>14.2f} | "
+              f"{duree_magasin / len(lus) * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
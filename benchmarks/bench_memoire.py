@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la mémoire utilisée pour lire et découper un gros corpus (1 Go par défaut).
+
+Compare le pic de mémoire (RSS) de deux façons de découper les documents :
+  - l'ancien chemin : chaque fichier est lu en entier, ajouté à la chaîne
+    document_content qui grossit avec le corpus, puis découpé avec re.split ;
+  - le chemin actuel : les fichiers sont lus par blocs et découpés au fil de
+    l'eau (decoupage.decouper_segments), sans jamais garder le texte complet.
+
+Chaque mode est mesuré dans un processus séparé. La vectorisation n'est pas
+incluse : l'index garde de toute façon les chunks et la matrice, dont la taille
+ne dépend pas de la façon de découper.
+
+Usage : python benchmarks/bench_memoire.py [--taille-mo 1024] [--taille-fichier-mo 1] [--dossier DOSSIER]
+  --taille-fichier-mo 0 écrit tout le corpus dans un seul fichier.
+"""
+
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus_synthetique import document
+
+try:
+    import resource # pic de mémoire du processus (Linux, macOS)
+except ImportError:
+    resource = None
+
+MO = 1024 * 1024
+
+
+def ecrire_gros_corpus(dossier, taille_mo, taille_fichier_mo):
+    """Écrit taille_mo Mo de texte, en fichiers de taille_fichier_mo Mo (0 = un seul fichier)."""
+    os.makedirs(dossier, exist_ok=True)
+    rng = random.Random(42)
+    # un réservoir de documents réutilisés : générer 1 Go de phrases aléatoires serait trop long
+    reservoir = [document(rng, 40) + "\n" for _ in range(500)]
+    taille_fichier = (taille_fichier_mo or taille_mo) * MO
+    ecrit, numero = 0, 0
+    while ecrit < taille_mo * MO:
+        with open(os.path.join(dossier, f"corpus_{numero:05d}.txt"), "w", encoding="utf-8") as f:
+            dans_fichier = 0
+            while dans_fichier < taille_fichier and ecrit < taille_mo * MO:
+                texte = rng.choice(reservoir)
+                f.write(texte)
+                dans_fichier += len(texte.encode("utf-8"))
+                ecrit += len(texte.encode("utf-8"))
+        numero += 1
+    return numero
+
+
+def decouper_ancien(dossier):
+    """Ancien chemin : lecture complète de chaque fichier et concaténation dans document_content."""
+    document_content = ""
+    nb_chunks = 0
+    for nom in sorted(os.listdir(dossier)):
+        with open(os.path.join(dossier, nom), "r", encoding="utf-8") as f:
+            contenu = f.read()
+        document_content += "\n" + contenu
+        phrases = re.split(r'(?<=[.!?])\s+', contenu)
+        chunks = [c for c in (' '.join(phrases[i:i + 5]) for i in range(0, len(phrases), 5)) if c.strip()]
+        nb_chunks += len(chunks)
+    return nb_chunks
+
+
+def decouper_flux(dossier):
+    """Chemin actuel : lecture par blocs et découpage au fil de l'eau."""
+    from chatbotcol import segments_txt
+    from decoupage import decouper_segments
+    nb_chunks = 0
+    for nom in sorted(os.listdir(dossier)):
+        for _ in decouper_segments(segments_txt(os.path.join(dossier, nom)), 5):
+            nb_chunks += 1
+    return nb_chunks
+
+
+def mesurer(mode, dossier):
+    """Exécuté dans le processus enfant : découpe le corpus et affiche chunks, durée et pics de mémoire."""
+    import chatbotcol # noqa: F401  (mêmes imports dans les deux modes)
+    avant = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    debut = time.perf_counter()
+    nb_chunks = decouper_ancien(dossier) if mode == "ancien" else decouper_flux(dossier)
+    duree = time.perf_counter() - debut
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    facteur = 1 if sys.platform == "darwin" else 1024
+    print(nb_chunks, duree, avant * facteur, pic * facteur)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taille-mo", type=int, default=1024)
+    parser.add_argument("--taille-fichier-mo", type=int, default=1)
+    parser.add_argument("--dossier", help="dossier du corpus (par défaut un dossier temporaire)")
+    parser.add_argument("--mesurer", choices=["ancien", "flux"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if resource is None:
+        print("Le module resource n'est pas disponible sur ce système : mesure impossible.")
+        return
+    if args.mesurer:
+        mesurer(args.mesurer, args.dossier)
+        return
+
+    with tempfile.TemporaryDirectory() as temporaire:
+        dossier = args.dossier or os.path.join(temporaire, "corpus")
+        if not os.path.isdir(dossier) or not os.listdir(dossier):
+            nb = ecrire_gros_corpus(dossier, args.taille_mo, args.taille_fichier_mo)
+            print(f"Corpus : {args.taille_mo} Mo en {nb} fichier(s)")
+        print(f"{'mode':>8} | {'chunks':>10} | {'durée (s)':>10} | {'RSS initial (Mo)':>17} | {'pic RSS (Mo)':>13}")
+        print("-" * 71)
+        for mode in ("ancien", "flux"):
+            sortie = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mesurer", mode, "--dossier", dossier],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            nb_chunks, duree, avant, pic = sortie.split()
+            print(f"{mode:>8} | {int(nb_chunks):>10} | {float(duree):>10.2f} | "
+                  f"{int(avant) / MO:>17.1f} | {int(pic) / MO:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
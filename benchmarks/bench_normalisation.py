@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la normalisation du texte (normalisation.py) sur un gros corpus français synthétique.
+
+Compare, en débit (Mo de texte UTF-8 par seconde) :
+  - nettoyage des documents : ancien Chatbot.nettoyer_message (décomposition NFD
+    caractère par caractère puis deux expressions régulières) contre
+    normalisation.nettoyer (une table de traduction, une expression régulière) ;
+  - nettoyage des questions : idem, avec normalisation.nettoyer à froid puis sur
+    des questions répétées (résultat mémorisé) ;
+  - analyse : analyseur par défaut de scikit-learn (minuscules, motif de mots,
+    n-grammes, sans retrait des accents) contre normalisation.Analyseur (qui retire
+    en plus les accents et la ponctuation) ;
+  - vectorisation : HashingVectorizer.transform avec l'un puis l'autre analyseur,
+    comme à l'indexation des chunks.
+Le résultat de normalisation.nettoyer est vérifié identique à l'ancien nettoyage
+sur tout le corpus et sur toutes les questions.
+
+Usage : python benchmarks/bench_normalisation.py [--documents 2000] [--questions 20000] [--repetitions 3]
+"""
+
+import argparse
+import re
+import sys
+import time
+import unicodedata
+
+from corpus_synthetique import corpus, questions
+
+import normalisation
+from normalisation import Analyseur, nettoyer
+
+
+def nettoyer_reference(text):
+    """Ancien Chatbot.nettoyer_message, gardé comme référence."""
+    text = text.lower()
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def vider_memo():
+    normalisation._nettoyer_memo.cache_clear()
+    normalisation._mots_memo.cache_clear()
+
+
+def debit(fonction, textes, octets, repetitions):
+    """Meilleur débit (Mo/s) de fonction appliquée à chaque texte, sur repetitions passes."""
+    meilleure = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        for texte in textes:
+            fonction(texte)
+        meilleure = min(meilleure, time.perf_counter() - debut)
+    return octets / 2**20 / meilleure
+
+
+def a_froid(fonction):
+    def appel(texte):
+        vider_memo()
+        return fonction(texte)
+    return appel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    documents = [texte for _, texte in corpus(args.documents)]
+    # questions répétées : 20 % de questions distinctes, comme les questions fréquentes d'une FAQ
+    qs = questions(max(1, args.questions // 5)) * 5
+    octets_documents = sum(len(texte.encode("utf-8")) for texte in documents)
+    octets_questions = sum(len(texte.encode("utf-8")) for texte in qs)
+    print(f"{len(documents)} documents ({octets_documents / 2**20:.1f} Mo), {len(qs)} questions "
+          f"({octets_questions / 2**20:.2f} Mo), meilleure de {args.repetitions} passes")
+
+    differences = sum(nettoyer_reference(texte) != nettoyer(texte) for texte in documents + qs)
+    assert differences == 0, f"{differences} textes nettoyés différemment"
+
+    reference = HashingVectorizer(n_features=2**20, ngram_range=(1, 2), alternate_sign=False, norm=None)
+    nouveau = HashingVectorizer(n_features=2**20, analyzer=Analyseur((1, 2)), alternate_sign=False, norm=None)
+    r = args.repetitions
+    mesures = [
+        ("nettoyage des documents", debit(nettoyer_reference, documents, octets_documents, r),
+         debit(nettoyer, documents, octets_documents, r)),
+        ("nettoyage des questions (à froid)", debit(nettoyer_reference, qs, octets_questions, r),
+         debit(a_froid(nettoyer), qs, octets_questions, r)),
+        ("nettoyage des questions (mémorisé)", None, debit(nettoyer, qs, octets_questions, r)),
+        ("analyse des documents", debit(reference.build_analyzer(), documents, octets_documents, r),
+         debit(Analyseur((1, 2)), documents, octets_documents, r)),
+        ("vectorisation des documents", debit(lambda texte: reference.transform([texte]), documents, octets_documents, r),
+         debit(lambda texte: nouveau.transform([texte]), documents, octets_documents, r)),
+    ]
+    print(f"{'étape':<36} | {'avant (Mo/s)':>12} | {'après (Mo/s)':>12} | {'gain':>6}")
+    print("-" * 76)
+    for nom, avant, apres in mesures:
+        if avant is None:
+            print(f"{nom:<36} | {'':>12} | {apres:>12.1f} | {'':>6}")
+        else:
+            print(f"{nom:<36} | {avant:>12.1f} | {apres:>12.1f} | {apres / avant:>5.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la recherche de passages sur de gros index synthétiques.
+
+Compare, pour 10k, 100k et 1M chunks :
+  - l'ancien chemin : scores denses ((matrice @ q.T).toarray().ravel()) puis argmax (k=1)
+    ou argsort complet (top-k) ;
+  - le chemin actuel : IndexIncremental.rechercher (question multipliée par la
+    matrice transposée "terme -> chunks", scores creux + argpartition). La
+    transposée est construite une fois, avant les mesures.
+
+La matrice n'est pas construite à partir de textes (trop long pour 1M chunks) :
+chaque chunk reçoit nnz_par_chunk termes tirés selon une loi de Zipf dans un
+vocabulaire de pseudo-mots, placés dans les colonnes que leur attribuerait le
+HashingVectorizer. Les questions utilisent le même vocabulaire.
+
+Usage : python benchmarks/bench_recherche.py [--tailles 10000 100000 1000000] [--k 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import corpus_synthetique  # noqa: F401  (ajoute la racine du projet au chemin d'import)
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from indexation import IndexIncremental
+from magasin_chunks import MagasinChunks
+
+
+def vocabulaire(taille):
+    return [f"terme{i:05d}" for i in range(taille)]
+
+
+def construire_index(nb_chunks, mots, nnz_par_chunk, rng):
+    """IndexIncremental dont la matrice pondérée est générée directement."""
+    index = IndexIncremental()
+    colonnes = index.vectorizer.transform(mots).indices  # colonne de hachage de chaque pseudo-mot
+    poids = 1.0 / np.arange(1, len(mots) + 1)
+    poids /= poids.sum()
+    tirages = rng.choice(len(mots), size=nb_chunks * nnz_par_chunk, p=poids)
+    indptr = np.arange(0, nb_chunks * nnz_par_chunk + 1, nnz_par_chunk)
+    comptes = sparse.csr_matrix(
+        (np.ones(len(tirages)), colonnes[tirages].astype(np.int32), indptr),
+        shape=(nb_chunks, index.n_features),
+    )
+    comptes.sum_duplicates()
+    index._df = np.bincount(comptes.indices, minlength=index.n_features)
+    index._longueur_totale = float(comptes.sum())
+    index._blocs = [comptes]
+    index.chunks = MagasinChunks().ajouter([("synthetique", [""] * nb_chunks, None)])
+    index._perime = True
+    index.matrice()
+    return index
+
+
+def questions(mots, nb, rng):
+    return [" ".join(rng.choice(mots[:2000], size=rng.integers(2, 6))) for _ in range(nb)]
+
+
+def ancien(index, question, k):
+    matrice = index.matrice()
+    scores = (matrice @ index.transformer([question]).T).toarray().ravel()
+    if k == 1:
+        idx = scores.argmax()
+        return [idx] if scores[idx] > 0.1 else []
+    ordre = np.argsort(-scores)[:k]
+    return [i for i in ordre if scores[i] > 0.1]
+
+
+def actuel(index, question, k):
+    return [i for i, _ in index.rechercher([question], k, 0.1)[0]]
+
+
+def chronometrer(fonction, index, qs, k):
+    durees = []
+    for q in qs:
+        debut = time.perf_counter()
+        fonction(index, q, k)
+        durees.append(time.perf_counter() - debut)
+    durees = np.array(durees) * 1000
+    return np.percentile(durees, 50), np.percentile(durees, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--nnz-par-chunk", type=int, default=40)
+    parser.add_argument("--vocabulaire", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mots = vocabulaire(args.vocabulaire)
+    qs = questions(mots, args.questions, rng)
+    print(f"{'chunks':>10} | {'k':>3} | {'ancien p50/p99 (ms)':>22} | {'actuel p50/p99 (ms)':>22}")
+    print("-" * 68)
+    for taille in args.tailles:
+        index = construire_index(taille, mots, args.nnz_par_chunk, rng)
+        # vérification : mêmes passages que l'ancien chemin
+        for q in qs[:5]:
+            a, b = ancien(index, q, args.k), actuel(index, q, args.k)
+            assert len(a) == len(b), (a, b)
+        for k in sorted({1, args.k}):
+            a50, a99 = chronometrer(ancien, index, qs, k)
+            n50, n99 = chronometrer(actuel, index, qs, k)
+            print(f"{taille:>10} | {k:>3} | {a50:>10.2f} / {a99:>9.2f} | {n50:>10.2f} / {n99:>9.2f}")
+        del index
+
+
+if __name__ == "__main__":
+    sys.exit(main())
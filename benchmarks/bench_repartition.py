@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'index réparti (repartition.py) comparé à un index unique (IndexIncremental).
+
+Le même corpus synthétique est indexé dans un index unique puis dans des index
+répartis de --partitions partitions (processus locaux). Pour chaque configuration :
+  - indexation : durée de l'ajout de tous les documents et de la publication
+    (vectorisation faite en parallèle par les partitions) ;
+  - exactitude : les scores des k meilleurs passages de chaque question sont
+    comparés à ceux de l'index unique (IDF global), en TF-IDF et en BM25 ;
+  - latence p50/p99 d'une question seule, et d'un lot de --lot questions ;
+  - débit avec --threads threads qui envoient chacun des questions seules ;
+  - partition lente (POSIX seulement) : une partition est suspendue (SIGSTOP), la
+    recherche répond après config.SHARD_TIMEOUT_MS avec les autres partitions.
+Sur une machine à un seul cœur, la répartition ne peut qu'ajouter le coût des
+échanges entre processus : le gain attendu vient des cœurs (ou machines) en plus.
+
+Usage : python benchmarks/bench_repartition.py [--documents 1000] [--partitions 2 4] [--questions 200]
+"""
+
+import argparse
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from corpus_synthetique import corpus, questions
+
+import numpy as np
+
+import config
+from decoupage import decouper_segments
+from indexation import IndexIncremental
+from repartition import IndexReparti
+
+
+def documents_du_corpus(nb):
+    documents = []
+    for nom, texte in corpus(nb):
+        segments = list(decouper_segments([(texte, None)]))
+        documents.append((nom, [chunk for chunk, _ in segments], None, [position for _, position in segments]))
+    return documents
+
+
+def indexer(index, documents):
+    """Ajout de tous les documents puis publication, comme Chatbot._publier_index."""
+    debut = time.perf_counter()
+    copie = index.copie()
+    copie.ajouter_documents(documents)
+    return copie.figer(), time.perf_counter() - debut
+
+
+def latences(fonction, lots):
+    durees = []
+    for lot in lots:
+        debut = time.perf_counter()
+        fonction(lot)
+        durees.append(time.perf_counter() - debut)
+    durees = np.array(durees) * 1000
+    return np.percentile(durees, 50), np.percentile(durees, 99)
+
+
+def debit(index, qs, k, threads, duree):
+    nb = [0] * threads
+    fin = time.perf_counter() + duree
+
+    def client(numero):
+        i = numero
+        while time.perf_counter() < fin:
+            index.passages([qs[i % len(qs)]], k, 0.0, config.RETRIEVAL_MODE)
+            nb[numero] += 1
+            i += threads
+
+    clients = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    return sum(nb) / duree
+
+
+def ecarts(reference, index, qs, k, mode):
+    """Nombre de questions dont les scores des k meilleurs diffèrent de ceux de l'index unique."""
+    attendus = reference.passages(qs, k, 0.0, mode)
+    obtenus = index.passages(qs, k, 0.0, mode)
+    return sum(not np.allclose([p[1] for p in a], [p[1] for p in b]) for a, b in zip(attendus, obtenus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--partitions", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--lot", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duree", type=float, default=5.0)
+    parser.add_argument("--mode", default="bm25", help="config.RETRIEVAL_MODE (bm25 : TF-IDF et BM25 vérifiés)")
+    args = parser.parse_args()
+
+    config.RETRIEVAL_MODE = args.mode
+    documents = documents_du_corpus(args.documents)
+    qs = questions(args.questions)
+    lots = [qs[i:i + args.lot] for i in range(0, len(qs), args.lot)]
+    methodes = ["tfidf", "bm25"] if "bm25" in args.mode else ["tfidf"]
+    print(f"{len(documents)} documents, {sum(len(d[1]) for d in documents)} chunks, mode {args.mode}, "
+          f"k={args.k}, délai des partitions {config.SHARD_TIMEOUT_MS:.0f} ms, {os.cpu_count()} cœur(s)")
+    print(f"{'configuration':<14} | {'indexation (s)':>14} | {'écarts':>7} | {'question p50/p99 (ms)':>21} | "
+          f"{'lot p50/p99 (ms)':>17} | {'débit (q/s)':>11}")
+    print("-" * 100)
+
+    reference, duree = indexer(IndexIncremental().figer(), documents)
+
+    def ligne(nom, index, duree, nb_ecarts):
+        question = latences(lambda q: index.passages(q, args.k, 0.0, args.mode), [[q] for q in qs])
+        lot = latences(lambda l: index.passages(l, args.k, 0.0, args.mode), lots)
+        print(f"{nom:<14} | {duree:>14.2f} | {nb_ecarts:>7} | {question[0]:>9.2f} / {question[1]:>9.2f} | "
+              f"{lot[0]:>7.2f} / {lot[1]:>7.2f} | {debit(index, qs, args.k, args.threads, args.duree):>11.0f}")
+
+    ligne("index unique", reference, duree, "-")
+    for nb in args.partitions:
+        with tempfile.TemporaryDirectory() as dossier:
+            config.INDEX_DIR = dossier
+            config.INDEX_SHARDS = nb
+            index, duree = indexer(IndexReparti.ouvrir(), documents)
+            try:
+                nb_ecarts = sum(ecarts(reference, index, qs, args.k, methode) for methode in methodes)
+                ligne(f"{nb} partitions", index, duree, nb_ecarts)
+                if hasattr(signal, "SIGSTOP"):
+                    processus = index.clients[0].processus
+                    os.kill(processus.pid, signal.SIGSTOP)
+                    time.sleep(0.1)
+                    debut = time.perf_counter()
+                    trouves = index.passages(qs[:args.lot], args.k, 0.0, args.mode)
+                    ecoule = (time.perf_counter() - debut) * 1000
+                    os.kill(processus.pid, signal.SIGCONT)
+                    print(f"  partition 0 suspendue : réponse en {ecoule:.0f} ms, "
+                          f"{sum(map(len, trouves))} passages sur {args.k * len(trouves)}, hors délai : {index.hors_delai}")
+            finally:
+                index.fermer()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
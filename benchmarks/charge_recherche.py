@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de charge de /recherche : requêtes traitées une par une ou regroupées en lots.
+
+Pour chaque configuration, un serveur uvicorn (un worker) est lancé dans un
+processus séparé sur un corpus synthétique déjà indexé, avec le cache des
+réponses désactivé (chaque requête fait la recherche dans les documents).
+--concurrence clients asynchrones, chacun sur sa connexion HTTP gardée ouverte,
+envoient des questions sans interruption pendant --duree secondes ; on mesure le
+débit, les latences p50/p99 vues par le client et la taille moyenne des lots
+(relevée sur /metrics).
+
+Configurations comparées :
+  - individuel : MICROBATCH_MAX_SIZE=1 (chaque requête traitée seule dans le pool
+    de threads, comme avant le regroupement) ;
+  - regroupe   : MICROBATCH_MAX_SIZE et MICROBATCH_MAX_WAIT_MS de --taille-lot et --attente-ms.
+
+Usage : python benchmarks/charge_recherche.py [--documents 200] [--concurrence 1 16 64] [--duree 10]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus_synthetique import corpus, ecrire_corpus, questions
+
+CLE = "charge"
+
+
+def configurer(dossier):
+    import config
+    config.DATA_DIR = os.path.join(dossier, "data")
+    config.STATS_FILE = os.path.join(dossier, "stats.json")
+    config.HISTORY_FILE = os.path.join(dossier, "historique.jsonl")
+    config.INDEX_DIR = os.path.join(dossier, "index")
+    config.EXTRACTION_CACHE_DIR = os.path.join(dossier, "cache")
+    config.QUERY_CACHE_SIZE = 0
+    config.INGESTION_WORKERS = 1
+    return config
+
+
+def servir(dossier, port):
+    """Exécuté dans le processus serveur."""
+    configurer(dossier)
+    os.environ["API_KEY"] = CLE
+    import uvicorn
+    with contextlib.redirect_stdout(io.StringIO()):
+        import fastapi_main
+    uvicorn.run(fastapi_main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def poster(lecteur, ecrivain, hote, chemin, corps):
+    """Une requête HTTP/1.1 sur une connexion gardée ouverte ; retourne (statut, corps de la réponse)."""
+    ecrivain.write(f"POST {chemin} HTTP/1.1\r\nHost: {hote}\r\nX-API-Key: {CLE}\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(corps)}\r\n\r\n".encode() + corps)
+    await ecrivain.drain()
+    statut = int((await lecteur.readline()).split()[1])
+    longueur = 0
+    while True:
+        ligne = await lecteur.readline()
+        if ligne in (b"\r\n", b""):
+            break
+        nom, _, valeur = ligne.decode("latin-1").partition(":")
+        if nom.lower() == "content-length":
+            longueur = int(valeur)
+    return statut, await lecteur.readexactly(longueur)
+
+
+async def charger(port, textes, concurrence, duree):
+    """
+    concurrence clients envoient des questions pendant duree secondes, chacun sur sa connexion.
+    Client HTTP minimal (sockets asyncio) : la machine de test peut n'avoir qu'un cœur, partagé
+    avec le serveur, et un client complet (httpx) coûterait plus cher que le serveur mesuré.
+    """
+    corps = [json.dumps({"question": texte, "k": 3}).encode() for texte in textes]
+    durees = []
+    erreurs = 0
+    fin = time.perf_counter() + duree
+
+    async def client(numero):
+        nonlocal erreurs
+        lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+        i = numero
+        try:
+            while time.perf_counter() < fin:
+                debut = time.perf_counter()
+                statut, reponse = await poster(lecteur, ecrivain, "127.0.0.1", "/recherche", corps[i % len(corps)])
+                if statut != 200 or b'"error"' in reponse[:20]:
+                    erreurs += 1
+                durees.append(time.perf_counter() - debut)
+                i += concurrence
+        finally:
+            ecrivain.close()
+
+    debut = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrence)))
+    return durees, erreurs, time.perf_counter() - debut
+
+
+def valeur_metrique(texte, nom):
+    for ligne in texte.splitlines():
+        if ligne.startswith(nom + " "):
+            return float(ligne.split()[1])
+    return 0.0
+
+
+def percentile(valeurs, p):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(p / 100 * len(valeurs)))] if valeurs else 0.0
+
+
+def mesurer(dossier, environnement, concurrence, duree, textes):
+    port = port_libre()
+    serveur = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--servir", "--dossier", dossier,
+                                "--port", str(port)], env={**os.environ, **environnement},
+                               stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        import httpx
+        limite = time.monotonic() + 120
+        while True:
+            try:
+                httpx.get(url + "/", timeout=1)
+                break
+            except httpx.HTTPError:
+                if serveur.poll() is not None or time.monotonic() > limite:
+                    raise SystemExit("Le serveur n'a pas démarré.")
+                time.sleep(0.2)
+        asyncio.run(charger(port, textes, concurrence, min(2.0, duree)))  # échauffement
+        durees, erreurs, ecoule = asyncio.run(charger(port, textes, concurrence, duree))
+        metriques = httpx.get(url + "/metrics").text
+    finally:
+        serveur.terminate()
+        serveur.wait()
+    lots = valeur_metrique(metriques, "chatbot_recherche_lots_total")
+    regroupees = valeur_metrique(metriques, "chatbot_recherche_regroupees_total")
+    return {
+        "requetes_par_s": len(durees) / ecoule,
+        "p50_ms": percentile(durees, 50) * 1000,
+        "p99_ms": percentile(durees, 99) * 1000,
+        "erreurs": erreurs,
+        "taille_lot": regroupees / lots if lots else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--concurrence", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duree", type=float, default=10.0)
+    parser.add_argument("--taille-lot", type=int, default=32)
+    parser.add_argument("--attente-ms", type=float, default=2.0)
+    parser.add_argument("--servir", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--dossier", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(args.dossier, args.port)
+        return
+
+    configurations = {
+        "individuel": {"MICROBATCH_MAX_SIZE": "1"},
+        "regroupe": {"MICROBATCH_MAX_SIZE": str(args.taille_lot), "MICROBATCH_MAX_WAIT_MS": str(args.attente_ms)},
+    }
+    textes = questions(2000)
+    with tempfile.TemporaryDirectory() as dossier:
+        # indexation une fois pour toutes : les serveurs rechargent l'instantané
+        configurer(dossier)
+        ecrire_corpus(os.path.join(dossier, "data"), corpus(args.documents))
+        with contextlib.redirect_stdout(io.StringIO()):
+            from chatbotcol import Chatbot
+            Chatbot().journal.vider()
+
+        print(f"/recherche sur {args.documents} documents, {args.duree:.0f} s par mesure, cache des réponses désactivé")
+        print(f"{'concurrence':>11} | {'configuration':<13} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | "
+              f"{'lot moyen':>9} | {'erreurs':>7}")
+        print("-" * 84)
+        for concurrence in args.concurrence:
+            for nom, environnement in configurations.items():
+                r = mesurer(dossier, environnement, concurrence, args.duree, textes)
+                print(f"{concurrence:>11} | {nom:<13} | {r['requetes_par_s']:>8.0f} | {r['p50_ms']:>9.2f} | "
+                      f"{r['p99_ms']:>9.2f} | {r['taille_lot']:>9.1f} | {r['erreurs']:>7}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Générateur de corpus français synthétiques pour les benchmarks.
+
+Les textes n'ont pas de sens mais reprennent le vocabulaire du domaine
+(garanties, PME, CDEC...) afin que la distribution des termes ressemble à
+celle des vrais documents. La graine est fixe : deux exécutions produisent
+exactement le même corpus.
+"""
+
+import os
+import random
+import sys
+
+# les benchmarks importent les modules situés à la racine du projet
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
+
+VOCABULAIRE = [
+    "garantie", "caution", "bancaire", "hypothèque", "légale", "entreprise", "pme",
+    "procédure", "délai", "montant", "taux", "plafond", "dossier", "demande",
+    "caisse", "dépôts", "consignations", "marché", "public", "contrat", "titulaire",
+    "paiement", "avance", "retenue", "soumission", "dépôt", "bénéficiaire", "banque",
+    "chèque", "certifié", "jours", "mois", "pièces", "justificatives", "article",
+    "décret", "arrêté", "ministre", "finances", "trésor", "libération", "mainlevée",
+    "exécution", "travaux", "fournitures", "services", "personnelle", "solidaire",
+    "engagement", "obligation", "pénalités", "retard", "résiliation", "litige",
+]
+LIAISONS = ["le", "la", "les", "de", "du", "des", "pour", "par", "avec", "dans", "est", "sont", "une", "un"]
+
+
+def phrase(rng, longueur_min=6, longueur_max=18):
+    """Une phrase aléatoire terminée par un point."""
+    mots = []
+    for _ in range(rng.randint(longueur_min, longueur_max)):
+        mots.append(rng.choice(VOCABULAIRE) if rng.random() < 0.6 else rng.choice(LIAISONS))
+    return " ".join(mots).capitalize() + "."
+
+
+def document(rng, nb_phrases=40):
+    """Un document synthétique de nb_phrases phrases, découpé en paragraphes."""
+    paragraphes = []
+    restant = nb_phrases
+    while restant > 0:
+        taille = min(restant, rng.randint(3, 8))
+        paragraphes.append(" ".join(phrase(rng) for _ in range(taille)))
+        restant -= taille
+    return "\n".join(paragraphes)
+
+
+def corpus(nb_documents, nb_phrases=40, graine=42):
+    """Liste de (nom, texte) reproductible."""
+    rng = random.Random(graine)
+    return [(f"doc_{i:06d}.txt", document(rng, nb_phrases)) for i in range(nb_documents)]
+
+
+def questions(nb_questions, graine=7):
+    """Questions synthétiques construites avec le même vocabulaire."""
+    rng = random.Random(graine)
+    return [
+        "Quel est le " + " ".join(rng.choice(VOCABULAIRE) for _ in range(rng.randint(2, 5))) + " ?"
+        for _ in range(nb_questions)
+    ]
+
+
+def ecrire_corpus(dossier, documents):
+    """Écrit les documents en fichiers .txt dans dossier."""
+    os.makedirs(dossier, exist_ok=True)
+    for nom, texte in documents:
+        with open(os.path.join(dossier, nom), "w", encoding="utf-8") as f:
+            f.write(texte)
+
+
+def faq(nb_questions, graine=11):
+    """Base de connaissances synthétique {question: réponse}, questions distinctes."""
+    rng = random.Random(graine)
+    mots = VOCABULAIRE + LIAISONS
+    base = {}
+    while len(base) < nb_questions:
+        question = " ".join(rng.choice(mots) for _ in range(rng.randint(3, 9))).capitalize() + " ?"
+        base[question] = phrase(rng, 10, 25)
+    return base
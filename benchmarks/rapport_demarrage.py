@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rapport du temps de démarrage du chatbot : coût des imports et de l'initialisation.
+
+Chaque mode est mesuré dans un processus neuf (lancé avec python -X importtime),
+comme un worker de l'API qui démarre ou redémarre (--reload) sur un dossier de
+documents déjà indexé (l'instantané de l'index est construit avant la mesure) :
+  - ancien : scikit-learn, python-docx, PyMuPDF et spaCy (avec son modèle) sont
+    importés avant chatbotcol, comme le faisait l'import du module auparavant ;
+  - actuel : ces bibliothèques ne sont importées qu'à leur première utilisation
+    (voir dependances.py).
+
+Le rapport donne, pour chaque mode : la durée de l'import de chatbotcol, celle de
+chaque étape de Chatbot.__init__, le temps de la première question (qui paie les
+imports différés), la mémoire (RSS) et, pour le mode actuel, les paquets les plus
+coûteux à importer. Le préchauffage en arrière-plan (config.PRELOAD_IMPORTS) est
+désactivé pour mesurer le coût réel d'un import différé.
+
+Usage : python benchmarks/rapport_demarrage.py [--documents 50] [--json FICHIER]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus_synthetique import RACINE, corpus, ecrire_corpus
+
+MO = 1024 * 1024
+
+# bibliothèques importées par l'ancien chatbotcol dès son import
+IMPORTS_ANCIENS = ("sklearn.feature_extraction.text", "sklearn.preprocessing", "docx", "fitz", "spacy")
+
+
+def rss_actuel():
+    """RSS actuel du processus en octets (Linux seulement), ou None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def configurer(dossier):
+    import config
+    config.DATA_DIR = os.path.join(dossier, "data")
+    config.STATS_FILE = os.path.join(dossier, "stats.json")
+    config.HISTORY_FILE = os.path.join(dossier, "historique.jsonl")
+    config.INDEX_DIR = os.path.join(dossier, "index")
+    config.EXTRACTION_CACHE_DIR = os.path.join(dossier, "cache")
+    config.KNOWLEDGE_BASE_FILE = os.path.join(dossier, "data.json")
+    config.INGESTION_WORKERS = 1
+    config.PRELOAD_IMPORTS = False
+    return config
+
+
+def preparer(dossier, nb_documents):
+    """Écrit le corpus et construit l'instantané de l'index (processus séparé, non mesuré)."""
+    shutil.copy(os.path.join(RACINE, "data.json"), os.path.join(dossier, "data.json"))
+    ecrire_corpus(os.path.join(dossier, "data"), corpus(nb_documents))
+    configurer(dossier)
+    from chatbotcol import Chatbot
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = Chatbot()
+        bot.journal.vider()
+
+
+def mesurer(mode, dossier):
+    """Exécuté dans le processus mesuré : durées et mémoire en JSON sur la dernière ligne."""
+    debut = time.perf_counter()
+    rss_initial = rss_actuel()
+    imports_anciens = {}
+    if mode == "ancien":
+        for module in IMPORTS_ANCIENS:
+            debut_module = time.perf_counter()
+            try:
+                charge = __import__(module)
+                if module == "spacy":
+                    try:
+                        charge.load("fr_core_news_sm")
+                    except OSError:
+                        pass
+            except ImportError:
+                imports_anciens[module] = None
+                continue
+            imports_anciens[module] = time.perf_counter() - debut_module
+    debut_import = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import chatbotcol
+    import_chatbotcol = time.perf_counter() - debut_import
+    configurer(dossier)
+    debut_init = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = chatbotcol.Chatbot()
+    initialisation = time.perf_counter() - debut_init
+    pret = time.perf_counter() - debut
+    rss_pret = rss_actuel()
+
+    debut_question = time.perf_counter()
+    bot.repondre("Quel est le délai de mainlevée de la garantie bancaire ?", k=3)
+    premiere_question = time.perf_counter() - debut_question
+    bot.journal.vider()
+
+    from dependances import DUREES_IMPORT
+    print(json.dumps({
+        "imports_anciens_s": imports_anciens,
+        "import_chatbotcol_s": import_chatbotcol,
+        "initialisation_s": initialisation,
+        "etapes_initialisation_s": bot.durees_demarrage,
+        "pret_s": pret,
+        "premiere_question_s": premiere_question,
+        "imports_differes_s": DUREES_IMPORT,
+        "rss_initial_mo": rss_initial / MO if rss_initial else None,
+        "rss_pret_mo": rss_pret / MO if rss_pret else None,
+        "rss_apres_question_mo": rss_actuel() / MO if rss_actuel() else None,
+    }))
+
+
+def paquets_les_plus_couteux(sortie_importtime, nombre=10):
+    """Somme des durées propres (-X importtime) par paquet de premier niveau, en secondes."""
+    par_paquet = {}
+    for ligne in sortie_importtime.splitlines():
+        if not ligne.startswith("import time:") or "self [us]" in ligne:
+            continue
+        propre, _, nom = (partie.strip() for partie in ligne[len("import time:"):].split("|", 2))
+        paquet = nom.split(".")[0]
+        par_paquet[paquet] = par_paquet.get(paquet, 0.0) + int(propre) / 1e6
+    return sorted(par_paquet.items(), key=lambda paire: -paire[1])[:nombre]
+
+
+def lancer(arguments, importtime=False):
+    options = ["-X", "importtime"] if importtime else []
+    sortie = subprocess.run([sys.executable, *options, os.path.abspath(__file__), *arguments],
+                            capture_output=True, text=True)
+    if sortie.returncode != 0:
+        print(sortie.stderr)
+        raise SystemExit(f"Échec de la mesure : {' '.join(arguments)}")
+    return sortie
+
+
+def ms(secondes):
+    return f"{secondes * 1000:.0f}" if secondes is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50, help="documents du dossier déjà indexé")
+    parser.add_argument("--json", help="écrit aussi le rapport complet dans ce fichier")
+    parser.add_argument("--preparer", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mesurer", choices=["ancien", "actuel"], help=argparse.SUPPRESS)
+    parser.add_argument("--dossier", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.preparer:
+        preparer(args.dossier, args.documents)
+        return
+    if args.mesurer:
+        mesurer(args.mesurer, args.dossier)
+        return
+
+    rapport = {}
+    with tempfile.TemporaryDirectory() as dossier:
+        lancer(["--preparer", "--dossier", dossier, "--documents", str(args.documents)])
+        for mode in ("ancien", "actuel"):
+            sortie = lancer(["--mesurer", mode, "--dossier", dossier], importtime=True)
+            rapport[mode] = json.loads(sortie.stdout.strip().splitlines()[-1])
+            rapport[mode]["paquets_s"] = paquets_les_plus_couteux(sortie.stderr)
+
+    print(f"Démarrage d'un worker sur {args.documents} documents déjà indexés (durées en ms)")
+    print(f"{'':<34} | {'ancien':>9} | {'actuel':>9}")
+    print("-" * 58)
+    ancien, actuel = rapport["ancien"], rapport["actuel"]
+    lignes = [("imports lourds avant chatbotcol", sum(d for d in ancien["imports_anciens_s"].values() if d), 0.0),
+              ("import de chatbotcol", ancien["import_chatbotcol_s"], actuel["import_chatbotcol_s"])]
+    for etape in actuel["etapes_initialisation_s"]:
+        lignes.append((f"  init : {etape}", ancien["etapes_initialisation_s"].get(etape),
+                       actuel["etapes_initialisation_s"][etape]))
+    lignes += [("Chatbot() complet", ancien["initialisation_s"], actuel["initialisation_s"]),
+               ("prêt à répondre", ancien["pret_s"], actuel["pret_s"]),
+               ("première question", ancien["premiere_question_s"], actuel["premiere_question_s"])]
+    for libelle, a, b in lignes:
+        print(f"{libelle:<34} | {ms(a):>9} | {ms(b):>9}")
+    for libelle, cle in (("RSS prêt (Mo)", "rss_pret_mo"), ("RSS après 1re question (Mo)", "rss_apres_question_mo")):
+        a, b = ancien[cle], actuel[cle]
+        print(f"{libelle:<34} | {a or 0:>9.1f} | {b or 0:>9.1f}")
+
+    absents = [module for module, duree in ancien["imports_anciens_s"].items() if duree is None]
+    if absents:
+        print(f"\nNon installés (non mesurés) : {', '.join(absents)}")
+    print("\nImports différés payés par la première question (mode actuel) :")
+    for module, duree in actuel["imports_differes_s"].items():
+        print(f"  {module:<36} {ms(duree):>7} ms")
+    print("\nPaquets les plus coûteux à importer (mode actuel, toute la mesure, durée propre) :")
+    for paquet, duree in actuel["paquets_s"]:
+        print(f"  {paquet:<36} {ms(duree):>7} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de charge : requêtes et uploads en parallèle sur le même Chatbot.
+
+Plusieurs threads posent des questions en boucle (comme le threadpool de FastAPI
+pour /recherche) pendant qu'un autre thread dépose des documents et les fait
+indexer par la file de tâches de l'API (comme /upload), en ajoutant de nouveaux
+documents et en remplaçant des documents existants.
+
+Chaque phrase d'un document contient une marque propre à ce document. Pour
+chaque passage retourné, on vérifie que la marque correspond bien au document
+annoncé : une lecture d'un index à moitié mis à jour (matrice d'une version,
+chunks d'une autre) se traduit par un passage attribué au mauvais document.
+On vérifie aussi qu'aucune requête ne lève d'exception et que la version de
+l'index vue par chaque thread ne recule jamais.
+
+Usage : python benchmarks/stress_concurrence.py [--duree 10] [--lecteurs 8] [--documents 200] [--precharges 100]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+
+from corpus_synthetique import document, questions
+
+import config
+from chatbotcol import Chatbot
+from taches import FileTaches
+
+MARQUE = re.compile(r"marque(\d{6})")
+
+
+def texte_marque(rng, numero, nb_phrases=30):
+    """Document synthétique dont chaque phrase porte la marque du document."""
+    phrases = document(rng, nb_phrases).replace("\n", " ").split(". ")
+    return ". ".join(f"{p} marque{numero:06d}" for p in phrases if p) + "."
+
+
+def creer_bot(dossier):
+    """Chatbot isolé dans dossier (aucun fichier du projet n'est lu ni écrit)."""
+    config.DATA_DIR = os.path.join(dossier, "data")
+    config.STATS_FILE = os.path.join(dossier, "stats.json")
+    config.HISTORY_FILE = os.path.join(dossier, "historique.jsonl")
+    config.INDEX_DIR = os.path.join(dossier, "index")
+    config.EXTRACTION_CACHE_DIR = os.path.join(dossier, "cache")
+    os.makedirs(config.DATA_DIR, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Chatbot()
+
+
+def lecteur(bot, liste, arret, bilan, verrou):
+    requetes = passages = incoherences = erreurs = 0
+    latences = []
+    version = -1
+    i = 0
+    while not arret.is_set():
+        question = liste[i % len(liste)]
+        i += 1
+        debut = time.perf_counter()
+        try:
+            index = bot.index
+            if index.version < version:
+                incoherences += 1
+            version = index.version
+            for passage in bot.rechercher_passages(question, k=5, seuil=0.0):
+                passages += 1
+                marques = set(MARQUE.findall(passage["passage"]))
+                attendue = MARQUE.search(passage["document"]).group(1)
+                if marques != {attendue}:
+                    incoherences += 1
+        except Exception:
+            erreurs += 1
+        latences.append(time.perf_counter() - debut)
+        requetes += 1
+    with verrou:
+        bilan["requetes"] += requetes
+        bilan["passages"] += passages
+        bilan["incoherences"] += incoherences
+        bilan["erreurs"] += erreurs
+        bilan["latences"].extend(latences)
+
+
+def precharger(bot, nb_documents):
+    """Indexe les nb_documents premiers documents avant le début du test."""
+    rng = random.Random(1)
+    for numero in range(nb_documents):
+        with open(os.path.join(config.DATA_DIR, f"marque{numero:06d}.txt"), "w", encoding="utf-8") as f:
+            f.write(texte_marque(rng, numero))
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.charger_documents(config.DATA_DIR)
+
+
+def ecrivain(bot, taches, nb_documents, precharges, arret, bilan):
+    rng = random.Random(3)
+    while not arret.is_set():
+        # nouveaux documents d'abord, puis remplacements de documents existants
+        numero = precharges + bilan["uploads"]
+        if numero >= nb_documents:
+            numero = rng.randrange(nb_documents)
+        chemin = os.path.join(config.DATA_DIR, f"marque{numero:06d}.txt")
+        with open(chemin, "w", encoding="utf-8") as f:
+            f.write(texte_marque(rng, numero))
+        identifiant = taches.soumettre(bot.indexer_fichier, chemin)
+        while taches.statut(identifiant)["statut"] in ("en_attente", "en_cours"):
+            time.sleep(0.001)
+        if taches.statut(identifiant)["statut"] == "erreur":
+            bilan["erreurs_upload"] += 1
+        bilan["uploads"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duree", type=float, default=10.0, help="durée du test en secondes")
+    parser.add_argument("--lecteurs", type=int, default=8, help="nombre de threads de requêtes")
+    parser.add_argument("--documents", type=int, default=200, help="nombre de documents distincts")
+    parser.add_argument("--precharges", type=int, default=100, help="documents indexés avant le début du test")
+    args = parser.parse_args()
+
+    config.INGESTION_WORKERS = 1
+    with tempfile.TemporaryDirectory() as dossier:
+        bot = creer_bot(dossier)
+        precharger(bot, args.precharges)
+        taches = FileTaches()
+        liste = questions(500)
+        arret = threading.Event()
+        verrou = threading.Lock()
+        bilan = {"requetes": 0, "passages": 0, "incoherences": 0, "erreurs": 0, "latences": [],
+                 "uploads": 0, "erreurs_upload": 0}
+        threads = [threading.Thread(target=lecteur, args=(bot, liste, arret, bilan, verrou))
+                   for _ in range(args.lecteurs)]
+        threads.append(threading.Thread(target=ecrivain, args=(bot, taches, args.documents, args.precharges, arret, bilan)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duree)
+            arret.set()
+            for thread in threads:
+                thread.join()
+
+    latences = sorted(bilan["latences"]) or [0.0]
+    print(f"durée              : {args.duree:.1f} s, {args.lecteurs} lecteurs")
+    print(f"uploads indexés    : {bilan['uploads']} (erreurs : {bilan['erreurs_upload']}), "
+          f"version finale de l'index : {bot.index.version}, {len(bot.index)} chunks")
+    print(f"requêtes           : {bilan['requetes']} ({bilan['requetes'] / args.duree:.0f}/s), "
+          f"{bilan['passages']} passages vérifiés")
+    print(f"latence p50 / p99  : {latences[len(latences) // 2] * 1000:.2f} ms / "
+          f"{latences[int(len(latences) * 0.99)] * 1000:.2f} ms")
+    print(f"exceptions         : {bilan['erreurs']}")
+    print(f"incohérences       : {bilan['incoherences']}")
+    if bilan["erreurs"] or bilan["incoherences"] or bilan["erreurs_upload"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks reproductible des chemins critiques du chatbot.
+
+Pour chaque échelle (corpus de documents et FAQ synthétiques, voir ECHELLES),
+mesure dans un processus séparé :
+  - ingestion : Chatbot.charger_documents sur le corpus (documents/s, Mo/s,
+    chunks/s et durée de chaque étape), cache d'extraction vide ;
+  - chemins critiques : débit de decouper_chunks, latence de
+    _repondre_faq_approximative et de rechercher_passages ;
+  - repondre : latences p50/p99 sur un mélange de questions (intentions, FAQ
+    exacte, FAQ avec fautes, documents), globales et par catégorie. Le cache
+    des réponses est désactivé : chaque question parcourt toutes les étapes ;
+  - mémoire : RSS au démarrage, pic pendant l'ingestion, RSS final et taille
+    des matrices de l'index ;
+  - HTTP : débit et latences de /recherche et /recherche/batch sur
+    l'application FastAPI, avec le client de test (dans le processus, sans réseau).
+
+Les corpus sont générés avec des graines fixes : deux exécutions mesurent
+exactement les mêmes données. Les résultats sont écrits en JSON (par défaut
+dans benchmarks/resultats/<commit>.json), avec le commit et l'environnement ;
+--comparer affiche l'écart entre deux fichiers de résultats.
+
+Usage :
+  python benchmarks/suite_performances.py [--echelles petit moyen] [--requetes 1000] [--sortie FICHIER]
+  python benchmarks/suite_performances.py --comparer AVANT.json APRES.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus_synthetique import RACINE, corpus, ecrire_corpus, faq, questions
+from bench_faq_floue import alterer
+
+try:
+    import resource # pic de mémoire du processus (Linux, macOS)
+except ImportError:
+    resource = None
+
+MO = 1024 * 1024
+
+# nombre de documents (de 40 phrases) et de questions de la FAQ de chaque échelle
+ECHELLES = {
+    "petit": {"documents": 50, "faq": 200},
+    "moyen": {"documents": 500, "faq": 2_000},
+    "grand": {"documents": 5_000, "faq": 20_000},
+}
+
+# métriques comparées par --comparer et sens de l'amélioration (+1 : plus grand est meilleur)
+METRIQUES_PRINCIPALES = {
+    "ingestion.documents_par_s": +1,
+    "ingestion.mo_par_s": +1,
+    "chemins.decoupage_mo_par_s": +1,
+    "chemins.faq_approximative_ms.p50": -1,
+    "chemins.rechercher_passages_ms.p50": -1,
+    "chemins.rechercher_passages_ms.p99": -1,
+    "repondre.total_ms.p50": -1,
+    "repondre.total_ms.p99": -1,
+    "memoire.pic_rss_ingestion_mo": -1,
+    "memoire.index_mo": -1,
+    "http.recherche_par_s": +1,
+    "http.batch_questions_par_s": +1,
+}
+
+
+def percentiles(durees):
+    """p50, p99, moyenne et nombre de mesures (en millisecondes) d'une liste de durées en secondes."""
+    if not durees:
+        return None
+    triees = sorted(durees)
+    rang = lambda q: triees[min(len(triees) - 1, int(q * len(triees)))]
+    return {
+        "p50": round(rang(0.50) * 1000, 4),
+        "p99": round(rang(0.99) * 1000, 4),
+        "moyenne": round(sum(triees) / len(triees) * 1000, 4),
+        "mesures": len(triees),
+    }
+
+
+def rss_actuel():
+    """RSS actuel du processus en octets (Linux seulement), ou None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def pic_rss():
+    if resource is None:
+        return None
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def en_mo(octets):
+    return round(octets / MO, 2) if octets is not None else None
+
+
+def configurer(dossier, workers):
+    """Chatbot isolé dans dossier : aucun fichier du projet n'est lu ni écrit."""
+    import config
+    config.DATA_DIR = os.path.join(dossier, "vide")
+    config.STATS_FILE = os.path.join(dossier, "stats.json")
+    config.HISTORY_FILE = os.path.join(dossier, "historique.jsonl")
+    config.INDEX_DIR = os.path.join(dossier, "index")
+    config.EXTRACTION_CACHE_DIR = os.path.join(dossier, "cache")
+    config.KNOWLEDGE_BASE_FILE = os.path.join(dossier, "base.json")
+    config.INGESTION_WORKERS = workers
+    config.QUERY_CACHE_SIZE = 0
+    os.makedirs(config.DATA_DIR, exist_ok=True)
+    return config
+
+
+def ecrire_base(chemin, base_faq):
+    """Base de connaissances : intentions et réponses du projet, FAQ synthétique."""
+    with open(os.path.join(RACINE, "data.json"), encoding="utf-8") as f:
+        donnees = json.load(f)
+    donnees["knowledge_base"] = base_faq
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(donnees, f, ensure_ascii=False)
+
+
+def melange_questions(bot, base_faq, nb, rng):
+    """nb questions (catégorie, texte) : un quart de chaque catégorie, dans un ordre aléatoire fixe."""
+    phrases_intentions = [phrase for phrases in bot.intents.values() for phrase in phrases]
+    cles = list(base_faq)
+    documents = questions(nb, graine=rng.randrange(1 << 30))
+    melange = []
+    for i in range(nb):
+        categorie = ("intention", "faq_exacte", "faq_approximative", "documents")[i % 4]
+        if categorie == "intention":
+            texte = rng.choice(phrases_intentions)
+        elif categorie == "faq_exacte":
+            texte = rng.choice(cles)
+        elif categorie == "faq_approximative":
+            texte = alterer(bot.nettoyer_message(rng.choice(cles)), rng)
+        else:
+            texte = documents[i]
+        melange.append((categorie, texte))
+    rng.shuffle(melange)
+    return melange
+
+
+def chronometrer(fonction, arguments):
+    durees = []
+    for argument in arguments:
+        debut = time.perf_counter()
+        fonction(argument)
+        durees.append(time.perf_counter() - debut)
+    return durees
+
+
+def mesurer_ingestion(bot, dossier_corpus, nb_documents):
+    octets = sum(os.path.getsize(os.path.join(dossier_corpus, nom)) for nom in os.listdir(dossier_corpus))
+    debut = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.charger_documents(dossier_corpus)
+    duree = time.perf_counter() - debut
+    return {
+        "documents": nb_documents,
+        "mo": en_mo(octets),
+        "chunks": len(bot.index),
+        "duree_s": round(duree, 4),
+        "documents_par_s": round(nb_documents / duree, 2),
+        "mo_par_s": round(octets / MO / duree, 3),
+        "chunks_par_s": round(len(bot.index) / duree, 1),
+        "etapes": {etape: round(valeur, 4) for etape, valeur in bot.derniere_ingestion.items()
+                   if isinstance(valeur, float)},
+    }
+
+
+def mesurer_chemins(bot, textes, melange, rng):
+    """Fonctions appelées à chaque document ou à chaque question, mesurées seules."""
+    from chatbotcol import decouper_chunks
+    octets = sum(len(texte.encode("utf-8")) for texte in textes)
+    # meilleur de trois passages : le débit dépend peu de l'activité du reste de la machine
+    durees_decoupage = chronometrer(lambda _: [decouper_chunks(texte) for texte in textes], range(3))
+
+    approximatives = [bot.nettoyer_message(texte) for categorie, texte in melange if categorie == "faq_approximative"]
+    documents = [texte for categorie, texte in melange if categorie == "documents"]
+    # un premier passage pour les calculs paresseux (pondération de l'index, transposée)
+    bot.rechercher_passages(documents[0], k=3)
+    return {
+        "decoupage_mo_par_s": round(octets / MO / min(durees_decoupage), 3),
+        "faq_approximative_ms": percentiles(chronometrer(bot._repondre_faq_approximative, approximatives)),
+        "rechercher_passages_ms": percentiles(chronometrer(lambda q: bot.rechercher_passages(q, k=3), documents)),
+    }
+
+
+def mesurer_repondre(bot, melange):
+    for _, texte in melange[:20]:
+        bot.repondre(texte)
+    par_categorie = {}
+    for categorie, texte in melange:
+        debut = time.perf_counter()
+        bot.repondre(texte, k=3)
+        par_categorie.setdefault(categorie, []).append(time.perf_counter() - debut)
+    resultat = {"total_ms": percentiles([d for durees in par_categorie.values() for d in durees])}
+    for categorie, durees in sorted(par_categorie.items()):
+        resultat[f"{categorie}_ms"] = percentiles(durees)
+    return resultat
+
+
+def mesurer_http(bot, dossier, melange, taille_lot):
+    """Débit de l'API avec le client de test de FastAPI, le bot déjà chargé étant branché sur l'application."""
+    import config
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        return {"indisponible": str(e)}
+    os.environ["API_KEY"] = "benchmark"
+    # le bot créé à l'import de l'API reste vide : on le remplace par celui de la mesure
+    config.INDEX_DIR = os.path.join(dossier, "index_api")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import fastapi_main
+    if fastapi_main.app is None:
+        return {"indisponible": "application FastAPI non disponible"}
+    fastapi_main.bot = bot
+    client = TestClient(fastapi_main.app)
+    entetes = {"X-API-Key": "benchmark"}
+    textes = [texte for _, texte in melange]
+
+    def poser(texte):
+        reponse = client.post("/recherche", json={"question": texte, "k": 3}, headers=entetes)
+        reponse.raise_for_status()
+
+    for texte in textes[:20]:
+        poser(texte)
+    debut = time.perf_counter()
+    durees = chronometrer(poser, textes)
+    duree = time.perf_counter() - debut
+
+    lots = [textes[i:i + taille_lot] for i in range(0, len(textes), taille_lot)]
+    debut_lots = time.perf_counter()
+    for lot in lots:
+        client.post("/recherche/batch", json={"questions": lot, "k": 3}, headers=entetes).raise_for_status()
+    duree_lots = time.perf_counter() - debut_lots
+    return {
+        "recherche_par_s": round(len(textes) / duree, 1),
+        "recherche_ms": percentiles(durees),
+        "taille_lot": taille_lot,
+        "batch_questions_par_s": round(len(textes) / duree_lots, 1),
+    }
+
+
+def mesurer(echelle, dossier, requetes, workers, taille_lot):
+    """Exécuté dans le processus enfant : toutes les mesures d'une échelle, en JSON sur la dernière ligne."""
+    parametres = ECHELLES[echelle]
+    config = configurer(dossier, workers)
+    base_faq = faq(parametres["faq"])
+    ecrire_base(config.KNOWLEDGE_BASE_FILE, base_faq)
+    documents = corpus(parametres["documents"])
+    dossier_corpus = os.path.join(dossier, "corpus")
+    ecrire_corpus(dossier_corpus, documents)
+
+    rss_initial = rss_actuel()
+    debut = time.perf_counter()
+    from chatbotcol import Chatbot
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = Chatbot()
+    demarrage = time.perf_counter() - debut
+    rss_demarrage = rss_actuel()
+
+    ingestion = mesurer_ingestion(bot, dossier_corpus, len(documents))
+    pic_ingestion = pic_rss()
+    rng = random.Random(5)
+    melange = melange_questions(bot, base_faq, requetes, rng)
+    resultat = {
+        "parametres": parametres,
+        "demarrage_s": round(demarrage, 4),
+        "ingestion": ingestion,
+        "chemins": mesurer_chemins(bot, [texte for _, texte in documents], melange, rng),
+        "repondre": mesurer_repondre(bot, melange),
+    }
+    statistiques = bot.index.statistiques()
+    resultat["memoire"] = {
+        "rss_initial_mo": en_mo(rss_initial),
+        "rss_demarrage_mo": en_mo(rss_demarrage),
+        "pic_rss_ingestion_mo": en_mo(pic_ingestion),
+        "rss_final_mo": en_mo(rss_actuel()),
+        "index_mo": en_mo(statistiques["octets"]),
+        "index": statistiques,
+    }
+    resultat["http"] = mesurer_http(bot, dossier, melange, taille_lot)
+    bot.journal.vider()
+    print(json.dumps(resultat))
+
+
+def environnement():
+    def git(*arguments):
+        try:
+            return subprocess.run(["git", *arguments], cwd=RACINE, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    versions = {}
+    for module in ("numpy", "scipy", "sklearn", "fastapi"):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "modifications_non_commitees": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def valeur(resultats, echelle, chemin):
+    noeud = resultats.get("echelles", {}).get(echelle, {})
+    for cle in chemin.split("."):
+        if not isinstance(noeud, dict) or cle not in noeud:
+            return None
+        noeud = noeud[cle]
+    return noeud
+
+
+def comparer(avant, apres):
+    with open(avant, encoding="utf-8") as f:
+        reference = json.load(f)
+    with open(apres, encoding="utf-8") as f:
+        nouveau = json.load(f)
+    print(f"avant : {reference['environnement']['commit']}  ({avant})")
+    print(f"après : {nouveau['environnement']['commit']}  ({apres})")
+    print(f"{'échelle':>8} | {'métrique':<36} | {'avant':>11} | {'après':>11} | {'écart':>8}")
+    print("-" * 86)
+    for echelle in nouveau["echelles"]:
+        for chemin, sens in METRIQUES_PRINCIPALES.items():
+            a, b = valeur(reference, echelle, chemin), valeur(nouveau, echelle, chemin)
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+                continue
+            ecart = (b - a) / a * 100 if a else 0.0
+            # repère les écarts de plus de 10 % dans le mauvais sens
+            alerte = " !" if ecart * sens < -10 else ""
+            print(f"{echelle:>8} | {chemin:<36} | {a:>11.3f} | {b:>11.3f} | {ecart:>+7.1f}%{alerte}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelles", nargs="+", choices=list(ECHELLES), default=["petit", "moyen"])
+    parser.add_argument("--requetes", type=int, default=1000, help="questions posées par mesure de latence")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processus d'extraction (1 par défaut : mesures comparables d'une machine à l'autre)")
+    parser.add_argument("--taille-lot", type=int, default=50, help="questions par appel de /recherche/batch")
+    parser.add_argument("--sortie", help="fichier JSON des résultats (par défaut benchmarks/resultats/<commit>.json)")
+    parser.add_argument("--comparer", nargs=2, metavar=("AVANT", "APRES"))
+    parser.add_argument("--mesurer", choices=list(ECHELLES), help=argparse.SUPPRESS)
+    parser.add_argument("--dossier", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.comparer:
+        comparer(*args.comparer)
+        return
+    if args.mesurer:
+        mesurer(args.mesurer, args.dossier, args.requetes, args.workers, args.taille_lot)
+        return
+
+    resultats = {"environnement": environnement(), "requetes": args.requetes, "workers": args.workers, "echelles": {}}
+    for echelle in args.echelles:
+        print(f"Échelle {echelle} : {ECHELLES[echelle]['documents']} documents, {ECHELLES[echelle]['faq']} questions de FAQ...")
+        # un processus par échelle : les mesures de mémoire ne dépendent pas des échelles précédentes
+        with tempfile.TemporaryDirectory() as dossier:
+            sortie = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mesurer", echelle, "--dossier", dossier,
+                 "--requetes", str(args.requetes), "--workers", str(args.workers),
+                 "--taille-lot", str(args.taille_lot)],
+                capture_output=True, text=True,
+            )
+        if sortie.returncode != 0:
+            print(sortie.stderr)
+            raise SystemExit(f"Échec des mesures de l'échelle {echelle}")
+        mesures = resultats["echelles"][echelle] = json.loads(sortie.stdout.strip().splitlines()[-1])
+        print(f"  ingestion {mesures['ingestion']['documents_par_s']} documents/s, "
+              f"repondre p50/p99 {mesures['repondre']['total_ms']['p50']} / {mesures['repondre']['total_ms']['p99']} ms, "
+              f"pic RSS {mesures['memoire']['pic_rss_ingestion_mo']} Mo, "
+              f"HTTP {mesures['http'].get('recherche_par_s', '-')} requêtes/s")
+
+    commit = (resultats["environnement"]["commit"] or "sans_commit")[:12]
+    chemin = args.sortie or os.path.join(RACINE, "benchmarks", "resultats", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, ensure_ascii=False, indent=2)
+    print(f"Résultats écrits dans {chemin}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Score BM25 des chunks, calculé sur un index inversé précalculé.
+
+Le score TF-IDF (produit scalaire de vecteurs normalisés) ne tient pas compte
+de la longueur des chunks au-delà de la normalisation L2. BM25 sature la
+fréquence d'un terme (paramètre k1) et la rapporte à la longueur du chunk
+comparée à la longueur moyenne (paramètre b) :
+
+    impact(t, c) = idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * longueur(c) / longueur_moyenne))
+    idf(t) = log(1 + (n - df + 0.5) / (df + 0.5))
+
+L'impact de chaque couple (terme, chunk) est calculé une fois pour toutes à la
+construction de l'index (il ne dépend pas de la question) et rangé dans les
+listes inversées : pour chaque terme, les numéros des chunks qui le contiennent
+(triés) et leurs impacts, dans trois tableaux contigus (format CSR, terme x chunk).
+Le maximum des impacts de chaque terme est gardé à part : c'est la borne
+supérieure de sa contribution au score d'un chunk.
+
+La recherche suit l'algorithme MaxScore : les termes de la question sont pris
+par borne décroissante, et leurs listes sont parcourues entièrement tant qu'un
+chunk absent des listes déjà lues peut encore entrer dans les k meilleurs. Dès
+que la somme des bornes des termes restants est inférieure au k-ième score
+partiel, ces termes ne servent plus qu'à compléter le score des candidats déjà
+trouvés (recherche dichotomique dans leurs listes), et les candidats qui ne
+peuvent plus atteindre les k meilleurs sont écartés au fur et à mesure. Le
+travail dépend donc des listes des termes de la question, pas de la taille de
+l'index.
+
+Les scores retournés sont divisés par la somme des bornes des termes de la
+question : ils sont compris entre 0 et 1, comme les scores TF-IDF, et peuvent
+être combinés avec eux (voir indexation.IndexIncremental.rechercher_hybride).
+
+Dans un index réparti (voir repartition.py), chaque partition calcule ses
+impacts avec les fréquences documentaires et la longueur moyenne de toutes les
+partitions, et normalise ses scores par les bornes de toutes les partitions
+(normes) : les scores de deux partitions sont alors comparables, et égaux à
+ceux d'un index unique contenant tous les chunks.
+
+Un index dont les poids ne sont pas recalculés à chaque ajout est fait de
+plusieurs segments (voir indexation.IndexIncremental._rafraichir), chacun avec
+ses propres listes, construites avec les mêmes statistiques : SegmentsBM25 les
+interroge toutes et normalise les scores par les bornes de tous les segments.
+"""
+
+import copy
+
+import numpy as np
+
+
+class PostingsBM25:
+    """Listes inversées (terme -> chunks) pondérées par l'impact BM25 de chaque couple."""
+
+    def __init__(self, indptr, indices, impacts, maximums, nb_chunks, k1, b, normes=None):
+        # listes du terme t : indices[indptr[t]:indptr[t + 1]] (chunks triés) et impacts correspondants
+        self.indptr = indptr
+        self.indices = indices
+        self.impacts = impacts
+        # plus grand impact de chaque terme (0 pour un terme absent de l'index)
+        self.maximums = maximums
+        # bornes de chaque terme utilisées pour normaliser les scores : les maximums de cet index,
+        # ou ceux de toutes les partitions d'un index réparti
+        self.normes = maximums if normes is None else normes
+        self.nb_chunks = nb_chunks
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def construire(cls, comptes, k1, b, globales=None, normes=None):
+        """
+        Construit les listes à partir de la matrice des comptes bruts (chunks x termes, CSR).
+        globales : (fréquences documentaires, nombre de chunks, longueur moyenne) de toutes les
+        partitions d'un index réparti, à la place de celles de comptes.
+        """
+        nb_chunks, nb_termes = comptes.shape
+        longueurs = np.asarray(comptes.sum(axis=1), dtype=np.float64).ravel()
+        listes = comptes.T.tocsr()
+        listes.sort_indices()
+        df = np.diff(listes.indptr)
+        if globales is None:
+            df_idf, nb_idf = df, nb_chunks
+            longueur_moyenne = longueurs.mean() if nb_chunks else 1.0
+        else:
+            df_idf, nb_idf, longueur_moyenne = globales
+        idf = np.log1p((nb_idf - df_idf + 0.5) / (df_idf + 0.5))
+        tf = listes.data.astype(np.float64)
+        saturation = k1 * (1.0 - b + b * longueurs[listes.indices] / max(longueur_moyenne, 1e-12))
+        impacts = (np.repeat(idf, df) * tf * (k1 + 1.0) / (tf + saturation)).astype(np.float32)
+        maximums = np.zeros(nb_termes, dtype=np.float32)
+        non_vides = df > 0
+        if non_vides.any():
+            # les listes vides ne séparent pas deux segments : reduceat sur les seuls débuts de listes non vides
+            maximums[non_vides] = np.maximum.reduceat(impacts, listes.indptr[:-1][non_vides])
+        return cls(listes.indptr, listes.indices.astype(np.int32, copy=False), impacts, maximums, nb_chunks, k1, b,
+                   normes)
+
+    def avec_normes(self, normes):
+        """Mêmes listes (tableaux partagés), normalisées par normes (None : les maximums de ces listes)."""
+        if normes is None and self.normes is self.maximums:
+            return self
+        autre = copy.copy(self)
+        autre.normes = self.maximums if normes is None else normes
+        return autre
+
+    def _termes(self, termes, poids):
+        """
+        Termes de la question présents dans l'index, par borne décroissante, avec leurs poids et bornes,
+        et le dénominateur des scores normalisés (somme des normes des termes de la question).
+        """
+        termes = np.asarray(termes)
+        poids = np.asarray(poids, dtype=np.float64)
+        bornes = poids * self.maximums[termes]
+        total = bornes.sum() if self.normes is self.maximums else (poids * self.normes[termes]).sum()
+        ordre = np.argsort(-bornes, kind="stable")
+        ordre = ordre[bornes[ordre] > 0]
+        return termes[ordre], poids[ordre], bornes[ordre], total
+
+    def _contributions(self, candidats, terme, poids):
+        """Contribution de terme au score de chaque candidat (triés) : recherche dichotomique dans sa liste."""
+        debut, fin = self.indptr[terme], self.indptr[terme + 1]
+        chunks = self.indices[debut:fin]
+        positions = np.minimum(np.searchsorted(chunks, candidats), len(chunks) - 1)
+        return np.where(chunks[positions] == candidats, poids * self.impacts[debut:fin][positions], 0.0)
+
+    def candidats(self, termes, poids, k, seuil=0.0, morts=None):
+        """
+        Candidats aux k meilleurs scores pour une question (termes hachés et nombre
+        d'occurrences de chacun) : retourne (indices, scores normalisés) de chunks
+        parmi lesquels se trouvent tous les k meilleurs dont le score dépasse seuil
+        (la sélection finale est faite par indexation.meilleurs_scores). Les chunks
+        marqués dans morts (supprimés) ne sont jamais candidats.
+        """
+        termes, poids, bornes, total = self._termes(termes, poids)
+        if not len(termes) or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        # restes[i] : borne du score apporté par les termes qui suivent le i-ème
+        restes = np.concatenate((np.cumsum(bornes[::-1])[::-1][1:], [0.0]))
+        plancher = seuil * total
+        # scores partiels des seuls chunks rencontrés : candidats (triés) et partiels (dans le même ordre)
+        candidats = np.zeros(0, dtype=np.int64)
+        partiels = np.zeros(0)
+        kieme = 0.0
+        i = 0
+        # termes "essentiels" : leurs listes sont lues en entier
+        while i < len(termes):
+            debut, fin = self.indptr[termes[i]], self.indptr[termes[i] + 1]
+            chunks = self.indices[debut:fin]
+            impacts = poids[i] * self.impacts[debut:fin]
+            if morts is not None:
+                vivants = ~morts[chunks]
+                chunks, impacts = chunks[vivants], impacts[vivants]
+            # fusion de deux listes triées : les chunks déjà rencontrés complètent leur score, les autres sont insérés
+            positions = np.searchsorted(candidats, chunks)
+            connus = positions < len(candidats)
+            connus[connus] = candidats[positions[connus]] == chunks[connus]
+            partiels[positions[connus]] += impacts[connus]
+            nouveaux = ~connus
+            candidats = np.insert(candidats, positions[nouveaux], chunks[nouveaux])
+            partiels = np.insert(partiels, positions[nouveaux], impacts[nouveaux])
+            i += 1
+            if len(candidats) >= k:
+                kieme = np.partition(partiels, len(partiels) - k)[len(partiels) - k]
+            # un chunk absent des listes lues ne peut plus dépasser ni le k-ième score, ni le seuil
+            if restes[i - 1] < kieme or restes[i - 1] <= plancher:
+                break
+        # termes restants : ils ne font que compléter le score des candidats qui peuvent encore être retenus
+        for j in range(i, len(termes)):
+            possibles = partiels + restes[j - 1]
+            gardes = (possibles >= kieme) & (possibles > plancher)
+            candidats, partiels = candidats[gardes], partiels[gardes]
+            if not len(candidats):
+                break
+            partiels = partiels + self._contributions(candidats, termes[j], poids[j])
+            if len(candidats) >= k:
+                kieme = max(kieme, np.partition(partiels, len(partiels) - k)[len(partiels) - k])
+        return candidats, partiels / total
+
+    def scores(self, termes, poids, candidats):
+        """Scores normalisés exacts de chunks quelconques (candidats triés) pour une question."""
+        termes, poids, _, total = self._termes(termes, poids)
+        resultat = np.zeros(len(candidats))
+        if not len(termes) or not len(candidats):
+            return resultat
+        for terme, p in zip(termes, poids):
+            resultat += self._contributions(candidats, terme, p)
+        return resultat / total
+
+    def figer(self):
+        for tableau in (self.indptr, self.indices, self.impacts, self.maximums, self.normes):
+            if tableau.flags.writeable:
+                tableau.flags.writeable = False
+
+    def description(self):
+        """Paramètres qui doivent correspondre entre un instantané sur disque et la configuration courante."""
+        return {"k1": self.k1, "b": self.b}
+
+    def tableaux(self):
+        """Tableaux à sauvegarder avec l'instantané de l'index (nom -> tableau)."""
+        return {"bm25_indptr": self.indptr, "bm25_indices": self.indices,
+                "bm25_impacts": self.impacts, "bm25_maximums": self.maximums}
+
+    @classmethod
+    def depuis_tableaux(cls, description, charger, nb_chunks):
+        """Recrée les listes à partir des tableaux d'un instantané ; charger(nom) retourne le tableau (en mmap)."""
+        return cls(charger("bm25_indptr"), charger("bm25_indices"), charger("bm25_impacts"),
+                   charger("bm25_maximums"), nb_chunks, description["k1"], description["b"])
+
+    def octets(self):
+        return int(sum(tableau.nbytes for tableau in (self.indptr, self.indices, self.impacts, self.maximums)))
+
+
+class SegmentsBM25:
+    """
+    Listes BM25 de plusieurs segments consécutifs de chunks (les chunks de chaque segment sont
+    numérotés à partir de 0 dans ses listes), construites avec les mêmes statistiques. Les scores
+    sont normalisés par le maximum des bornes de tous les segments : ils sont égaux à ceux de
+    listes construites d'un seul tenant avec ces statistiques.
+    """
+
+    def __init__(self, segments, debuts, normes=None):
+        self.maximums = np.maximum.reduce([segment.maximums for segment in segments])
+        self.normes = self.maximums if normes is None else normes
+        # premier chunk de chaque segment dans l'index
+        self.debuts = np.asarray(debuts, dtype=np.int64)
+        self.segments = [segment.avec_normes(self.normes) for segment in segments]
+        self.nb_chunks = sum(segment.nb_chunks for segment in segments)
+        self.k1, self.b = segments[0].k1, segments[0].b
+
+    def avec_normes(self, normes):
+        return SegmentsBM25(self.segments, self.debuts, normes)
+
+    def candidats(self, termes, poids, k, seuil=0.0, morts=None):
+        """
+        Comme PostingsBM25.candidats : les k meilleurs de l'index sont parmi les k meilleurs de
+        chaque segment, et les candidats de tous les segments sont retournés.
+        """
+        indices, scores = [], []
+        for debut, segment in zip(self.debuts, self.segments):
+            morts_segment = morts[debut:debut + segment.nb_chunks] if morts is not None else None
+            candidats, valeurs = segment.candidats(termes, poids, k, seuil, morts_segment)
+            indices.append(candidats + debut)
+            scores.append(valeurs)
+        return np.concatenate(indices), np.concatenate(scores)
+
+    def scores(self, termes, poids, candidats):
+        """Scores exacts de chunks quelconques (candidats triés), chacun calculé par son segment."""
+        resultat = np.zeros(len(candidats))
+        for debut, segment in zip(self.debuts, self.segments):
+            a, b = np.searchsorted(candidats, (debut, debut + segment.nb_chunks))
+            if b > a:
+                resultat[a:b] = segment.scores(termes, poids, candidats[a:b] - debut)
+        return resultat
+
+    def figer(self):
+        for segment in self.segments:
+            segment.figer()
+        if self.maximums.flags.writeable:
+            self.maximums.flags.writeable = False
+
+    def description(self):
+        return self.segments[0].description()
+
+    def octets(self):
+        return int(sum(segment.octets() for segment in self.segments) + self.maximums.nbytes)
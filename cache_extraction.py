@@ -0,0 +1,110 @@
+"""
+Cache d'extraction des documents, indexé par le contenu des fichiers.
+
+L'extraction du texte (PyMuPDF, python-docx) est l'étape la plus coûteuse de
+l'ingestion. Chaque résultat (chunks et leurs positions dans le document) est stocké sur disque sous
+l'empreinte SHA-256 du fichier source : un fichier ré-uploadé, renommé ou relu
+au redémarrage n'est donc jamais ré-extrait. La taille totale du cache est
+bornée, les entrées les moins récemment utilisées sont supprimées en premier.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class CacheExtraction:
+    def __init__(self, dossier, taille_max_octets):
+        self.dossier = dossier
+        self.taille_max_octets = taille_max_octets
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # empreinte -> taille du fichier de cache, de la moins à la plus récemment utilisée
+        self._entrees = OrderedDict()
+        self._taille_totale = 0
+        self._verrou = threading.Lock()
+        os.makedirs(dossier, exist_ok=True)
+        self._scanner()
+
+    def _chemin(self, empreinte):
+        return os.path.join(self.dossier, f"{empreinte}.json")
+
+    def _scanner(self):
+        """Reconstruit l'ordre LRU à partir des dates de dernière utilisation des fichiers."""
+        fichiers = []
+        for nom in os.listdir(self.dossier):
+            if not nom.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.dossier, nom))
+            except OSError:
+                continue
+            fichiers.append((stat.st_mtime, nom[:-len(".json")], stat.st_size))
+        for _, empreinte, taille in sorted(fichiers):
+            self._entrees[empreinte] = taille
+            self._taille_totale += taille
+
+    def lire(self, empreinte):
+        """Retourne {"chunks", "sources", "taille_chunk"} pour cette empreinte, ou None."""
+        with self._verrou:
+            if empreinte not in self._entrees:
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(empreinte)
+        try:
+            with open(self._chemin(empreinte), "r", encoding="utf-8") as f:
+                entree = json.load(f)
+            os.utime(self._chemin(empreinte)) # la date du fichier sert d'ordre LRU au prochain démarrage
+        except (OSError, ValueError):
+            with self._verrou:
+                self._oublier(empreinte)
+                self.misses += 1
+            return None
+        with self._verrou:
+            self.hits += 1
+        return entree
+
+    def ecrire(self, empreinte, chunks, sources, taille_chunk):
+        """Ajoute une entrée puis évince les plus anciennes si la taille maximale est dépassée."""
+        donnees = json.dumps({"chunks": chunks, "sources": sources, "taille_chunk": taille_chunk}, ensure_ascii=False)
+        taille = len(donnees.encode("utf-8"))
+        if taille > self.taille_max_octets:
+            return
+        temporaire = f"{self._chemin(empreinte)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            f.write(donnees)
+        os.replace(temporaire, self._chemin(empreinte))
+        with self._verrou:
+            self._oublier(empreinte, supprimer=False)
+            self._entrees[empreinte] = taille
+            self._taille_totale += taille
+            while self._taille_totale > self.taille_max_octets and len(self._entrees) > 1:
+                plus_ancienne = next(iter(self._entrees))
+                self._oublier(plus_ancienne)
+                self.evictions += 1
+
+    def _oublier(self, empreinte, supprimer=True):
+        """Retire une entrée de l'ordre LRU (et son fichier si supprimer). Verrou déjà tenu."""
+        taille = self._entrees.pop(empreinte, None)
+        if taille is not None:
+            self._taille_totale -= taille
+        if supprimer:
+            try:
+                os.remove(self._chemin(empreinte))
+            except OSError:
+                pass
+
+    def statistiques(self):
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taux_hits": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "entrees": len(self._entrees),
+                "taille_octets": self._taille_totale,
+                "taille_max_octets": self.taille_max_octets,
+            }
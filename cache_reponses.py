@@ -0,0 +1,89 @@
+"""
+Cache en mémoire des réponses du chatbot (LRU avec durée de vie).
+
+Les entrées sont rangées sous la question nettoyée (voir Chatbot.nettoyer_message)
+et les paramètres de la recherche. Chaque lecture indique la génération des
+données utilisées pour répondre (version de l'index des documents, version de
+la base de connaissances) : dès qu'elle change, tout le cache est vidé, une
+réponse calculée sur d'anciennes données n'est donc jamais resservie.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheReponses:
+    def __init__(self, taille_max, duree_vie_s):
+        self.taille_max = taille_max
+        self.duree_vie_s = duree_vie_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # clé -> (date d'expiration, valeur), de la moins à la plus récemment utilisée
+        self._entrees = OrderedDict()
+        self._generation = None
+        self._verrou = threading.Lock()
+
+    def _changer_generation(self, generation):
+        """Vide le cache si les données ont changé depuis les entrées enregistrées. Verrou déjà tenu."""
+        if generation != self._generation:
+            if self._entrees:
+                self._entrees.clear()
+                self.invalidations += 1
+            self._generation = generation
+
+    def lire(self, cle, generation, valide=None):
+        """
+        Valeur enregistrée sous cle pour cette génération, ou None. valide(valeur) permet
+        à l'appelant de refuser une entrée (comptée alors comme un miss).
+        """
+        if not self.taille_max:
+            return None
+        with self._verrou:
+            self._changer_generation(generation)
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[0] < time.monotonic():
+                del self._entrees[cle]
+                self.expirations += 1
+                entree = None
+            if entree is None or (valide is not None and not valide(entree[1])):
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return entree[1]
+
+    def ecrire(self, cle, generation, valeur):
+        if not self.taille_max:
+            return
+        with self._verrou:
+            # réponse calculée sur des données remplacées entre-temps : pas enregistrée
+            if generation != self._generation:
+                return
+            self._entrees[cle] = (time.monotonic() + self.duree_vie_s, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def statistiques(self):
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taux_hits": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entrees": len(self._entrees),
+                "taille_max": self.taille_max,
+                "duree_vie_s": self.duree_vie_s,
+            }
@@ -2,71 +2,213 @@ import json  # lib de gestion des fichiers json
 import os  #lib de gestion des modifications systeme
 from datetime import datetime # gestion des dates
 import random # lib de gestion des choix aléatoires
-import difflib # lib de gestion des similarités de chaînes
-import unicodedata # lib de gestion des caractères unicode
-import re # lib de gestion des expressions régulières
+import time # mesure des durées des étapes d'ingestion
+import threading # verrou des écritures dans l'index
+import multiprocessing # détection des processus enfants (pas de pool imbriqué)
+from concurrent.futures import ProcessPoolExecutor # pool de processus pour l'extraction parallèle
 import config # Importation de la configuration centralisée contenue dans le fichier config.py
+from cache_extraction import CacheExtraction # cache des textes extraits, indexé par empreinte de fichier
+from journal import JournalInteractions # journal des interactions en ajout seul
+from statistiques import CompteurStatistiques # compteurs de questions en mémoire, écrits par lots
+from recherche_floue import IndexFlou # index pour la recherche approximative dans la FAQ
+from intentions import AutomateIntentions # détection de toutes les intentions en un seul passage
+from decoupage import decouper_segments # découpage des documents en chunks au fil de la lecture
+from cache_reponses import CacheReponses # cache des réponses aux questions déjà posées
+from normalisation import nettoyer # normalisation des questions en une passe (tables de traduction précalculées)
+from metriques import DUREE_ETAPE, DUREE_LOT, DUREE_INGESTION # histogrammes des durées exportés sur /metrics
+from dependances import disponible, importer, prechauffer # import des bibliothèques lourdes à leur première utilisation
 
 # Gestion des imports avec gestion d'erreurs
 MODULES_MANQUANTS = []
-#ici, chacune des bibliothèques externes utilisées est importée dans un bloc try-except
-#pour capturer les erreurs d'importation et enregistrer les modules manquants.
-try:
-    import docx # bibliothèque pour la manipulation des fichiers Word
-except ImportError:
+#les bibliothèques lourdes (python-docx, scikit-learn, PyMuPDF, spaCy) ne sont pas importées ici:
+#on vérifie seulement qu'elles sont installées, elles sont importées à leur première utilisation
+#(voir dependances.py), ce qui raccourcit le démarrage de chaque worker.
+if not disponible("docx"): # bibliothèque pour la manipulation des fichiers Word
     MODULES_MANQUANTS.append("python-docx")
-    docx = None
 
-try:# Utilisation des conceptes de Machine Learning pour le traitement du langage naturel
-    from sklearn.feature_extraction.text import TfidfVectorizer # bibliothèque pour le traitement du langage naturel et l'extraction de caractéristiques TF-IDF(Term Frequency-Inverse Document Frequency)
-except ImportError:
+# Utilisation des conceptes de Machine Learning pour le traitement du langage naturel
+# (scikit-learn, pour l'extraction de caractéristiques TF-IDF, est importé par l'index à la première vectorisation)
+if disponible("sklearn"):
+    from indexation import IndexIncremental, signature_fichier, signature_manifeste # index TF-IDF incrémental (voir indexation.py)
+    from repartition import IndexReparti # index réparti entre plusieurs processus (voir repartition.py)
+else:
     MODULES_MANQUANTS.append("scikit-learn")
-    TfidfVectorizer = None
+    IndexIncremental = None
+    IndexReparti = None
+    signature_fichier = None
+    signature_manifeste = None
 
-try:
-    import fitz # bibliothèque PyMuPDF pour la manipulation des fichiers PDF
-except ImportError:
+if not disponible("fitz"): # bibliothèque PyMuPDF pour la manipulation des fichiers PDF
     MODULES_MANQUANTS.append("PyMuPDF")
-    fitz = None
 
-try:
-    import spacy # bibliothèque pour le traitement avancé du langage naturel
-except ImportError:
+if not disponible("spacy"): # bibliothèque pour le traitement avancé du langage naturel
     MODULES_MANQUANTS.append("spacy")
-    spacy = None
 #un message d'avertissement est affiché si des modules sont manquants, le message comportant la liste des modules non disponibles.
 if MODULES_MANQUANTS:
     print(f"Attention: Modules manquants détectés: {', '.join(MODULES_MANQUANTS)}")
 
+# Fonctions de lecture de chaque type de fichier: le texte est produit morceau par morceau
+# (bloc du fichier texte, paragraphe Word, page PDF) avec son unité d'origine,
+# sans jamais construire le texte complet du document
+def segments_txt(chemin, taille_bloc=1 << 20):
+    with open(chemin, "r", encoding="utf-8") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), ""):
+            yield bloc, None
+
+def segments_word(chemin):
+    doc = importer("docx").Document(chemin)
+    for numero, para in enumerate(doc.paragraphs, start=1):
+        #les paragraphes sont séparés par un retour à la ligne
+        yield ("\n" if numero > 1 else "") + para.text, ("paragraphe", numero)
+
+def segments_pdf(chemin):
+    with importer("fitz").open(chemin) as doc:
+        for numero, page in enumerate(doc, start=1):
+            yield page.get_text(), ("page", numero)
+
+# extension -> (libellé, fonction de lecture, module requis)
+TYPES_FICHIERS = {
+    '.txt': ("texte", segments_txt, True),
+    '.pdf': ("PDF", segments_pdf, disponible("fitz")),
+    '.docx': ("Word", segments_word, disponible("docx")),
+}
+MODULE_REQUIS = {'.pdf': "PyMuPDF", '.docx': "python-docx"}
+
+# score minimal d'un passage quand la requête n'indique pas de seuil, selon la méthode de recherche
+SEUILS_PAR_DEFAUT = {
+    "tfidf": lambda: config.TFIDF_THRESHOLD,
+    "bm25": lambda: config.BM25_THRESHOLD,
+    "dense": lambda: config.DENSE_THRESHOLD,
+    # mode "hybride" : même combinaison que les scores des deux méthodes de config.HYBRID_METHODS
+    "hybride": lambda: (config.HYBRID_WEIGHT * SEUILS_PAR_DEFAUT[config.HYBRID_METHODS[0]]()
+                        + (1 - config.HYBRID_WEIGHT) * SEUILS_PAR_DEFAUT[config.HYBRID_METHODS[1]]()),
+}
+
+# modules utilisés pour répondre aux questions, importés en arrière-plan après le démarrage (config.PRELOAD_IMPORTS)
+MODULES_PRECHAUFFES = ("sklearn.feature_extraction.text", "sklearn.preprocessing")
+
+#ici, le texte est découpé en chunks basés sur des phrases
+#chaque chunk comprend un certain nombre de phrases défini par taille_fenetre (voir decoupage.py)
+def decouper_chunks(text, taille_fenetre=config.CHUNK_SIZE):
+    return [chunk for chunk, _ in decouper_segments([(text, None)], taille_fenetre)]
+
+#mesure le temps passé à lire les segments (extraction), le reste du temps étant celui du découpage
+def _chronometrer(segments, durees):
+    segments = iter(segments)
+    while True:
+        debut = time.perf_counter()
+        try:
+            segment = next(segments)
+        except StopIteration:
+            durees["extraction"] += time.perf_counter() - debut
+            return
+        durees["extraction"] += time.perf_counter() - debut
+        yield segment
+
+#Étape d'ingestion exécutée dans les processus du pool : lecture et découpage d'un fichier, au fil de l'eau.
+#Elle est définie au niveau du module pour pouvoir être envoyée aux processus enfants.
+def traiter_fichier(chemin, taille_fenetre=config.CHUNK_SIZE):
+    extension = os.path.splitext(chemin)[1].lower()
+    _, lire, module_installe = TYPES_FICHIERS[extension]
+    if not module_installe:
+        return {"erreur": f"Module {MODULE_REQUIS[extension]} non disponible."}
+    try:
+        durees = {"extraction": 0.0}
+        debut = time.perf_counter()
+        chunks, sources = [], []
+        for chunk, source in decouper_segments(_chronometrer(lire(chemin), durees), taille_fenetre):
+            chunks.append(chunk)
+            sources.append(source)
+        return {
+            "chunks": chunks,
+            "sources": sources,
+            "extraction": durees["extraction"],
+            "decoupage": time.perf_counter() - debut - durees["extraction"],
+        }
+    except Exception as e:
+        return {"erreur": f"Erreur lecture {os.path.basename(chemin)}: {e}"}
+
+# Réponses utilisées si data.json ne contient pas de section "responses" (anciennes bases de connaissances)
+REPONSES_PAR_DEFAUT = {
+    "saluer": ["Bonjour ! Que puis-je faire pour vous?",
+               "Salut, comment puis-je vous aider?",
+               "Bonjour, en quoi puis-je vous être utile?"],
+    "comment_cv": ["Je vais bien, merci. Et vous?",
+                   "Je suis toujours en forme pour vous aider.",
+                   "Tout va bien, prêt à vous assister."],
+    "heure": ["Il est {maintenant}"],
+    "remercier": ["Avec plaisir!", "Il n'y a pas de quoi.", "C'est un plaisir de vous aider."],
+    "aurevoir": ["À bientôt !", "Au revoir, à très vite."],
+}
+
 # Classe principale du chatbot(celle ci gere la logique de traitement des questions et des réponses)
 class Chatbot:
     def __init__(self):
+        #durées (en secondes) de chaque étape de l'initialisation, pour le rapport de démarrage
+        self.durees_demarrage = {}
+        debut_etape = [time.perf_counter()]
+        def noter(etape):
+            maintenant = time.perf_counter()
+            self.durees_demarrage[etape] = maintenant - debut_etape[0]
+            debut_etape[0] = maintenant
+
         #--- Chargement des données de la base de connaissances ---
-        self.intents, self.knowledge_base = self._load_data(config.KNOWLEDGE_BASE_FILE, is_base=True)
+        #numéro de version de la base de connaissances, incrémenté à chaque rechargement (voir recharger_base)
+        self.generation_base = -1
+        self.recharger_base()
+        noter("base_connaissances")
+        #cache des réponses, vidé dès que la base de connaissances ou l'index des documents change
+        self.cache_reponses = CacheReponses(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
         #
         self.question_en_attente = None
-        #objet pour le chargement et le stockage des statistiques
-        self.statistiques_questions = self._load_stats()
-        #objet pour stocker le contenu des documents chargés
-        self.document_content = ""
-        # --- Initialisation de SpaCy ---
-        if spacy is not None:
-            try:
-                self.nlp = spacy.load("fr_core_news_sm")
-            except OSError:
-                print("Modèle SpaCy non trouvé.")
-                self.nlp = None
-        else:
-            self.nlp = None
+        #objet pour le chargement et le stockage des statistiques (en mémoire, écrites par lots dans config.STATS_FILE)
+        self.statistiques = CompteurStatistiques(
+            config.STATS_FILE,
+            flush_toutes=config.STATS_FLUSH_EVERY,
+            intervalle_flush=config.STATS_FLUSH_INTERVAL,
+            retention_s=config.STATS_WINDOW_RETENTION_HOURS * 3600,
+        )
+        self.statistiques_questions = self.statistiques.totaux
+        #journal des interactions (écrit par lots en arrière-plan)
+        self.journal = JournalInteractions(
+            config.HISTORY_FILE,
+            config.HISTORY_MAX_MB * 1024 * 1024,
+            nb_archives=config.HISTORY_BACKUPS,
+            intervalle_flush=config.HISTORY_FLUSH_INTERVAL,
+            taille_lot=config.HISTORY_BATCH_SIZE,
+            anciens=config.LEGACY_HISTORY_FILES,
+        )
+        noter("statistiques_journal")
+        #durées par étape (extraction, découpage, vectorisation) du dernier chargement de documents
+        self.derniere_ingestion = {}
+        #en mode "lecteur" (plusieurs workers), l'index est construit par un autre processus et partagé en mmap
+        self.lecture_seule = config.INDEX_ROLE == "lecteur"
+        # --- SpaCy ---
+        # le modèle est chargé au premier accès à self.nlp (voir la propriété nlp), pas au démarrage
+        self._nlp = None
 
         # --- Logique TF-IDF ---
 
-        # objet pour le vectoriseur TF-IDF
-        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2)) if TfidfVectorizer else None
-        # matrice des documents
-        self.doc_matrix = None
-        # liste des chunks de documents
-        self.doc_chunks = []
+        # cache des extractions : un fichier déjà vu (même contenu) n'est jamais ré-extrait
+        self.cache_extraction = CacheExtraction(config.EXTRACTION_CACHE_DIR, config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+        # génération de l'instantané sur disque (relevée avant le chargement) et date de la dernière vérification (mode "lecteur")
+        self._manifeste_index = signature_manifeste(config.INDEX_DIR) if signature_manifeste else None
+        self._verification_index = time.monotonic()
+        # index TF-IDF incrémental : chaque document est vectorisé seul puis ajouté à la matrice
+        # (repris de l'instantané sur disque s'il existe)
+        self.index = self._charger_index()
+        # compteur utilisé pour nommer les contenus ajoutés sans nom de fichier
+        self._contenus_anonymes = 0
+        # les modifications de l'index sont faites sur une copie, publiée ensuite d'un seul coup (voir _publier_index)
+        self._verrou_index = threading.Lock()
+        # sauvegardes de l'index sur disque, une à la fois (voir sauvegarder_index)
+        self._verrou_sauvegarde = threading.Lock()
+        self._version_sauvegardee = -1
+        # thread d'import en arrière-plan des modules utilisés pour répondre (démarré à la fin de l'initialisation)
+        self._prechauffage = None
+        # thread de compactage de l'index (retrait des chunks supprimés), voir _publier_index
+        self._compactage = None
+        noter("index")
 
         # ---------------------
 
@@ -77,7 +219,169 @@ class Chatbot:
         
         """
         # Charger les documents depuis le dossier de données a partir de config.py
-        self.charger_documents(config.DATA_DIR)
+        # (en mode "lecteur", c'est le constructeur d'index qui s'en charge)
+        if not self.lecture_seule:
+            self.charger_documents(config.DATA_DIR)
+            noter("documents")
+        # les modules nécessaires aux réponses sont importés en arrière-plan: la première
+        # question n'attend pas l'import de scikit-learn (déjà fait si des documents ont été chargés)
+        self._prechauffage = prechauffer(MODULES_PRECHAUFFES) if config.PRELOAD_IMPORTS else None
+
+    #modèle spaCy français, chargé au premier accès: aucune réponse ne l'utilise aujourd'hui, son chargement
+    #(plusieurs secondes et quelques centaines de Mo) n'est donc payé que par une fonction qui en a besoin
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = False
+            if disponible("spacy") and not self.lecture_seule:
+                try:
+                    self._nlp = importer("spacy").load("fr_core_news_sm")
+                except OSError:
+                    print("Modèle SpaCy non trouvé.")
+        return self._nlp or None
+
+    # textes des chunks de documents (lecture seule : séquence de l'index, chaque texte est décodé à l'accès);
+    # avec un index réparti, les textes restent dans les partitions: RuntimeError (voir IndexReparti.chunks)
+    @property
+    def doc_chunks(self):
+        index = self.index
+        return index.chunks if index is not None else []
+
+    # matrice TF-IDF des documents (RuntimeError avec un index réparti, voir IndexReparti.matrice)
+    @property
+    def doc_matrix(self):
+        index = self.index
+        return index.matrice() if index is not None and len(index) else None
+
+    # Méthodes pour l'instantané de l'index sur disque
+    #avec config.INDEX_SHARDS > 1 (ou SHARD_ADDRESSES), l'index est réparti entre des processus de partition
+    #et self.index est leur coordinateur, utilisé comme un IndexIncremental (voir repartition.py)
+    def _charger_index(self):
+        if IndexIncremental is None:
+            return None
+        if config.INDEX_SHARDS > 1 or config.SHARD_ADDRESSES:
+            index = IndexReparti.ouvrir(self.lecture_seule)
+            print(f"Index réparti sur {len(index.clients)} partitions ({len(index)} chunks)")
+            return index.figer()
+        index = IndexIncremental.charger(config.INDEX_DIR)
+        if index is None:
+            return IndexIncremental().figer()
+        print(f"Index chargé depuis {config.INDEX_DIR} ({len(index)} chunks)")
+        return index.figer()
+
+    #self.index est un instantané figé (vectoriseur, matrices, chunks, documents) que les requêtes
+    #lisent sans verrou, en une seule lecture de la référence. Les écritures (sérialisées par
+    #_verrou_index) appliquent modifier(index) à une copie, la figent, puis la publient en une
+    #seule affectation: une requête en cours garde l'instantané qu'elle a lu.
+    #Quand la part de chunks supprimés dépasse config.COMPACTION_DEAD_RATIO, l'index est compacté
+    #en arrière-plan (voir compacter_index).
+    def _publier_index(self, modifier):
+        if self.index is None:
+            return None
+        if self.lecture_seule:
+            raise RuntimeError("Index en lecture seule : les documents sont indexés par constructeur_index.py.")
+        with self._verrou_index:
+            index = self.index.copie()
+            resultat = modifier(index)
+            #matrices des chunks ajoutés, ou recalcul des poids IDF sur tout l'index quand ils ont trop
+            #vieilli (config.IDF_REFRESH_DRIFT et IDF_REFRESH_INTERVAL, voir IndexIncremental._rafraichir)
+            debut = time.perf_counter()
+            self.index = index.figer()
+            DUREE_INGESTION.observer(time.perf_counter() - debut, "publication", "index")
+            if (index.proportion_supprimes() > config.COMPACTION_DEAD_RATIO
+                    and (self._compactage is None or not self._compactage.is_alive())):
+                self._compactage = threading.Thread(target=self._compacter_en_arriere_plan, name="compactage-index",
+                                                    daemon=True)
+                self._compactage.start()
+        return resultat
+
+    #Compactage: les chunks supprimés (pierres tombales) sont retirés physiquement de l'index
+    #et les poids IDF recalculés, puis le nouvel instantané est sauvegardé
+    def compacter_index(self):
+        debut = time.perf_counter()
+        nb = self._publier_index(lambda index: index.compacter())
+        if nb:
+            DUREE_INGESTION.observer(time.perf_counter() - debut, "compactage", "index")
+            self.sauvegarder_index()
+        return nb
+
+    #dans le thread de compactage, une erreur est affichée au lieu d'arrêter le thread en silence:
+    #l'index publié reste valide (non compacté) et le compactage sera retenté à la prochaine publication
+    def _compacter_en_arriere_plan(self):
+        try:
+            self.compacter_index()
+        except Exception as e:
+            print(f"Erreur lors du compactage de l'index: {e!r}")
+
+    #Mode "lecteur": recharge l'instantané de config.INDEX_DIR si le constructeur en a publié une
+    #nouvelle génération. La vérification (un stat du manifeste) est faite au plus une fois par
+    #config.INDEX_RELOAD_INTERVAL secondes; une seule requête recharge, les autres gardent l'index courant.
+    def actualiser_index(self, forcer=False):
+        if not self.lecture_seule or IndexIncremental is None:
+            return False
+        maintenant = time.monotonic()
+        if not forcer and maintenant - self._verification_index < config.INDEX_RELOAD_INTERVAL:
+            return False
+        if not self._verrou_index.acquire(blocking=forcer):
+            return False
+        try:
+            self._verification_index = maintenant
+            #index réparti: les partitions sont publiées par le coordinateur qui les modifie
+            if isinstance(self.index, IndexReparti):
+                index = self.index.actualiser()
+                if index is None:
+                    return False
+                self.index = index.figer()
+                return True
+            manifeste = signature_manifeste(config.INDEX_DIR)
+            if manifeste is None or manifeste == self._manifeste_index:
+                return False
+            index = IndexIncremental.charger(config.INDEX_DIR)
+            if index is None:
+                # génération remplacée pendant la lecture : nouvel essai à la prochaine vérification
+                return False
+            index.version = self.index.version + 1 if self.index is not None else 0
+            self.index = index.figer()
+            self._manifeste_index = manifeste
+            return True
+        finally:
+            self._verrou_index.release()
+
+    #les sauvegardes sont faites une à la fois, et une version plus ancienne que la dernière sauvegardée
+    #n'est pas écrite: un upload ou une suppression qui sauvegarde après la fin d'un compactage en
+    #arrière-plan ne remplace pas l'instantané compacté par celui d'avant
+    def sauvegarder_index(self):
+        with self._verrou_sauvegarde:
+            index = self.index
+            if index is None or self.lecture_seule or index.version <= self._version_sauvegardee:
+                return
+            #une erreur (disque, partition injoignable ou en échec) est affichée sans interrompre le démarrage,
+            #l'upload ou le compactage qui sauvegarde: l'index publié reste utilisable et sera sauvegardé
+            #à la prochaine modification
+            try:
+                index.sauvegarder(config.INDEX_DIR)
+            except Exception as e:
+                print(f"Erreur lors de la sauvegarde de l'index: {e!r}")
+                return
+            self._version_sauvegardee = index.version
+
+    #(re)chargement de la base de connaissances depuis config.KNOWLEDGE_BASE_FILE:
+    #intentions, FAQ, automate des intentions et index de la recherche approximative
+    def recharger_base(self):
+        intents, knowledge_base, reponses, exactes = self._load_data(config.KNOWLEDGE_BASE_FILE, is_base=True)
+        #toutes les phrases des intentions sont compilées en un seul automate (voir intentions.py);
+        #les phrases exactes ("aide") ne répondent que si elles forment toute la question
+        self.automate_intentions = AutomateIntentions(intents, exactes)
+        #index des clés de la FAQ pour la recherche approximative, construit une seule fois au chargement
+        self.index_faq = IndexFlou(knowledge_base.keys())
+        self.intents, self.knowledge_base, self.reponses_intentions = intents, knowledge_base, reponses
+        #intentions dont la réponse change d'une fois à l'autre (choix aléatoire, heure): jamais mises en cache
+        self.intentions_variables = {
+            intention for intention, phrases in reponses.items()
+            if len(set(phrases)) > 1 or any("{maintenant}" in phrase for phrase in phrases)
+        }
+        self.generation_base += 1
+
     # Méthodes internes pour le chargement des données et la gestion des réponses
     def _load_data(self, fichier, is_base=False):
         if not os.path.exists(fichier):#on verifie si le fichier existe
@@ -89,24 +393,20 @@ class Chatbot:
             intents = {intent: [self.nettoyer_message(phrase) for phrase in phrases] for intent, phrases in data.get("intents", {}).items()}
             #dans la base de connaissances, chaque clé est nettoyée avant d'être stockée
             knowledge_base = {self.nettoyer_message(k): v for k, v in data.get("knowledge_base", {}).items()}
-            return intents, knowledge_base 
+            #les réponses de chaque intention (une intention sans réponse n'est jamais utilisée pour répondre)
+            reponses = data.get("responses", REPONSES_PAR_DEFAUT)
+            #phrases d'intention trop courantes pour être cherchées dans une question ("aide" dans "une aide financière")
+            exactes = [self.nettoyer_message(phrase) for phrase in data.get("exact_phrases", [])]
+            return intents, knowledge_base, reponses, exactes
         else:
             return {self.nettoyer_message(k): v for k, v in data.items()}
     # Méthodes pour la gestion des statistiques
-    def _load_stats(self):
-        if not os.path.exists(config.STATS_FILE): #si le fichier de statistiques n'existe pas, on le crée avec une structure vide
-            with open(config.STATS_FILE, "w", encoding="utf-8") as f:
-                json.dump({}, f)
-        with open(config.STATS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    #cette methode sauvegarde les statistiques mises à jour dans le fichier de statistiques
+    #cette methode force l'écriture des statistiques dans le fichier de statistiques
     def _save_stats(self):
-        with open(config.STATS_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.statistiques_questions, f, ensure_ascii=False, indent=4)
-    #celle ci s'occupe de l'incrémentation du compteur pour une question donnée
+        self.statistiques.vider()
+    #celle ci s'occupe de l'incrémentation du compteur pour une question donnée (en mémoire uniquement)
     def _increment_stat(self, question):
-        self.statistiques_questions[question] = self.statistiques_questions.get(question, 0) + 1
-        self._save_stats()
+        self.statistiques.incrementer(question)
 
     """
     Ici, nous sommes dans la deuxième partie de la logique du chatbot.
@@ -115,85 +415,126 @@ class Chatbot:
     extraire des passages pertinents à l'aide de TF-IDF, et répondre aux questions en utilisant différentes stratégies.
     """
     # Méthodes pour le traitement du texte
+    # minuscules, sans accents ni ponctuation, espaces multiples réduits à un seul (voir normalisation.py :
+    # une table de traduction précalculée, une expression régulière, résultat mémorisé pour les textes courts)
     def nettoyer_message(self, text):
-        text = text.lower() # le texte est converti en minuscules
-        text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn') #normalisation unicode pour enlever les accents
-        text = re.sub(r'[^\w\s]', '', text) #suppression de la ponctuation
-        text = re.sub(r'\s+', ' ', text) #remplacement des espaces multiples par un seul espace
-        return text.strip() #separation des espaces en début et fin de chaîne
+        return nettoyer(text)
     
 
     # Méthodes pour le traitement des documents
-    #ici, le texte est découpé en chunks basés sur des phrases
-    #chaque chunk comprend un certain nombre de phrases défini par taille_fenetre
+    #le découpage est fait par la fonction decouper_chunks du module (utilisable par les processus du pool)
     def decouper_chunks(self, text, taille_fenetre=config.CHUNK_SIZE):
-        #les phrases sont extraites en utilisant une expression régulière qui divise le texte aux points, points d'exclamation et points d'interrogation suivis d'espaces
-        phrases = re.split(r'(?<=[.!?])\s+', text)
-        chunks = []
-        #pour chaque segment de phrases, un chunk est créé en joignant les phrases ensemble
-        for i in range(0, len(phrases), taille_fenetre):
-            chunk = ' '.join(phrases[i:i+taille_fenetre])
-            if chunk.strip():
-                chunks.append(chunk)
-        return chunks #on retourne la liste des chunks créés
+        return decouper_chunks(text, taille_fenetre)
 
     # Méthodes pour la recherche et la réponse(Methode Parent)
-    #cette methode utilise TF-IDF pour extraire le passage le plus pertinent en fonction de la question posée
-    def extraire_passage_tfidf(self, question):
-        #si aucun chunk de document n'est disponible ou si le vectoriseur ou la matrice des documents n'est pas initialisé, on retourne None
-        if not self.doc_chunks or self.vectorizer is None or self.doc_matrix is None:
-            return None
+    #cette methode extrait les k passages les plus pertinents en fonction de la question posée, avec la
+    #méthode de config.RETRIEVAL_MODE (TF-IDF, BM25, vecteurs denses ou deux d'entre elles, voir indexation.py) ou celle de mode
+    def rechercher_passages(self, question, k=1, seuil=None, mode=None):
+        return self.rechercher_passages_lot([question], k, seuil, mode)[0]
+
+    #même recherche pour plusieurs questions à la fois (un seul produit matriciel pour tout le lot)
+    def rechercher_passages_lot(self, questions, k=1, seuil=None, mode=None):
+        #si aucun chunk de document n'est disponible ou si l'index n'est pas initialisé, on retourne des listes vides
+        self.actualiser_index()
+        #une seule lecture de self.index: tout le calcul se fait sur le même index, même si un upload le remplace entre-temps
+        index = self.index
+        if not questions or index is None or not len(index):
+            return [[] for _ in questions]
+        mode = mode or config.RETRIEVAL_MODE
+        if seuil is None:
+            seuil = SEUILS_PAR_DEFAUT[mode]()
         try:
-            #la question est transformée en vecteur TF-IDF
-            q_vect = self.vectorizer.transform([question])
-            #les scores de similarité entre la question et chaque chunk de document sont calculés
             """
-            explication du .torray et du .ravel:
-            .torray 
-                Cette méthode est utilisée pour convertir une matrice creuse (sparse matrix) en un tableau NumPy dense (dense array).
-                Les matrices creuses sont souvent utilisées dans le traitement du langage naturel et l'apprentissage automatique
-                car elles permettent de représenter efficacement des données avec beaucoup de zéros (comme les matrices
-            .ravel
-                Cette méthode est utilisée pour aplatir un tableau NumPy multidimensionnel en un tableau unidimensionnel.
-                Cela signifie que toutes les dimensions du tableau sont "aplaties" en une seule dimension.
-            -----------------------------
-            En combinant les deux méthodes, on obtient un tableau unidimensionnel dense qui contient les scores de similarité entre la question et chaque chunk de document.
+            explication du calcul des scores:
+                La question est transformée en vecteur TF-IDF puis multipliée par la matrice des documents.
+                Le résultat reste une matrice creuse (sparse matrix): seuls les chunks ayant au moins un terme
+                en commun avec la question ont un score. Au lieu de convertir ces scores en tableau dense
+                (.toarray) sur tous les chunks puis de les trier, on ne garde que les k meilleurs avec
+                argpartition (sélection partielle), voir indexation.meilleurs_scores.
             """
-            scores = (self.doc_matrix @ q_vect.T).toarray().ravel()
-            idx_score = scores.argmax() #extraction du seil de pertinance
-            if scores[idx_score] > 0.1: # Seuil de pertinence
-                return self.doc_chunks[idx_score]
-            return None
+            resultats = index.passages(questions, k, seuil, mode)
         except Exception as e:
-            print(f"Erreur TF-IDF: {e}")
-            return None
+            print(f"Erreur de recherche ({mode}): {e}")
+            return [[] for _ in questions]
+        return [
+            [
+                {
+                    "passage": passage,
+                    "score": round(score, 4),
+                    "document": document,
+                    "chunk_id": i,
+                    "source": source,
+                }
+                for i, score, passage, document, source in trouves
+            ]
+            for trouves in resultats
+        ]
+
+    #cette methode retourne uniquement le passage le plus pertinent (ou None si aucun ne dépasse le seuil)
+    def extraire_passage_tfidf(self, question):
+        passages = self.rechercher_passages(question, k=1)
+        return passages[0]["passage"] if passages else None
     #Methode d'ajout du contenu documentaire
-    def ajouter_contenu(self, contenu):
-        self.document_content += "\n" + contenu
-        # Recréer les chunks et la matrice TF-IDF à chaque ajout de contenu
-        chunks = self.decouper_chunks(self.document_content)
-        self.doc_chunks = chunks
-        if self.vectorizer and self.doc_chunks:
-            self.doc_matrix = self.vectorizer.fit_transform(self.doc_chunks)
-        print(f"({len(self.document_content)}caractères)")
+    def ajouter_contenu(self, contenu, source=None, signature=None, chunks=None):
+        if source is None:
+            self._contenus_anonymes += 1
+            source = f"contenu_{self._contenus_anonymes}"
+        # Seul le nouveau contenu est découpé et vectorisé, puis ajouté à l'index existant
+        # (un document déjà indexé sous le même nom est remplacé)
+        sources = None
+        if chunks is None:
+            chunks, sources = [], []
+            for chunk, position in decouper_segments([(contenu, None)]):
+                chunks.append(chunk)
+                sources.append(position)
+        self._publier_index(lambda index: index.ajouter_document(source, chunks, signature, sources))
+        print(f"({len(contenu)} caractères, {len(chunks)} chunks)")
+        return chunks
+
+    #Suppression d'un document: son fichier est retiré du dossier de données et ses chunks sont marqués
+    #supprimés dans l'index (ignorés par les recherches jusqu'au compactage), sans reconstruire l'index.
+    #Retourne le nombre de chunks retirés, ou None si le document est inconnu. En mode "lecteur",
+    #seul le fichier est supprimé: le constructeur retire le document à son prochain parcours du dossier.
+    def supprimer_document(self, nom):
+        chemin = os.path.join(config.DATA_DIR, nom)
+        index = self.index
+        indexe = index is not None and nom in index.documents
+        if not os.path.isfile(chemin) and not indexe:
+            return None
+        if os.path.isfile(chemin):
+            os.remove(chemin)
+        if self.lecture_seule or not indexe:
+            return 0
+        nb = self._publier_index(lambda index: index.retirer_documents([nom]))
+        self.sauvegarder_index()
+        return nb
+
+    #signature du fichier (taille, date, empreinte) conservée dans l'index pour détecter les modifications
+    def _signature(self, chemin):
+        return signature_fichier(chemin) if signature_fichier else None
+
+    #lecture d'un seul fichier par le pipeline d'ingestion (cache d'extraction compris);
+    #une erreur de lecture est remontée en exception
+    def _indexer_fichier(self, chemin):
+        rapport = self.ingerer_fichiers([chemin])
+        if rapport["erreurs"]:
+            raise RuntimeError("; ".join(rapport["erreurs"]))
+        return rapport
 
     #Methode permettant la lecture des fichiers text au bot
     def lire_fichier_txt(self, chemin):
         try:
-            with open(chemin, "r", encoding="utf-8") as f: contenu = f.read()
-            self.ajouter_contenu(contenu)
+            self._indexer_fichier(chemin)
             return f"Fichier texte '{os.path.basename(chemin)}' chargé."
         except Exception as e: return f"Erreur lecture {os.path.basename(chemin)}: {e}"
     #Methode permettant la lecture des fichiers word au bot
     def lire_fichier_word(self, chemin):
         # Ici on procede d'abord par la verification de l'existance du module docx
         #en cas d'absence, un message d'erreur est retourné
-        if docx is None: return "Module python-docx non disponible."
+        if not TYPES_FICHIERS['.docx'][2]: return "Module python-docx non disponible."
         #sinon, on tente de lire le fichier word:
         try:
-            doc = docx.Document(chemin)
-            contenu = "\n".join([para.text for para in doc.paragraphs])
-            self.ajouter_contenu(contenu)
+            self._indexer_fichier(chemin)
             return f"Fichier Word '{os.path.basename(chemin)}' chargé."
         #en cas d'erreur lors de la lecture, un message d'erreur est retourné
         except Exception as e: return f"Erreur lecture {os.path.basename(chemin)}: {e}"
@@ -202,12 +543,10 @@ class Chatbot:
     def lire_fichier_pdf(self, chemin):
         #meme logique que pour les fichiers word
         #en cas d'abscence ,on renvioie un message d'erreur
-        if fitz is None: return "Module PyMuPDF non disponible."
+        if not TYPES_FICHIERS['.pdf'][2]: return "Module PyMuPDF non disponible."
         #sinon, on tente de lire le fichier pdf
         try:
-            with fitz.open(chemin) as doc:
-                contenu = "".join(page.get_text() for page in doc)
-            self.ajouter_contenu(contenu)
+            self._indexer_fichier(chemin)
             return f"Fichier PDF '{os.path.basename(chemin)}' chargé."
         except Exception as e: return f"Erreur lecture {os.path.basename(chemin)}: {e}"
 
@@ -221,43 +560,159 @@ class Chatbot:
     """
     #Cette methode permet au bot de charger les documents au demarrage 
     #Elle charge les documents txt,pdf et docx(word) uniquement
+    #Les fichiers déjà présents dans l'instantané de l'index et inchangés ne sont pas relus
     def charger_documents(self, dossier=config.DATA_DIR):
-        if not os.path.exists(dossier): 
-            return
+        presents = set()
+        a_lire = []
         #on confirme l'existance et l'extension  de chacun des fichiers contenu dans le dossier *****
-        for fichier in os.listdir(dossier):
+        for fichier in (os.listdir(dossier) if os.path.exists(dossier) else []):
             chemin = os.path.join(dossier, fichier)
             if not os.path.isfile(chemin): continue
-            if fichier.lower().endswith('.txt'): print(self.lire_fichier_txt(chemin))
-            elif fichier.lower().endswith('.pdf'): print(self.lire_fichier_pdf(chemin))
-            elif fichier.lower().endswith('.docx'): print(self.lire_fichier_word(chemin))
+            if os.path.splitext(fichier)[1].lower() not in TYPES_FICHIERS: continue
+            presents.add(fichier)
+            if self.index is not None and self.index.document_inchange(fichier, chemin): continue
+            a_lire.append(chemin)
+        if a_lire:
+            self.ingerer_fichiers(a_lire)
+        if self.index is None:
+            return
+        #les documents dont le fichier a disparu du dossier sont retirés de l'index
+        disparus = [nom for nom in self.index.documents if nom not in presents]
+        if disparus:
+            self._publier_index(lambda index: index.retirer_documents(disparus))
+        if a_lire or disparus:
+            self.sauvegarder_index()
+
+    #nombre de processus à utiliser pour extraire nb_fichiers fichiers
+    def _nb_workers(self, nb_fichiers):
+        workers = config.INGESTION_WORKERS or os.cpu_count() or 1
+        #pas de pool dans un processus enfant (ni pour un seul fichier)
+        if multiprocessing.parent_process() is not None:
+            return 1
+        return max(1, min(workers, nb_fichiers))
+
+    #Pipeline d'ingestion en trois étapes:
+    # 1. extraction + découpage des fichiers absents du cache d'extraction, en parallèle dans un pool de processus
+    # 2. fusion: tous les chunks sont ajoutés à l'index en un seul appel
+    # 3. vectorisation: la matrice TF-IDF est construite une seule fois à la fin
+    def ingerer_fichiers(self, chemins):
+        debut = time.perf_counter()
+        durees = {"extraction": 0.0, "decoupage": 0.0, "vectorisation": 0.0}
+        documents = [] # (chemin, signature, chunks, sources)
+        a_extraire = []
+        for chemin in chemins:
+            signature = self._signature(chemin)
+            entree = self.cache_extraction.lire(signature["sha256"]) if signature else None
+            #une entrée découpée avec une autre taille de chunk (ou d'un ancien format) est refaite
+            if entree is None or entree.get("taille_chunk") != config.CHUNK_SIZE or "sources" not in entree:
+                a_extraire.append((chemin, signature))
+                continue
+            documents.append((chemin, signature, entree["chunks"], entree["sources"]))
+
+        workers = self._nb_workers(len(a_extraire))
+        fichiers = [chemin for chemin, _ in a_extraire]
+        if workers > 1:
+            #pas de fork pendant qu'un import est en cours dans le thread de préchauffage
+            if self._prechauffage is not None:
+                self._prechauffage.join()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                resultats = list(pool.map(traiter_fichier, fichiers, chunksize=max(1, len(fichiers) // (workers * 4))))
+        else:
+            resultats = [traiter_fichier(chemin) for chemin in fichiers]
+        debut_fusion = time.perf_counter()
+        erreurs = []
+        for (chemin, signature), resultat in zip(a_extraire, resultats):
+            if "erreur" in resultat:
+                print(resultat["erreur"])
+                erreurs.append(resultat["erreur"])
+                continue
+            durees["extraction"] += resultat["extraction"]
+            durees["decoupage"] += resultat["decoupage"]
+            type_fichier = os.path.splitext(chemin)[1].lower().lstrip(".")
+            DUREE_INGESTION.observer(resultat["extraction"], "extraction", type_fichier)
+            DUREE_INGESTION.observer(resultat["decoupage"], "decoupage", type_fichier)
+            if signature:
+                self.cache_extraction.ecrire(signature["sha256"], resultat["chunks"], resultat["sources"], config.CHUNK_SIZE)
+            documents.append((chemin, signature, resultat["chunks"], resultat["sources"]))
+
+        for chemin, _, _, _ in documents:
+            libelle = TYPES_FICHIERS[os.path.splitext(chemin)[1].lower()][0]
+            print(f"Fichier {libelle} '{os.path.basename(chemin)}' chargé.")
+        debut_vectorisation = time.perf_counter()
+        #les documents sont vectorisés par type de fichier, pour mesurer la vectorisation de chaque type
+        par_type = {}
+        for chemin, signature, chunks, sources in documents:
+            type_fichier = os.path.splitext(chemin)[1].lower().lstrip(".")
+            par_type.setdefault(type_fichier, []).append((os.path.basename(chemin), chunks, signature, sources))
+
+        def ajouter(index):
+            for type_fichier, nouveaux in par_type.items():
+                debut_type = time.perf_counter()
+                index.ajouter_documents(nouveaux)
+                DUREE_INGESTION.observer(time.perf_counter() - debut_type, "vectorisation", type_fichier)
+
+        self._publier_index(ajouter)
+        fin = time.perf_counter()
+        durees["vectorisation"] = fin - debut_vectorisation
+        self.derniere_ingestion = {
+            "fichiers": len(chemins),
+            "depuis_cache": len(chemins) - len(a_extraire),
+            "workers": workers,
+            # durées cumulées sur tous les processus (secondes CPU par étape)
+            "extraction_s": round(durees["extraction"], 4),
+            "decoupage_s": round(durees["decoupage"], 4),
+            "vectorisation_s": round(durees["vectorisation"], 4),
+            # durées réelles (mur) : étape parallèle puis fusion + vectorisation
+            "pool_mur_s": round(debut_fusion - debut, 4),
+            "total_mur_s": round(fin - debut, 4),
+            "erreurs": erreurs,
+        }
+        print(f"Ingestion: {len(chemins)} fichier(s), {workers} processus, "
+              f"extraction {durees['extraction']:.2f}s, découpage {durees['decoupage']:.2f}s, "
+              f"vectorisation {durees['vectorisation']:.2f}s (total {fin - debut:.2f}s)")
+        return self.derniere_ingestion
+
+    #Indexation d'un fichier uploadé (exécutée en tâche de fond par l'API): le fichier est ingéré
+    #puis l'instantané de l'index est mis à jour. Une erreur d'extraction est remontée en exception.
+    #En mode "lecteur", la tâche attend que le constructeur ait indexé le fichier (au plus config.INDEX_BUILD_TIMEOUT secondes).
+    def indexer_fichier(self, chemin):
+        if self.lecture_seule:
+            return self._attendre_indexation(chemin)
+        rapport = self._indexer_fichier(chemin)
+        self.sauvegarder_index()
+        return rapport
+
+    def _attendre_indexation(self, chemin):
+        nom = os.path.basename(chemin)
+        limite = time.monotonic() + config.INDEX_BUILD_TIMEOUT
+        while True:
+            self.actualiser_index(forcer=True)
+            index = self.index
+            if index is not None and index.document_inchange(nom, chemin):
+                return {"fichiers": 1, "generation": index.generation}
+            if time.monotonic() >= limite:
+                raise RuntimeError(f"'{nom}' n'a pas été indexé par le constructeur après {config.INDEX_BUILD_TIMEOUT}s.")
+            time.sleep(config.INDEX_RELOAD_INTERVAL)
 
     #Cette methode permet de repondre aux questions de l'utilisateur en fonction des "intensions"
     #ici, chaque intention constue une liste des questions valides a partir desquelles certaines reponses prévues a cet effet 
     #sont données de maniere aléatoire
     def _repondre_intentions(self, message_simple):
-        #par exemple, pour chaque mot present dans les intentions de salutation et present dans le message de
-        #l'utilisateur, on renvoie l'un des messages contenu dans la liste en random.
-        if any(mot in message_simple for mot in self.intents['saluer']):
-           return random.choice(["Bonjour ! Que puis-je faire pour vous?", 
-                              "Salut, comment puis-je vous aider?", 
-                              "Bonjour, en quoi puis-je vous être utile?"])
-        #meme chose a ce niveau
-        if any(mot in message_simple for mot in self.intents['comment_cv']):
-            return random.choice(["Je vais bien, merci. Et vous?", 
-                              "Je suis toujours en forme pour vous aider.", 
-                              "Tout va bien, prêt à vous assister."])
-        #et ici aussi
-        if any(mot in message_simple for mot in self.intents['heure']):
-            return f"Il est {datetime.now().strftime('%d/%m/%Y, %H:%M:%S')}"
-        #
-        if any(mot in message_simple for mot in self.intents['remercier']):
-            return random.choice(["Avec plaisir!", "Il n'y a pas de quoi.", "C'est un plaisir de vous aider."])
-        #
-        if any(mot in message_simple for mot in self.intents['aurevoir']):
-            return random.choice(["À bientôt !", "Au revoir, à très vite."])
-          
+        intention = self._intention(message_simple)
+        return self._reponse_intention(intention) if intention else None
+
+    #l'automate trouve en un seul passage toutes les intentions dont une phrase est presente dans le message;
+    #on retient la premiere (dans l'ordre de data.json) qui a des reponses dans la section "responses".
+    def _intention(self, message_simple):
+        for intention in self.automate_intentions.intentions(message_simple):
+            if self.reponses_intentions.get(intention):
+                return intention
         return None
+
+    def _reponse_intention(self, intention):
+        #"{maintenant}" est remplacé par la date et l'heure courantes (intention "heure")
+        reponse = random.choice(self.reponses_intentions[intention])
+        return reponse.replace("{maintenant}", datetime.now().strftime('%d/%m/%Y, %H:%M:%S'))
     
     #ici, les reponses sont données de maniere exacte si le systeme clé-valeur est correcte à 100%
     def _repondre_faq_exacte(self, message_simple):
@@ -267,72 +722,161 @@ class Chatbot:
     def _repondre_faq_approximative(self, message_simple):
         if not self.knowledge_base: return None
         #c'est ici qu'on crée une correspondance entre le message de l'user et les clés de la base de connaissance
-        #en admettant un seuil de similarité
-        correspondance = difflib.get_close_matches(message_simple, self.knowledge_base.keys(), n=1, cutoff=config.SIMILARITY_CUTOFF)
+        #en admettant un seuil de similarité; seules les clés qui peuvent encore atteindre ce seuil
+        #sont comparées (voir recherche_floue.py), avec les mêmes tests que difflib.get_close_matches
+        correspondance = self.index_faq.meilleure_correspondance(message_simple, config.SIMILARITY_CUTOFF)
         #si lee seuil de correspondance est atteint, ou meme depassé on renvoi la reponse prevue à cet effet.
         if correspondance:
-            return self.knowledge_base[correspondance[0]]
+            return self.knowledge_base[correspondance]
         return None
 
-    #Methode pour retourné la reponse issue de l'extraction du contenu des documents
-    def _repondre_docs(self, message_original):
-        return self.extraire_passage_tfidf(message_original)
+    #Methode pour retourné les passages issus de l'extraction du contenu des documents
+    def _repondre_docs(self, message_original, k=1, seuil=None):
+        return self.rechercher_passages(message_original, k, seuil)
 
-    #Methode principale de reponse aux questions
-    def repondre(self, message: str) -> dict:
-        message_simple = self.nettoyer_message(message)
-        reponse = None
-        score = 0.0
+    #Etapes de réponse qui ne dépendent pas des documents (intentions, FAQ exacte puis approximative)
+    #retourne (reponse, score, reponse_fixe) ou (None, 0.0, True); reponse_fixe est faux si la même
+    #question peut recevoir une autre réponse la fois suivante (elle n'est alors pas mise en cache)
+    #la durée de chaque étape est comptée dans l'histogramme DUREE_ETAPE (voir metriques.py)
+    def _repondre_base(self, message_simple):
+        debut = time.perf_counter()
+        intention = self._intention(message_simple)
+        fin = time.perf_counter()
+        DUREE_ETAPE.observer(fin - debut, "intentions")
+        if intention: return self._reponse_intention(intention), 1.0, intention not in self.intentions_variables
+        reponse = self._repondre_faq_exacte(message_simple)
+        debut, fin = fin, time.perf_counter()
+        DUREE_ETAPE.observer(fin - debut, "faq_exacte")
+        if reponse: return reponse, 0.9, True
+        reponse = self._repondre_faq_approximative(message_simple)
+        DUREE_ETAPE.observer(time.perf_counter() - fin, "faq_approximative")
+        if reponse: return reponse, 0.8, True
+        return None, 0.0, True
 
-        # Ordre de priorité
-        reponse = self._repondre_intentions(message_simple)
-        if reponse: score = 1.0
-        
-        if reponse is None:
-            reponse = self._repondre_faq_exacte(message_simple)
-            if reponse: score = 0.9
+    #Cache des réponses: la clé est la question nettoyée avec k et seuil; la génération (version de
+    #l'index et de la base de connaissances) vide le cache dès que les données changent.
+    #Les passages des documents dépendent aussi du texte exact de la question (accents, apostrophes):
+    #ils ne sont resservis que pour le même texte.
+    def _generation(self):
+        index = self.index
+        return (index.version if index is not None else None, self.generation_base)
 
-        if reponse is None:
-            reponse = self._repondre_faq_approximative(message_simple)
-            if reponse: score = 0.8
+    def _lire_cache(self, message, message_simple, k, seuil, generation):
+        texte = message.lower()
+        return self.cache_reponses.lire(
+            (message_simple, k, seuil), generation,
+            valide=lambda entree: entree[3] is None or entree[3] == texte,
+        )
 
-        if reponse is None:
-            reponse = self._repondre_docs(message)
-            if reponse: score = 0.7
+    def _ecrire_cache(self, message, message_simple, k, seuil, generation, reponse, score, passages):
+        texte_docs = message.lower() if reponse is None else None
+        self.cache_reponses.ecrire((message_simple, k, seuil), generation, (reponse, score, passages, texte_docs))
 
+    #construction du résultat retourné (et enregistré dans l'historique) pour une question
+    def _resultat(self, message, reponse, score, passages):
+        if reponse is None and passages:
+            reponse, score = passages[0]["passage"], 0.7
         if reponse is None:
             reponse = "Je suis désolé, je n'ai pas trouvé de réponse."
-        
         resultat = {
             "question": message,
             "reponse": reponse,
             "score(/1)": round(score, 2),
             "horodatage": datetime.now().isoformat()
         }
+        if passages:
+            resultat["passages"] = passages
+        return resultat
+
+    #Methode principale de reponse aux questions
+    #k et seuil s'appliquent à la recherche dans les documents (nombre de passages retournés, score minimal)
+    def repondre(self, message: str, k: int = 1, seuil: float = None) -> dict:
+        debut = time.perf_counter()
+        message_simple = self.nettoyer_message(message)
+        etape = time.perf_counter()
+        DUREE_ETAPE.observer(etape - debut, "nettoyage")
+
+        #en mode "lecteur", l'index est rechargé avant de relever la génération: une réponse calculée
+        #sur une nouvelle génération n'est jamais rangée (ni lue) sous la précédente
+        self.actualiser_index()
+        generation = self._generation()
+        en_cache = self._lire_cache(message, message_simple, k, seuil, generation)
+        DUREE_ETAPE.observer(time.perf_counter() - etape, "cache")
+        if en_cache is not None:
+            reponse, score, passages, _ = en_cache
+        else:
+            # Ordre de priorité: intentions, FAQ exacte, FAQ approximative, puis documents
+            reponse, score, reponse_fixe = self._repondre_base(message_simple)
+            passages = []
+            if reponse is None:
+                etape = time.perf_counter()
+                passages = self._repondre_docs(message, k, seuil)
+                DUREE_ETAPE.observer(time.perf_counter() - etape, "documents")
+            if reponse_fixe:
+                self._ecrire_cache(message, message_simple, k, seuil, generation, reponse, score, passages)
+
+        resultat = self._resultat(message, reponse, score, passages)
+        etape = time.perf_counter()
+        self._increment_stat(message_simple)
         self.sauvegarder_interactions(resultat)
+        fin = time.perf_counter()
+        DUREE_ETAPE.observer(fin - etape, "persistance")
+        DUREE_ETAPE.observer(fin - debut, "total")
         return resultat
 
+    #Methode de réponse à un lot de questions (mêmes étapes que repondre)
+    #les questions qui arrivent jusqu'à l'étape des documents sont toutes vectorisées et comparées
+    #à la matrice des documents en un seul produit matriciel; l'historique et les statistiques
+    #sont mis à jour une seule fois pour tout le lot
+    #chaque étape est comptée dans DUREE_ETAPE comme dans repondre, sa durée étant répartie entre
+    #les questions du lot qui l'ont traversée (voir Histogramme.observer_lot)
+    def repondre_batch(self, messages: list, k: int = 1, seuil: float = None) -> list:
+        debut = time.perf_counter()
+        messages_simples = [self.nettoyer_message(message) for message in messages]
+        etape = time.perf_counter()
+        DUREE_ETAPE.observer_lot(etape - debut, len(messages), "nettoyage")
+        self.actualiser_index()
+        generation = self._generation()
+        en_cache = [self._lire_cache(message, message_simple, k, seuil, generation)
+                    for message, message_simple in zip(messages, messages_simples)]
+        DUREE_ETAPE.observer_lot(time.perf_counter() - etape, len(messages), "cache")
+        bases = [
+            entree[:2] + (False,) if entree is not None else self._repondre_base(message_simple)
+            for entree, message_simple in zip(en_cache, messages_simples)
+        ]
+        restants = [i for i, (reponse, _, _) in enumerate(bases) if reponse is None and en_cache[i] is None]
+        passages = [entree[2] if entree is not None else [] for entree in en_cache]
+        etape = time.perf_counter()
+        for i, trouves in zip(restants, self.rechercher_passages_lot([messages[i] for i in restants], k, seuil)):
+            passages[i] = trouves
+        DUREE_ETAPE.observer_lot(time.perf_counter() - etape, len(restants), "documents")
+
+        for i, (reponse, score, reponse_fixe) in enumerate(bases):
+            if en_cache[i] is None and reponse_fixe:
+                self._ecrire_cache(messages[i], messages_simples[i], k, seuil, generation, reponse, score, passages[i])
+        resultats = [
+            self._resultat(message, reponse, score, trouves)
+            for message, (reponse, score, _), trouves in zip(messages, bases, passages)
+        ]
+        etape = time.perf_counter()
+        self.statistiques.incrementer_lot(messages_simples)
+        self.journal.ajouter_lot(resultats)
+        fin = time.perf_counter()
+        DUREE_ETAPE.observer_lot(fin - etape, len(messages), "persistance")
+        DUREE_ETAPE.observer_lot(fin - debut, len(messages), "total")
+        DUREE_LOT.observer(fin - debut)
+        return resultats
+
     #Methode de sauvegarde des interactions
     def sauvegarder_interactions(self, interaction: dict):
-       """
-       Sauvegarde chaque interaction (question-réponse) dans un fichier JSON.
-       """
-       historique_fichier = "historique.json"
-
-       # Charger l'historique existant
-       if os.path.exists(historique_fichier):
-           try:
-               with open(historique_fichier, "r", encoding="utf-8") as f:
-                    historique = json.load(f)
-           except (json.JSONDecodeError, IOError):
-                    historique = []
-       else:
-        historique = []
-
-       # Ajouter la nouvelle interaction
-       historique.append(interaction)
-
-       # Réécrire le fichier
-       with open(historique_fichier, "w", encoding="utf-8") as f:
-            json.dump(historique, f, ensure_ascii=False, indent=4)
-       pass
\ No newline at end of file
+        """
+        Ajoute l'interaction (question-réponse) au journal config.HISTORY_FILE.
+        L'écriture sur disque est faite par lots, en arrière-plan.
+        """
+        self.journal.ajouter(interaction)
+
+    #Methode de lecture de l'historique, interaction par interaction
+    def lire_historique(self):
+        """Parcourt toutes les interactions enregistrées, de la plus ancienne à la plus récente."""
+        self.journal.vider()
+        return self.journal.lire()
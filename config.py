@@ -30,22 +30,186 @@ KNOWLEDGE_BASE_FILE = os.path.join(BASE_DIR, 'data.json')
 # Fichier JSON pour stocker les statistiques d'utilisation des questions.
 STATS_FILE = os.path.join(BASE_DIR, 'stats.json')
 
-# Fichier JSON pour enregistrer l'historique de toutes les interactions avec le bot.
-HISTORY_FILE = os.path.join(BASE_DIR, 'historique.json')
+# Les statistiques sont tenues en mémoire et écrites dans STATS_FILE après
+# STATS_FLUSH_EVERY questions ou STATS_FLUSH_INTERVAL secondes.
+STATS_FLUSH_EVERY = 50
+STATS_FLUSH_INTERVAL = 5.0
+
+# Durée (en heures) pendant laquelle les comptes par fenêtre de temps sont conservés en mémoire.
+STATS_WINDOW_RETENTION_HOURS = 24
+
+# Journal (JSON Lines, une interaction par ligne) de toutes les interactions avec le bot.
+HISTORY_FILE = os.path.join(BASE_DIR, 'historique.jsonl')
+
+# Historique des versions précédentes (liste JSON écrite dans le dossier courant du processus) :
+# repris une fois au démarrage dans le journal (voir journal.py), puis renommé en historique.json.migre.
+LEGACY_HISTORY_FILES = [os.path.join(BASE_DIR, 'historique.json'), 'historique.json']
+
+# Taille maximale du journal en mégaoctets avant rotation (historique.jsonl.1, .2, ...)
+# et nombre d'archives conservées.
+HISTORY_MAX_MB = 50
+HISTORY_BACKUPS = 5
+
+# Les interactions sont écrites par lots : après HISTORY_BATCH_SIZE interactions
+# ou HISTORY_FLUSH_INTERVAL secondes, selon ce qui arrive en premier.
+HISTORY_BATCH_SIZE = 100
+HISTORY_FLUSH_INTERVAL = 1.0
+
+# Dossier de l'instantané de l'index TF-IDF (chunks, matrices, signatures des fichiers).
+# Il est relu au démarrage pour éviter de ré-extraire les documents inchangés.
+INDEX_DIR = os.path.join(BASE_DIR, 'index')
+
+# Dossier du cache d'extraction (texte et chunks de chaque fichier, rangés par empreinte SHA-256).
+EXTRACTION_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'extraction')
+
+# Taille maximale du cache d'extraction en mégaoctets ; au-delà, les entrées
+# les moins récemment utilisées sont supprimées.
+EXTRACTION_CACHE_MAX_MB = 512
 
 
 # --- Paramètres du modèle de Chatbot ---
 
 # Seuil de similarité pour la recherche de questions approximatives (entre 0.0 et 1.0).
-# Utilisé par difflib.get_close_matches.
+# Utilisé par la recherche approximative (recherche_floue.py), avec les critères de difflib.get_close_matches.
 SIMILARITY_CUTOFF = 0.60
 
 # Taille des "chunks" (morceaux de texte) pour l'analyse TF-IDF. 
 # Exprimé en nombre de phrases.
 CHUNK_SIZE = 5
 
+# Score TF-IDF minimal (similarité cosinus, entre 0.0 et 1.0) pour qu'un passage
+# de document soit retenu. Peut être modifié à chaque requête sur /recherche.
+TFIDF_THRESHOLD = 0.1
+
+# Nombre maximal de passages qu'une requête peut demander sur /recherche.
+MAX_PASSAGES = 50
+
+# Nombre maximal de questions dans une requête /recherche/batch.
+MAX_BATCH_QUESTIONS = 10000
+
+# Regroupement des requêtes /recherche concurrentes (voir regroupement.py) : un lot part dès qu'il
+# contient MICROBATCH_MAX_SIZE questions, ou MICROBATCH_MAX_WAIT_MS millisecondes après la première.
+# MICROBATCH_MAX_SIZE = 1 : chaque requête est traitée seule.
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", 32))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 2))
+
+# Cache des réponses (clé : question nettoyée, k et seuil), vidé dès que l'index des documents
+# ou la base de connaissances change. QUERY_CACHE_SIZE = nombre maximal de réponses gardées
+# (0 = cache désactivé) ; QUERY_CACHE_TTL = durée de vie d'une réponse en secondes.
+QUERY_CACHE_SIZE = 10000
+QUERY_CACHE_TTL = 3600
+
+# Méthode de recherche des passages dans les documents :
+# "tfidf"   : similarité des vecteurs TF-IDF (mots et paires de mots communs) ;
+# "bm25"    : score BM25 (tient compte de la longueur des chunks), sur un index inversé, voir bm25.py ;
+# "dense"   : similarité des vecteurs denses (embeddings) des chunks, voir recherche_dense.py ;
+# "hybride" : combinaison des deux méthodes de HYBRID_METHODS (par défaut TF-IDF et dense).
+# La méthode "dense" calcule un vecteur par chunk à l'indexation (index reconstruit au changement de mode).
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "tfidf")
+
+# Dossier d'un modèle sentence-transformers stocké localement (jamais téléchargé), exécuté sur CPU.
+# Vide : encodeur intégré par hachage des n-grammes de caractères (sans modèle, non sémantique),
+# qui produit des vecteurs de DENSE_DIMENSION valeurs.
+DENSE_MODEL_PATH = os.environ.get("DENSE_MODEL_PATH", "")
+DENSE_DIMENSION = 256
+
+# Nombre de chunks encodés à la fois.
+DENSE_BATCH_SIZE = 64
+
+# Stockage des vecteurs : "int8" (quantifiés, 4 fois moins de mémoire) ou "float32".
+DENSE_QUANTIZATION = "int8"
+
+# Au-delà de DENSE_IVF_MIN_VECTORS vecteurs, recherche approchée par index IVF : une question
+# n'est comparée qu'aux vecteurs des DENSE_NPROBE listes les plus proches (plus = meilleur rappel, plus lent).
+DENSE_IVF_MIN_VECTORS = 20000
+DENSE_NPROBE = 32
+
+# Similarité minimale (cosinus) d'un passage en mode "dense" quand la requête n'indique pas de seuil.
+DENSE_THRESHOLD = 0.3
+
+# Paramètres BM25 : saturation de la fréquence d'un terme (k1) et poids de la longueur du chunk (b, entre 0 et 1).
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Score BM25 minimal d'un passage en mode "bm25" quand la requête n'indique pas de seuil
+# (scores normalisés entre 0.0 et 1.0, voir bm25.py).
+BM25_THRESHOLD = 0.1
+
+# Mode "hybride" : les deux méthodes combinées ("tfidf", "bm25" ou "dense", séparées par une virgule),
+# poids de la première dans le score combiné, et nombre de candidats retenus par chaque méthode
+# (multiplié par le nombre de passages demandés).
+HYBRID_METHODS = [methode.strip() for methode in os.environ.get("HYBRID_METHODS", "tfidf,dense").split(",")]
+HYBRID_WEIGHT = 0.5
+HYBRID_CANDIDATES = 4
+
+# Les chunks des documents retirés ou remplacés sont seulement marqués supprimés (ignorés par les recherches).
+# Quand ils dépassent cette part des chunks de l'index, l'index est compacté en arrière-plan
+# (chunks retirés physiquement, poids IDF recalculés).
+COMPACTION_DEAD_RATIO = 0.25
+
+# Poids IDF et statistiques BM25 de l'index : ils sont recalculés sur tout l'index (à la publication
+# d'un ajout) quand les chunks ajoutés depuis le dernier calcul dépassent IDF_REFRESH_DRIFT fois le
+# nombre de chunks d'alors, ou quand ce calcul date de plus de IDF_REFRESH_INTERVAL secondes.
+# Entre deux calculs, les nouveaux chunks sont pondérés avec les poids existants : la publication
+# d'un upload ne coûte que la taille du document, au prix de scores légèrement différents de ceux
+# d'un index reconstruit (termes nouveaux ou devenus fréquents). 0 = poids recalculés à chaque ajout.
+IDF_REFRESH_DRIFT = float(os.environ.get("IDF_REFRESH_DRIFT", 0.1))
+IDF_REFRESH_INTERVAL = float(os.environ.get("IDF_REFRESH_INTERVAL", 3600))
+
+# Nombre de colonnes de l'espace de hachage utilisé par l'index TF-IDF incrémental.
+# Une valeur plus grande limite les collisions entre termes mais augmente la mémoire.
+HASH_FEATURES = 2 ** 20
+
+# Nombre de processus utilisés pour extraire et découper les documents au chargement.
+# 0 = autant que de cœurs disponibles ; 1 = extraction séquentielle dans le processus principal.
+INGESTION_WORKERS = 0
+
+# Les bibliothèques lourdes (scikit-learn, PyMuPDF, python-docx, spaCy) sont importées à leur
+# première utilisation. Si PRELOAD_IMPORTS est vrai, celles qui servent à répondre aux questions
+# (scikit-learn) sont importées en arrière-plan juste après le démarrage du chatbot.
+PRELOAD_IMPORTS = True
+
+# Rôle du processus vis-à-vis de l'index (variable d'environnement INDEX_ROLE) :
+# "autonome" : le processus lit les documents de DATA_DIR et construit lui-même son index ;
+# "lecteur"  : le processus ne lit aucun document ; il ouvre en lecture seule (mmap) l'instantané
+#              de INDEX_DIR écrit par constructeur_index.py, partagé par tous les workers de l'API.
+INDEX_ROLE = os.environ.get("INDEX_ROLE", "autonome")
+
+# Index réparti (voir repartition.py) : les documents sont répartis entre INDEX_SHARDS partitions,
+# chacune servie par son propre processus démarré par l'API (instantané dans INDEX_DIR/partition-<i>).
+# 1 = index unique dans le processus de l'API.
+INDEX_SHARDS = int(os.environ.get("INDEX_SHARDS", 1))
+
+# Partitions déjà lancées sur d'autres machines (python repartition.py --adresse ...), sous la forme
+# "hote:port" séparées par des virgules : elles remplacent les processus locaux de INDEX_SHARDS.
+# Obligatoire pour un index réparti en mode "lecteur" : les workers interrogent les partitions
+# alimentées par constructeur_index.py.
+# SHARD_AUTHKEY authentifie les connexions aux partitions (obligatoire avec SHARD_ADDRESSES ;
+# vide : clé tirée au hasard pour les processus locaux).
+SHARD_ADDRESSES = [adresse.strip() for adresse in os.environ.get("SHARD_ADDRESSES", "").split(",") if adresse.strip()]
+SHARD_AUTHKEY = os.environ.get("SHARD_AUTHKEY", "")
+
+# Délai (millisecondes) accordé aux partitions pour répondre à une recherche : une partition plus lente
+# est ignorée (ses passages manquent à la réponse) et comptée sur /metrics.
+SHARD_TIMEOUT_MS = float(os.environ.get("SHARD_TIMEOUT_MS", 500))
+
+# En mode "lecteur", délai minimal (secondes) entre deux vérifications du manifeste de l'index :
+# une nouvelle génération est chargée dès que le manifeste a changé.
+INDEX_RELOAD_INTERVAL = 1.0
+
+# En mode "lecteur", temps maximal (secondes) qu'une tâche d'upload attend que le constructeur
+# ait indexé le fichier, et intervalle (secondes) entre deux parcours de DATA_DIR par le constructeur.
+INDEX_BUILD_TIMEOUT = 300
+BUILDER_INTERVAL = 2.0
+
 # --- Configuration de l'API ---
 
+# Taille des blocs (en octets) lus puis écrits sur disque lors d'un upload.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Nombre de tâches d'indexation terminées dont le statut reste consultable sur /jobs/{id}.
+JOBS_HISTORY = 1000
+
 # Clé d'API secrète pour protéger les endpoints de l'API.
 # Remplacez cette valeur par une clé forte et unique en production.
 API_KEY = "YOUR_API_KEY"
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Constructeur de l'index pour un déploiement à plusieurs workers.
+
+Lancer un seul processus constructeur, puis les workers de l'API avec INDEX_ROLE=lecteur :
+
+    python constructeur_index.py
+    INDEX_ROLE=lecteur uvicorn fastapi_main:app --workers 4
+
+Le constructeur est le seul processus qui lit les documents de config.DATA_DIR.
+Il parcourt le dossier toutes les config.BUILDER_INTERVAL secondes, indexe les
+fichiers nouveaux ou modifiés, retire les fichiers supprimés et publie une
+nouvelle génération de l'instantané dans config.INDEX_DIR. Les workers ouvrent
+cet instantané en lecture seule (mmap) : la mémoire de l'index est partagée par
+tous, et chacun charge la nouvelle génération dès que le manifeste change.
+
+Avec un index réparti, lancer d'abord les partitions (python repartition.py
+--adresse ...), puis le constructeur et les workers avec les mêmes SHARD_ADDRESSES
+et SHARD_AUTHKEY : les workers interrogent les partitions que le constructeur alimente.
+"""
+
+import argparse
+import os
+import time
+
+import config # Importation de la configuration centralisée
+
+# le constructeur construit l'index lui-même, quel que soit INDEX_ROLE dans l'environnement
+config.INDEX_ROLE = "autonome"
+
+from chatbotcol import Chatbot # noqa: E402  (importé après le choix du rôle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit et publie l'index partagé par les workers de l'API.")
+    parser.add_argument("--intervalle", type=float, default=config.BUILDER_INTERVAL,
+                        help="secondes entre deux parcours du dossier de données")
+    parser.add_argument("--une-fois", action="store_true", help="construit l'index puis s'arrête")
+    args = parser.parse_args()
+
+    os.makedirs(config.DATA_DIR, exist_ok=True)
+    # le Chatbot charge l'instantané existant, indexe les documents modifiés et publie le résultat
+    bot = Chatbot()
+    if bot.index is None:
+        print("Erreur: index non disponible (scikit-learn ou scipy manquant)")
+        return
+    # aucun instantané publié (dossier vide au premier lancement) : on publie l'index vide
+    if bot.index.generation is None:
+        bot.sauvegarder_index()
+    print(f"Index publié dans {config.INDEX_DIR} (génération {bot.index.generation}, {len(bot.index)} chunks)")
+    if args.une_fois:
+        return
+    while True:
+        time.sleep(args.intervalle)
+        generation = bot.index.generation
+        bot.charger_documents(config.DATA_DIR)
+        if bot.index.generation != generation:
+            print(f"Nouvelle génération {bot.index.generation} ({len(bot.index)} chunks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Découpage des documents en chunks, au fil de la lecture.
+
+Le texte d'un document arrive par segments (blocs d'un fichier texte,
+paragraphes Word, pages PDF) produits par un générateur : le document entier
+n'est jamais chargé en une seule chaîne. Les phrases sont délimitées avec la
+même règle que l'ancien découpage (ponctuation . ! ? suivie d'espaces, une
+phrase peut se poursuivre d'un segment à l'autre) et regroupées par
+taille_fenetre phrases. Le résultat est identique à celui obtenu en découpant
+la concaténation des segments.
+
+Chaque chunk est accompagné de sa source : positions de début et de fin (en
+caractères) dans le texte du document et, si les segments en indiquent une,
+première et dernière unité (page, paragraphe) couvertes par le chunk.
+"""
+
+import re
+from itertools import accumulate
+
+import config # Importation de la configuration centralisée
+
+# fin de phrase : ., ! ou ? suivi d'un ou plusieurs espaces (les espaces séparent deux phrases).
+# Le groupe capturant fait retourner à split les phrases et les séparateurs en alternance.
+SEPARATEUR = re.compile(r'((?<=[.!?])\s+)')
+
+# une "phrase" sans ponctuation plus longue que ceci est coupée : la mémoire reste bornée
+# même pour un document sans aucun point
+LONGUEUR_MAX_PHRASE = 100_000
+
+
+def _unite(unites, position):
+    """Unité (page, paragraphe...) du segment qui contient position dans le document."""
+    for debut, unite in reversed(unites):
+        if debut <= position:
+            return unite
+    return unites[0][1] if unites else None
+
+
+def _source(debut, fin, premiere, derniere):
+    source = {"debut": debut, "fin": fin}
+    if premiere is not None:
+        # unite = ("page", 3) : la source indique la première et la dernière page du chunk
+        source[premiere[0]] = [premiere[1], derniere[1] if derniere is not None else premiere[1]]
+    return source
+
+
+def decouper_segments(segments, taille_fenetre=config.CHUNK_SIZE):
+    """
+    Générateur de (texte du chunk, source) à partir d'un itérable de (texte, unité),
+    où unité vaut par exemple ("page", 3) ou None.
+    """
+    tampon = ""             # texte lu mais pas encore découpé (la phrase en cours)
+    tampon_debut = 0        # position du tampon dans le document
+    unites = []             # (position de début, unité) des segments dont le texte est encore dans le tampon
+    attente = []            # phrases terminées, pas encore assez nombreuses pour former un chunk
+    attente_debut = None    # (position, unité) du début de la première phrase en attente
+    attente_fin = 0         # position de fin de la dernière phrase en attente
+
+    def regrouper(phrases, debuts, fins, final):
+        """
+        Regroupe les phrases en attente et les nouvelles phrases (positions relatives au
+        tampon) par taille_fenetre ; hors fin de document, le reste attend les phrases suivantes.
+        """
+        nonlocal attente, attente_debut, attente_fin
+        decalage = len(attente)
+        textes = attente + phrases
+        complets = len(textes) if final else len(textes) - len(textes) % taille_fenetre
+        for k in range(0, complets, taille_fenetre):
+            texte = " ".join(textes[k:k + taille_fenetre])
+            if not texte.strip():
+                continue
+            if k < decalage:
+                debut, premiere = attente_debut
+            else:
+                debut = tampon_debut + debuts[k - decalage]
+                premiere = _unite(unites, debut)
+            dernier = min(k + taille_fenetre, len(textes)) - 1
+            fin = tampon_debut + fins[dernier - decalage] if dernier >= decalage else attente_fin
+            yield texte, _source(debut, fin, premiere, _unite(unites, max(debut, fin - 1)))
+        if complets < len(textes) and complets >= decalage:
+            # la première phrase en attente est une nouvelle phrase : sa position est notée maintenant
+            debut = tampon_debut + debuts[complets - decalage]
+            attente_debut = (debut, _unite(unites, debut))
+        if phrases:
+            attente_fin = tampon_debut + fins[-1]
+        attente = textes[complets:]
+
+    def decouper(final):
+        """Découpe le tampon ; hors fin de document, la dernière phrase (incomplète) y reste."""
+        nonlocal tampon, tampon_debut
+        # [phrase, séparateur, phrase, ..., séparateur, phrase] et position de fin de chaque partie
+        parties = SEPARATEUR.split(tampon)
+        fins_parties = list(accumulate(map(len, parties)))
+        nb_separateurs = len(parties) // 2
+        if final:
+            nb = nb_separateurs + 1
+        elif nb_separateurs and parties[-1] == "":
+            # les espaces finaux peuvent continuer dans le segment suivant : décision reportée
+            nb = nb_separateurs - 1
+        else:
+            nb = nb_separateurs
+        phrases = parties[0:2 * nb:2]
+        debuts = [0] + fins_parties[1:2 * nb - 1:2] if nb else []
+        fins = fins_parties[0:2 * nb:2]
+        # début de la première phrase qui reste dans le tampon
+        coupe = len(tampon) if final else (fins_parties[2 * nb - 1] if nb else 0)
+        if len(tampon) - coupe > LONGUEUR_MAX_PHRASE:
+            # phrase sans fin trop longue : coupée de force
+            phrases.append(tampon[coupe:])
+            debuts.append(coupe)
+            fins.append(len(tampon))
+            coupe = len(tampon)
+        yield from regrouper(phrases, debuts, fins, final)
+        tampon = tampon[coupe:]
+        tampon_debut += coupe
+
+    for texte, unite in segments:
+        if not texte:
+            continue
+        if unite is not None:
+            unites.append((tampon_debut + len(tampon), unite))
+        tampon += texte
+        yield from decouper(False)
+        # on ne garde que les unités des segments encore présents dans le tampon
+        while len(unites) > 1 and unites[1][0] <= tampon_debut:
+            unites.pop(0)
+    # fin du document : toutes les phrases restantes, y compris la dernière (éventuellement vide)
+    yield from decouper(True)
@@ -0,0 +1,53 @@
+"""
+Chargement différé des dépendances lourdes (scikit-learn, PyMuPDF, python-docx, spaCy).
+
+Importer scikit-learn prend à lui seul plus d'une seconde, et spaCy autant avec
+son modèle : les importer avec chatbotcol ralentissait chaque démarrage de worker
+et chaque rechargement de l'API. Ces modules ne sont donc importés qu'à leur
+première utilisation ; au démarrage, on vérifie seulement qu'ils sont installés
+(importlib.util.find_spec ne les exécute pas).
+
+La durée de chaque import différé est notée dans DUREES_IMPORT, pour le rapport
+de démarrage (voir benchmarks/rapport_demarrage.py).
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+from time import perf_counter
+
+# module -> durée (en secondes) de son import différé
+DUREES_IMPORT = {}
+
+
+def disponible(module):
+    """Vrai si le paquet module (nom de premier niveau, ex. "sklearn") est installé, sans l'importer."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def importer(module):
+    """Importe module à sa première utilisation ; les appels suivants retournent le module déjà chargé."""
+    deja_charge = module in sys.modules
+    debut = perf_counter()
+    charge = importlib.import_module(module)
+    if not deja_charge:
+        DUREES_IMPORT.setdefault(module, perf_counter() - debut)
+    return charge
+
+
+def prechauffer(modules):
+    """
+    Importe modules dans un thread d'arrière-plan (ceux qui ne sont pas installés sont ignorés).
+    Retourne le thread : l'appelant peut l'attendre avant de créer des processus (fork).
+    """
+    def charger():
+        for module in modules:
+            if disponible(module.split(".")[0]):
+                importer(module)
+    thread = threading.Thread(target=charger, name="prechauffage-imports", daemon=True)
+    thread.start()
+    return thread
@@ -1,6 +1,9 @@
 import os # Pour les opérations sur les fichiers et dossiers
 import datetime #Pour la gestion des dates
-import shutil # Pour la gestion des fichiers
+import json # Pour la sérialisation de l'historique
+from typing import List, Optional # Pour les champs optionnels et les listes des modèles de requêtes
+# Importation de la configuration centralisée pour les chemins et paramètres
+import config #config.py , qui contient les paramètres globaux
 
 # Gestion des imports avec gestion d'erreurs
 MODULES_MANQUANTS = []
@@ -10,6 +13,10 @@ try:
     from fastapi import HTTPException  # Ajout pour gestion d'erreurs HTTP
     from fastapi.security import APIKeyHeader # Pour la sécurité par clé d'API
     from starlette.status import HTTP_403_FORBIDDEN # Pour les codes de statut HTTP
+    from fastapi.responses import StreamingResponse # Pour renvoyer l'historique au fil de la lecture
+    from fastapi.responses import PlainTextResponse # Pour l'export des métriques au format texte de Prometheus
+    from fastapi.concurrency import run_in_threadpool # Pour les écritures disque hors de la boucle d'événements
+    from regroupement import Regroupeur # Pour traiter ensemble les requêtes /recherche concurrentes
 
 #en cas d'import manquant, on ajoute à la liste des modules manquants
 except ImportError:
@@ -26,7 +33,7 @@ except ImportError:
 
 try:
     #Pydantic est une bibliothèque utilisée par FastAPI pour la validation des données
-    from pydantic import BaseModel # Pour la validation des [modèles de requêtes/réponses]
+    from pydantic import BaseModel, Field # Pour la validation des [modèles de requêtes/réponses]
 except ImportError:
     MODULES_MANQUANTS.append("pydantic")
     BaseModel = None
@@ -37,6 +44,9 @@ except ImportError:
     MODULES_MANQUANTS.append("chatbotcol")
     Chatbot = None
 
+from taches import FileTaches # File des tâches d'indexation exécutées en arrière-plan
+from metriques import REGISTRE # Métriques exportées sur /metrics
+
 try:
     # Middleware CORS pour autoriser les requêtes cross-origin (utile pour le développement front-end)
     from fastapi.middleware.cors import CORSMiddleware # Pour gérer les CORS
@@ -95,6 +105,81 @@ else:
     #instanciation du chatbot
     bot = Chatbot()
 
+# Les documents uploadés sont indexés par cette file, hors de la boucle d'événements
+taches = FileTaches(config.JOBS_HISTORY)
+
+
+
+# Traitement d'un lot de requêtes /recherche formé par le regroupeur: les questions de mêmes k et seuil
+# sont traitées ensemble par repondre_batch (une seule vectorisation et un seul produit matriciel)
+def _repondre_lot(entrees):
+    if len(entrees) == 1:
+        question, k, seuil = entrees[0]
+        return [bot.repondre(question, k=k, seuil=seuil)]
+    groupes = {}
+    for position, (_, k, seuil) in enumerate(entrees):
+        groupes.setdefault((k, seuil), []).append(position)
+    resultats = [None] * len(entrees)
+    for (k, seuil), positions in groupes.items():
+        reponses = bot.repondre_batch([entrees[position][0] for position in positions], k=k, seuil=seuil)
+        for position, reponse in zip(positions, reponses):
+            resultats[position] = reponse
+    return resultats
+
+
+regroupeur = Regroupeur(_repondre_lot, config.MICROBATCH_MAX_SIZE, config.MICROBATCH_MAX_WAIT_MS / 1000)
+
+
+# Valeurs instantanées exportées sur /metrics, lues au moment de l'export
+def _statistique_index(cle):
+    return lambda: bot.index.statistiques()[cle] if bot is not None else None
+
+
+def _compteur_caches(cle):
+    def lire():
+        if bot is None:
+            return None
+        return {
+            "extraction": bot.cache_extraction.statistiques()[cle],
+            "reponses": bot.cache_reponses.statistiques()[cle],
+        }
+    return lire
+
+
+def _compteur_partitions(attribut):
+    # index réparti seulement (voir repartition.py) : compteur par numéro de partition
+    def lire():
+        compteurs = getattr(bot.index, attribut, None) if bot is not None else None
+        return {str(numero): valeur for numero, valeur in enumerate(compteurs)} if compteurs is not None else None
+    return lire
+
+
+REGISTRE.jauge("chatbot_index_chunks", "Nombre de chunks dans l'index des documents.", _statistique_index("chunks"))
+REGISTRE.jauge("chatbot_index_documents", "Nombre de documents dans l'index.", _statistique_index("documents"))
+REGISTRE.jauge("chatbot_index_termes", "Nombre de termes distincts dans l'index.", _statistique_index("termes"))
+REGISTRE.jauge("chatbot_index_nnz", "Nombre de valeurs non nulles de la matrice TF-IDF.", _statistique_index("nnz"))
+REGISTRE.jauge("chatbot_index_octets", "Taille des matrices de l'index en octets.", _statistique_index("octets"))
+REGISTRE.jauge("chatbot_index_version", "Version de l'index publié.",
+               lambda: bot.index.version if bot is not None else None)
+REGISTRE.jauge("chatbot_cache_hits_total", "Lectures trouvées dans le cache.",
+               _compteur_caches("hits"), ("cache",), "counter")
+REGISTRE.jauge("chatbot_cache_misses_total", "Lectures absentes du cache.",
+               _compteur_caches("misses"), ("cache",), "counter")
+REGISTRE.jauge("chatbot_cache_evictions_total", "Entrées retirées du cache faute de place.",
+               _compteur_caches("evictions"), ("cache",), "counter")
+REGISTRE.jauge("chatbot_cache_entrees", "Nombre d'entrées dans le cache.", _compteur_caches("entrees"), ("cache",))
+REGISTRE.jauge("chatbot_taches_en_attente", "Tâches d'indexation en attente.", taches.en_attente)
+REGISTRE.jauge("chatbot_partitions_hors_delai_total",
+               "Recherches auxquelles une partition de l'index réparti n'a pas répondu dans SHARD_TIMEOUT_MS.",
+               _compteur_partitions("hors_delai"), ("partition",), "counter")
+REGISTRE.jauge("chatbot_partitions_erreurs_total",
+               "Recherches auxquelles une partition de l'index réparti a répondu par une erreur.",
+               _compteur_partitions("erreurs"), ("partition",), "counter")
+REGISTRE.jauge("chatbot_recherche_lots_total", "Lots de requêtes /recherche formés par le regroupeur.",
+               lambda: regroupeur.nb_lots, type_metrique="counter")
+REGISTRE.jauge("chatbot_recherche_regroupees_total", "Requêtes /recherche traitées par le regroupeur.",
+               lambda: regroupeur.nb_entrees, type_metrique="counter")
+
 # Endpoint de test
 @app.get("/", summary="Endpoint de test de l'API")
 def lire_racine():
@@ -109,19 +194,34 @@ def lire_racine():
 if BaseModel is not None:
     class QuestionRequest(BaseModel):
         question: str # La question posée par l'utilisateur est une chaîne de caractères
+        k: int = Field(1, ge=1, le=config.MAX_PASSAGES) # Nombre de passages de documents à retourner
+        seuil: Optional[float] = Field(None, ge=0.0, le=1.0) # Score minimal d'un passage (par défaut, celui de la méthode de recherche configurée)
+        class Config:
+            schema_extra = {
+                "example": {"question": "Qu'est ce qu'une hypothese legale ?", "k": 3, "seuil": 0.1}
+            }
+
+    # Modèle pour recevoir un lot de questions
+    class BatchQuestionRequest(BaseModel):
+        questions: List[str] # Les questions à traiter ensemble (au plus config.MAX_BATCH_QUESTIONS)
+        k: int = Field(1, ge=1, le=config.MAX_PASSAGES) # Nombre de passages de documents à retourner par question
+        seuil: Optional[float] = Field(None, ge=0.0, le=1.0) # Score minimal d'un passage
         class Config:
             schema_extra = {
-                "example": {"question": "Qu'est ce qu'une hypothese legale ?"}
+                "example": {"questions": ["Bonjour", "Qu'est ce qu'une hypothese legale ?"], "k": 1}
             }
 else:
     QuestionRequest = None
+    BatchQuestionRequest = None
 
 # Endpoint pour répondre
 @app.post("/recherche", summary="Pose une question au chatbot", dependencies=[Depends(get_api_key)])
-def repondre_a_question(question: QuestionRequest):
+async def repondre_a_question(question: QuestionRequest):
     """
     Cet endpoint reçoit une question de l'utilisateur, la traite avec le chatbot
     et retourne la réponse trouvée, le score de confiance et d'autres métadonnées.
+    Les requêtes qui arrivent en même temps sont regroupées en lots (voir
+    regroupement.py et config.MICROBATCH_MAX_SIZE / MICROBATCH_MAX_WAIT_MS).
     """
     if app is None:
         return {"error": "API non disponible"}
@@ -133,15 +233,34 @@ def repondre_a_question(question: QuestionRequest):
         return {"error": "Modèle de données non disponible"}
     # Traiter la question avec le bot
     try:
-        reponse = bot.repondre(question.question)
+        if config.MICROBATCH_MAX_SIZE > 1:
+            reponse = await regroupeur.soumettre((question.question, question.k, question.seuil))
+        else:
+            reponse = await run_in_threadpool(bot.repondre, question.question, k=question.k, seuil=question.seuil)
         return {"recherche": reponse}
     except Exception as e:
         #en cas d'erreur, on retourne un message d'erreur
         return {"error": f"Erreur lors du traitement de la question: {e}"}
    
 
-# Importation de la configuration centralisée pour les chemins et paramètres
-import config #config.py , qui contient les paramètres globaux
+# Endpoint pour répondre à un lot de questions
+@app.post("/recherche/batch", summary="Pose un lot de questions au chatbot", dependencies=[Depends(get_api_key)])
+def repondre_a_lot(lot: BatchQuestionRequest):
+    """
+    Traite plusieurs questions en un seul appel (tests de non-régression de la FAQ,
+    analyses). Les questions qui nécessitent une recherche dans les documents sont
+    comparées aux documents en un seul calcul. Les réponses sont retournées dans
+    l'ordre des questions.
+    """
+    if bot is None:
+        return {"error": "Chatbot non disponible"}
+    if len(lot.questions) > config.MAX_BATCH_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"Lot trop grand (maximum {config.MAX_BATCH_QUESTIONS} questions)")
+    try:
+        return {"recherche": bot.repondre_batch(lot.questions, k=lot.k, seuil=lot.seuil)}
+    except Exception as e:
+        return {"error": f"Erreur lors du traitement du lot: {e}"}
+
 
 # Le dossier de données est maintenant défini de manière centralisée dans config.py
 DATA_DIR = config.DATA_DIR
@@ -186,59 +305,181 @@ def lister_documents():
         # Remonte l'erreur via HTTPException
         raise HTTPException(status_code=500, detail=str(e))
     
-# Endpoint pour uploader un document
-@app.post("/upload", summary="Uploade un nouveau document pour le chatbot", dependencies=[Depends(get_api_key)])
-async def uploader_document(file: UploadFile = File(...)):
-    """
-    Permet d'envoyer un nouveau document (.txt, .pdf, .docx) qui sera ajouté 
-    à la base de connaissances du chatbot. Le fichier est sauvegardé dans le 
-    dossier de données et son contenu est immédiatement chargé dans le bot.
-    """
-    if app is None:
-        return {"error": "API non disponible"}
-
-    if not file.filename.lower().endswith(('.txt', '.pdf', '.docx')):
+# Écriture d'un document uploadé dans le dossier de données, puis indexation en tâche de fond
+async def _enregistrer_document(file, nom_fichier):
+    if not nom_fichier.lower().endswith(('.txt', '.pdf', '.docx')):
         # Utilisation de HTTPException pour signaler l'erreur de format
         raise HTTPException(
             status_code=400,
             detail="Format de fichier non supporté. Seuls les fichiers .txt, .pdf, .docx sont autorisés."
         )
 
-    chemin_sauvegarde = os.path.join(DATA_DIR, file.filename)
+    chemin_sauvegarde = os.path.join(DATA_DIR, nom_fichier)
+    # écriture dans un fichier temporaire renommé à la fin : un fichier incomplet n'est jamais indexé
+    chemin_temporaire = f"{chemin_sauvegarde}.part"
 
     try:
         # Créer le dossier s'il n'existe pas
         os.makedirs(DATA_DIR, exist_ok=True)
 
-        with open(chemin_sauvegarde, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer) # Sauvegarde du fichier uploadé
-
-        # Chargement optimisé du nouveau document dans le bot (si disponible)
-        if bot is not None:
-            try:
-                # Déterminer l'action en fonction de l'extension du fichier
-                file_ext = os.path.splitext(file.filename)[1].lower()
-                if file_ext == '.txt':
-                    bot.lire_fichier_txt(chemin_sauvegarde)
-                elif file_ext == '.pdf':
-                    bot.lire_fichier_pdf(chemin_sauvegarde)
-                elif file_ext == '.docx':
-                    bot.lire_fichier_word(chemin_sauvegarde)
-                
-                print(f"Fichier '{file.filename}' chargé dynamiquement dans le bot.")
-
-            except Exception as e:
-                # Si le chargement dans le bot échoue, lever une exception.
-                # Le fichier est sauvegardé, mais le client doit savoir que le bot n'a pas pu le traiter.
-                raise HTTPException(status_code=500, detail=f"Le fichier a été uploadé, mais une erreur est survenue lors de son traitement par le bot: {e}")
-
-        return {"message": f"Fichier '{file.filename}' uploadé et traité avec succès."}
+        buffer = await run_in_threadpool(open, chemin_temporaire, "wb")
+        try:
+            while True:
+                bloc = await file.read(config.UPLOAD_CHUNK_SIZE)
+                if not bloc:
+                    break
+                await run_in_threadpool(buffer.write, bloc)
+        finally:
+            await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, chemin_temporaire, chemin_sauvegarde)
 
     except Exception as e:
+        if os.path.exists(chemin_temporaire):
+            os.remove(chemin_temporaire)
         # Remonte l'erreur via HTTPException
         raise HTTPException(status_code=500, detail=str(e))
+
+    if bot is None:
+        return {"message": f"Fichier '{nom_fichier}' uploadé (chatbot non disponible, indexation au prochain démarrage)."}
+
+    job_id = taches.soumettre(bot.indexer_fichier, chemin_sauvegarde, description=f"indexation de {nom_fichier}")
+    return {
+        "message": f"Fichier '{nom_fichier}' uploadé, indexation en cours.",
+        "job_id": job_id,
+        "statut_url": f"/jobs/{job_id}",
+    }
+
+
+# Nom de document passé dans l'URL : un simple nom de fichier du dossier de données
+def _verifier_nom_document(nom):
+    if not nom or os.path.basename(nom) != nom or nom in (".", ".."):
+        raise HTTPException(status_code=400, detail=f"Nom de document invalide : {nom!r}")
+    return nom
+
+
+# Endpoint pour uploader un document
+@app.post("/upload", status_code=202, summary="Uploade un nouveau document pour le chatbot", dependencies=[Depends(get_api_key)])
+async def uploader_document(file: UploadFile = File(...)):
+    """
+    Permet d'envoyer un nouveau document (.txt, .pdf, .docx) qui sera ajouté 
+    à la base de connaissances du chatbot. Le fichier est écrit dans le dossier
+    de données par blocs, puis son indexation est confiée à une tâche d'arrière-plan :
+    la réponse contient l'identifiant de la tâche, à suivre sur /jobs/{job_id}.
+    Les requêtes continuent d'utiliser l'index précédent jusqu'à la fin de l'indexation.
+    Un document du même nom est remplacé.
+    """
+    if app is None:
+        return {"error": "API non disponible"}
+    return await _enregistrer_document(file, os.path.basename(file.filename))
+
+
+# Endpoint pour remplacer (ou créer) un document
+@app.put("/documents/{nom}", status_code=202, summary="Remplace un document du chatbot", dependencies=[Depends(get_api_key)])
+async def remplacer_document(nom: str, file: UploadFile = File(...)):
+    """
+    Remplace le document nom par le fichier envoyé (ou le crée s'il n'existe pas).
+    Comme pour /upload, l'indexation est faite en tâche de fond : seuls les chunks
+    de ce document sont retirés de l'index puis remplacés, les autres documents ne
+    sont ni relus ni re-vectorisés.
+    """
+    return await _enregistrer_document(file, _verifier_nom_document(nom))
+
+
+# Endpoint pour supprimer un document
+@app.delete("/documents/{nom}", summary="Supprime un document du chatbot", dependencies=[Depends(get_api_key)])
+def supprimer_document(nom: str):
+    """
+    Supprime le fichier du document et retire ses chunks des réponses. Les chunks
+    sont marqués supprimés dans l'index (immédiatement ignorés par les recherches)
+    et retirés physiquement par un compactage en arrière-plan, lancé quand leur
+    part dépasse config.COMPACTION_DEAD_RATIO.
+    """
+    _verifier_nom_document(nom)
+    if bot is None:
+        return {"error": "Chatbot non disponible"}
+    try:
+        nb = bot.supprimer_document(nom)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if nb is None:
+        raise HTTPException(status_code=404, detail=f"Document '{nom}' inconnu")
+    return {"message": f"Document '{nom}' supprimé.", "chunks_supprimes": nb}
+
+
+# Endpoint pour suivre une tâche d'indexation
+@app.get("/jobs/{job_id}", summary="Statut d'une tâche d'indexation", dependencies=[Depends(get_api_key)])
+def statut_tache(job_id: str):
+    """
+    Retourne le statut d'une tâche soumise par /upload : en_attente, en_cours,
+    termine (avec le rapport d'ingestion) ou erreur (avec le message d'erreur).
+    """
+    tache = taches.statut(job_id)
+    if tache is None:
+        raise HTTPException(status_code=404, detail=f"Tâche {job_id} inconnue")
+    return tache
     
 
+# Endpoint pour l'historique des interactions
+@app.get("/historique", summary="Historique des interactions (JSON Lines)", dependencies=[Depends(get_api_key)])
+def lire_historique():
+    """
+    Renvoie toutes les interactions enregistrées, une par ligne (format JSON Lines),
+    de la plus ancienne à la plus récente. L'historique est lu au fil de l'envoi,
+    sans être chargé entièrement en mémoire.
+    """
+    if bot is None:
+        raise HTTPException(status_code=503, detail="Chatbot non disponible")
+    lignes = (json.dumps(interaction, ensure_ascii=False) + "\n" for interaction in bot.lire_historique())
+    return StreamingResponse(lignes, media_type="application/x-ndjson")
+
+
+# Endpoint pour les statistiques des questions
+@app.get("/statistiques", summary="Questions les plus posées et comptes par fenêtre de temps", dependencies=[Depends(get_api_key)])
+def lire_statistiques(top: int = 10, fenetre: int = 3600):
+    """
+    Retourne les `top` questions les plus posées depuis le début, ainsi que le nombre
+    de questions et le top sur les `fenetre` dernières secondes. Les valeurs sont
+    lues en mémoire, sans accès disque.
+    """
+    if bot is None:
+        raise HTTPException(status_code=503, detail="Chatbot non disponible")
+    recents = bot.statistiques.fenetre(fenetre, top)
+    return {
+        "top": [{"question": q, "nombre": n} for q, n in bot.statistiques.top(top)],
+        "fenetre_s": fenetre,
+        "questions_fenetre": recents["questions"],
+        "top_fenetre": [{"question": q, "nombre": n} for q, n in recents["top"]],
+    }
+
+
+# Endpoint pour les statistiques des caches du bot
+@app.get("/caches", summary="Statistiques des caches du chatbot", dependencies=[Depends(get_api_key)])
+def statistiques_caches():
+    """
+    Retourne les compteurs (hits, misses, évictions, taille) des caches du chatbot :
+    cache d'extraction des documents et cache des réponses aux questions.
+    """
+    if bot is None:
+        raise HTTPException(status_code=503, detail="Chatbot non disponible")
+    return {
+        "extraction": bot.cache_extraction.statistiques(),
+        "reponses": bot.cache_reponses.statistiques(),
+    }
+
+
+# Endpoint pour les métriques
+@app.get("/metrics", summary="Métriques du chatbot au format Prometheus")
+def exporter_metriques():
+    """
+    Retourne les durées par étape (réponse aux questions, lots, ingestion) sous forme
+    d'histogrammes, la taille de l'index, les compteurs des caches et la longueur de
+    la file d'indexation, au format texte de Prometheus. Comme /system-info, cet
+    endpoint ne demande pas de clé d'API, pour pouvoir être interrogé par un
+    collecteur : il ne contient ni question ni extrait de document.
+    """
+    return PlainTextResponse(REGISTRE.exporter(), media_type="text/plain; version=0.0.4")
+
+
 # Endpoint pour les informations système
 @app.get("/system-info", summary="Récupère les prérequis système")
 def get_system_info():
@@ -9,11 +9,10 @@ except ImportError:
     MODULES_MANQUANTS.append("customtkinter")
     customtkinter = None
 
-try:
-    import fitz
-except ImportError:
+# PyMuPDF n'est importé qu'à la lecture d'un PDF (voir dependances.py)
+from dependances import disponible
+if not disponible("fitz"):
     MODULES_MANQUANTS.append("PyMuPDF")
-    fitz = None
 
 try:
     from chatbotcol import Chatbot
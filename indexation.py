@@ -0,0 +1,883 @@
+"""
+Index TF-IDF incrémental pour les documents du chatbot.
+
+Au lieu de re-découper tout le corpus et de ré-entraîner un TfidfVectorizer à
+chaque ajout, chaque document est vectorisé seul avec un HashingVectorizer
+(vocabulaire "sans état" : un terme a toujours la même colonne) puis ajouté à la
+matrice existante. Les poids IDF (et les statistiques BM25) ne sont pas recalculés
+sur tout l'index à chaque ajout : tant que les chunks ajoutés depuis le dernier
+calcul restent sous config.IDF_REFRESH_DRIFT (en proportion) et que ce calcul
+date de moins de config.IDF_REFRESH_INTERVAL secondes, les nouveaux chunks forment
+un segment pondéré avec les poids courants. La publication d'un ajout ne coûte
+alors que la taille de cet ajout (plus la fusion occasionnelle de segments de
+tailles voisines), au prix de poids légèrement en retard sur le corpus.
+
+L'index peut être sauvegardé sur disque (instantané versionné) puis rechargé au
+démarrage : les matrices sont stockées en tableaux .npy bruts ouverts en
+mémoire partagée (mmap), et chaque document garde la signature de son fichier
+(taille, date de modification, empreinte SHA-256) pour ne ré-extraire que les
+fichiers modifiés.
+
+Plusieurs processus (workers de l'API) peuvent ouvrir le même instantané en
+lecture seule : les tableaux en mmap sont partagés par le cache de pages du
+système, et la matrice transposée est elle aussi sauvegardée pour ne pas être
+reconstruite en mémoire par chaque processus. Les textes des chunks sont eux
+aussi un tableau d'octets en mmap (voir magasin_chunks.py), décodés seulement
+pour les passages retournés.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+import config # Importation de la configuration centralisée
+from dependances import disponible, importer # import de scikit-learn à la première vectorisation
+from bm25 import PostingsBM25, SegmentsBM25 # listes inversées pondérées BM25 (méthode "bm25")
+from recherche_dense import VecteursDenses, encodeur_configure, methodes_du_mode # vecteurs denses des chunks (méthode "dense")
+from normalisation import Analyseur # mots sans accents ni ponctuation, puis n-grammes (partagé avec les questions)
+from magasin_chunks import MagasinChunks # textes des chunks dans un seul tableau UTF-8, documents et sources en tableaux
+
+# Gestion des imports avec gestion d'erreurs
+MODULES_MANQUANTS = []
+
+try:
+    import numpy as np # calcul vectoriel (fréquences documentaires, poids IDF)
+    from scipy import sparse # matrices creuses
+except ImportError:
+    MODULES_MANQUANTS.append("scipy")
+    np = None
+    sparse = None
+
+# scikit-learn (HashingVectorizer, normalisation L2) n'est importé qu'au premier calcul :
+# un worker qui ouvre un instantané existant démarre sans lui (voir dependances.py)
+if not disponible("sklearn"):
+    MODULES_MANQUANTS.append("scikit-learn")
+
+if MODULES_MANQUANTS:
+    print(f"Attention: Modules manquants détectés dans l'indexation: {', '.join(MODULES_MANQUANTS)}")
+
+
+# version du format de l'instantané sur disque (à incrémenter si la structure change)
+FORMAT_INDEX = 5
+# nom du manifeste qui désigne la génération courante de l'instantané
+MANIFESTE = "index.json"
+
+
+def empreinte_fichier(chemin, taille_bloc=1 << 20):
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs."""
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def signature_fichier(chemin):
+    """Signature utilisée pour savoir si un fichier a changé depuis son indexation."""
+    stat = os.stat(chemin)
+    return {"taille": stat.st_size, "mtime": stat.st_mtime, "sha256": empreinte_fichier(chemin)}
+
+
+def signature_manifeste(dossier):
+    """
+    Identifie la génération publiée dans dossier sans lire le manifeste : celui-ci
+    est remplacé par os.replace à chaque sauvegarde, son inode et sa date changent donc.
+    Retourne None s'il n'existe pas.
+    """
+    try:
+        stat = os.stat(os.path.join(dossier, MANIFESTE))
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def meilleurs_scores(indices, scores, k, seuil):
+    """
+    Sélectionne les k meilleurs scores strictement supérieurs au seuil parmi les
+    valeurs non nulles d'une ligne de scores creuse. argpartition ne trie que les
+    k retenus : le coût est linéaire dans le nombre de chunks ayant un terme commun
+    avec la question, et jamais dans la taille totale de l'index.
+    """
+    garder = scores > seuil
+    indices, scores = indices[garder], scores[garder]
+    if len(scores) > k:
+        partition = np.argpartition(-scores, k - 1)[:k]
+        indices, scores = indices[partition], scores[partition]
+    # tri final des k retenus (à score égal, le chunk le plus ancien d'abord)
+    ordre = np.lexsort((indices, -scores))
+    return indices[ordre], scores[ordre]
+
+
+def normaliser(matrice):
+    """
+    Normalisation L2 des lignes (sklearn.preprocessing.normalize, importé au premier appel).
+    Une matrice sans ligne (index vide, par exemple compacté après le retrait de tous les
+    documents) est retournée vide : normalize refuse les matrices de 0 ligne.
+    """
+    if matrice.shape[0] == 0:
+        return sparse.csr_matrix(matrice.shape, dtype=np.float64)
+    return importer("sklearn.preprocessing").normalize(matrice)
+
+
+class _Segment:
+    """
+    Chunks debut à fin de l'index pondérés avec les mêmes poids : matrice TF-IDF normalisée,
+    sa transposée et ses listes BM25 (construites au premier besoin, puis partagées par les
+    versions suivantes de l'index tant que les poids ne sont pas recalculés).
+    """
+
+    __slots__ = ("debut", "fin", "matrice", "transposee", "bm25")
+
+    def __init__(self, debut, fin, matrice, transposee=None, bm25=None):
+        self.debut = debut
+        self.fin = fin
+        self.matrice = matrice
+        self.transposee = transposee
+        self.bm25 = bm25
+
+    def __len__(self):
+        return self.fin - self.debut
+
+
+# Classe de l'index incrémental(les chunks sont ajoutés document par document)
+class IndexIncremental:
+    def __init__(self, n_features=config.HASH_FEATURES, ngram_range=(1, 2)):
+        # vectoriseur "à hachage" créé au premier besoin (voir la propriété vectorizer)
+        self._vectorizer = None
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = n_features
+        # encodeur et vecteurs denses des chunks, seulement si config.RETRIEVAL_MODE les utilise
+        self.encodeur = encodeur_configure()
+        self.denses = None
+        # textes des chunks, document auquel chacun appartient et position dans ce document (voir magasin_chunks.py)
+        self.chunks = MagasinChunks()
+        # signature du fichier source de chaque document indexé (vide si le contenu n'a pas de fichier)
+        self.documents = {}
+        # plage (début, fin) des chunks de chaque document : les chunks d'un document sont contigus
+        self.plages = {}
+        # "pierres tombales" : chunks des documents retirés ou remplacés, ignorés par les recherches
+        # jusqu'au compactage (tableau de booléens, None tant qu'aucun chunk n'est supprimé)
+        self._morts = None
+        self.nb_supprimes = 0
+        # blocs de comptes bruts (un bloc par document ajouté)
+        self._blocs = []
+        # nombre de chunks contenant chaque terme (fréquence documentaire) et somme des longueurs (en termes)
+        self._df = np.zeros(n_features, dtype=np.int64)
+        self._longueur_totale = 0.0
+        # poids IDF et segments de chunks pondérés avec eux (voir _rafraichir) ; statistiques d'où viennent
+        # les poids (fréquences documentaires, nombre de chunks, longueur moyenne), et nombre de chunks
+        # de l'index et date (time.time) de leur dernier calcul complet
+        self._idf = None
+        self._segments = []
+        self._statistiques_idf = None
+        self._calcul = None
+        # calcul complet demandé (compactage, nouvelles statistiques globales)
+        self._recalcul_complet = False
+        # listes inversées BM25 de tous les segments, assemblées au premier besoin
+        self._bm25 = None
+        # partition d'un index réparti (voir repartition.py) : statistiques de toutes les partitions fixées
+        # par le coordinateur, (fréquences documentaires, nombre de chunks, longueur moyenne des chunks),
+        # utilisées pour les poids IDF et BM25 à la place de celles de cet index (None pour un index seul),
+        # et bornes des impacts BM25 de toutes les partitions (normalisation des scores BM25)
+        self._globales = None
+        self._normes_bm25 = None
+        self._perime = False
+        # numéro de version (incrémenté à chaque copie) ; un index figé n'est plus modifiable
+        self.version = 0
+        # génération de l'instantané sur disque dont provient l'index (None si construit en mémoire)
+        self.generation = None
+        self.fige = False
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def vectorizer(self):
+        """
+        Vectoriseur "à hachage" : les comptes bruts sont calculés sans vocabulaire global.
+        Les termes sont produits par normalisation.Analyseur (accents retirés, ngram_range
+        appliqué par l'analyseur), pour les chunks comme pour les questions.
+        """
+        if self._vectorizer is None:
+            texte = importer("sklearn.feature_extraction.text")
+            self._vectorizer = texte.HashingVectorizer(
+                n_features=self.n_features,
+                analyzer=Analyseur(self.ngram_range),
+                alternate_sign=False,
+                norm=None,
+            )
+        return self._vectorizer
+
+    def copie(self):
+        """
+        Copie modifiable de l'index, avec le numéro de version suivant. Les matrices ne
+        sont jamais modifiées sur place, elles sont donc partagées (comme les chunks) ;
+        seuls les dictionnaires et les fréquences sont copiés.
+        """
+        index = IndexIncremental.__new__(IndexIncremental)
+        index.__dict__.update(self.__dict__)
+        index.documents = {nom: dict(meta) for nom, meta in self.documents.items()}
+        index.plages = dict(self.plages)
+        index._blocs = list(self._blocs)
+        index._segments = list(self._segments)
+        index._df = self._df.copy()
+        index.version = self.version + 1
+        index.generation = None
+        index.fige = False
+        return index
+
+    def figer(self):
+        """
+        Rend l'index immuable avant de le publier aux requêtes : les segments des chunks ajoutés
+        (ou tout l'index, voir _rafraichir), leurs transposées et leurs listes BM25 sont construits,
+        et les tableaux passent en lecture seule. Toute modification passe ensuite par copie().
+        """
+        if self.fige:
+            return self
+        if len(self.chunks):
+            if self._perime or self._idf is None:
+                self._rafraichir()
+            for segment in self._segments:
+                self._transposee(segment)
+            if "bm25" in methodes_du_mode(config.RETRIEVAL_MODE):
+                self.postings_bm25().figer()
+            if self.denses is not None:
+                self.denses.preparer()
+            tableaux = [self._idf]
+            for segment in self._segments:
+                for matrice in (segment.matrice, segment.transposee):
+                    tableaux.extend((matrice.data, matrice.indices, matrice.indptr))
+            for tableau in tableaux:
+                if isinstance(tableau, np.ndarray) and tableau.flags.writeable:
+                    tableau.flags.writeable = False
+        self.fige = True
+        return self
+
+    def _verifier_modifiable(self):
+        if self.fige:
+            raise RuntimeError("Index figé : les modifications doivent être faites sur index.copie().")
+
+    def ajouter_document(self, nom, chunks, signature=None, sources=None):
+        """Vectorise les chunks d'un seul document et les ajoute à l'index (remplace un document du même nom)."""
+        return self.ajouter_documents([(nom, chunks, signature, sources)])
+
+    def ajouter_documents(self, documents):
+        """
+        Ajoute plusieurs documents (nom, chunks, signature, sources) en une seule vectorisation ;
+        sources (position de chaque chunk dans le document) peut être None.
+        Les documents déjà indexés sous le même nom sont remplacés.
+        """
+        self._verifier_modifiable()
+        remplaces = [nom for nom, *_ in documents if nom in self.documents]
+        if remplaces:
+            self.retirer_documents(remplaces)
+        tous_chunks = []
+        for nom, chunks, signature, positions in documents:
+            self.documents[nom] = dict(signature or {})
+            debut = len(self.chunks) + len(tous_chunks)
+            self.plages[nom] = (debut, debut + len(chunks))
+            tous_chunks.extend(chunks)
+        if not tous_chunks:
+            return 0
+        comptes = self.vectorizer.transform(tous_chunks).tocsr()
+        if self.encodeur is not None:
+            # vecteurs denses calculés par lots, dans le même ordre que les chunks
+            if self.denses is None:
+                self.denses = VecteursDenses(self.encodeur.dimension, config.DENSE_QUANTIZATION)
+            self.denses = self.denses.ajouter(self.encodeur.encoder(tous_chunks))
+        # chaque terme présent dans un chunk compte une fois dans la fréquence documentaire
+        self._df += np.bincount(comptes.indices, minlength=self.n_features)
+        self._longueur_totale += float(comptes.sum())
+        self._blocs.append(comptes)
+        self.chunks = self.chunks.ajouter([(nom, chunks, positions) for nom, chunks, _, positions in documents])
+        if self._morts is not None:
+            self._morts = np.concatenate((self._morts, np.zeros(len(tous_chunks), dtype=bool)))
+        self._perime = True
+        return len(tous_chunks)
+
+    def _comptes(self):
+        """Matrice des comptes bruts de tous les chunks (les blocs sont fusionnés une seule fois)."""
+        if len(self._blocs) > 1:
+            self._blocs = [sparse.vstack(self._blocs, format="csr")]
+        return self._blocs[0] if self._blocs else sparse.csr_matrix((0, self.n_features))
+
+    def _comptes_plage(self, debut, fin):
+        """Comptes bruts des chunks debut à fin : seuls les blocs qui les contiennent sont lus."""
+        if debut == 0 and fin == len(self.chunks):
+            return self._comptes()
+        morceaux, position = [], 0
+        for bloc in self._blocs:
+            suivant = position + bloc.shape[0]
+            if suivant > debut and position < fin:
+                entier = position >= debut and suivant <= fin
+                morceaux.append(bloc if entier else bloc[max(debut - position, 0):min(fin, suivant) - position])
+            position = suivant
+        if not morceaux:
+            return sparse.csr_matrix((0, self.n_features))
+        return morceaux[0] if len(morceaux) == 1 else sparse.vstack(morceaux, format="csr")
+
+    def retirer_documents(self, noms):
+        """
+        Retire les documents donnés : leurs chunks sont seulement marqués supprimés
+        (pierres tombales), sans toucher aux matrices ni aux autres documents. Le coût
+        est celui des chunks retirés ; les recherches les ignorent, et ils restent comptés
+        dans les fréquences documentaires jusqu'au compactage (voir compacter).
+        """
+        self._verifier_modifiable()
+        morts = self._morts.copy() if self._morts is not None else np.zeros(len(self.chunks), dtype=bool)
+        nb = 0
+        for nom in set(noms):
+            self.documents.pop(nom, None)
+            debut, fin = self.plages.pop(nom, (0, 0))
+            morts[debut:fin] = True
+            nb += fin - debut
+        if nb:
+            self._morts = morts
+            self.nb_supprimes += nb
+        return nb
+
+    def proportion_supprimes(self):
+        """Part des chunks de l'index marqués supprimés (0 si l'index est vide)."""
+        return self.nb_supprimes / len(self.chunks) if len(self.chunks) else 0.0
+
+    def compacter(self):
+        """
+        Retire physiquement les chunks supprimés : les matrices, les vecteurs denses et les
+        chunks sont filtrés, les fréquences documentaires et les poids IDF recalculés.
+        Les chunks restants sont renumérotés. Retourne le nombre de chunks retirés.
+        """
+        self._verifier_modifiable()
+        if not self.nb_supprimes:
+            return 0
+        garder = ~self._morts
+        comptes = self._comptes()
+        retires = comptes[self._morts]
+        self._df -= np.bincount(retires.indices, minlength=self.n_features)
+        self._longueur_totale -= float(retires.sum())
+        self._blocs = [comptes[garder]]
+        if self.denses is not None:
+            self.denses = self.denses.filtrer(garder)
+        self.chunks = self.chunks.filtrer(garder)
+        # nouvelle position d'un chunk = nombre de chunks gardés avant lui
+        avant = np.concatenate(([0], np.cumsum(garder)))
+        self.plages = {nom: (int(avant[debut]), int(avant[fin])) for nom, (debut, fin) in self.plages.items()}
+        nb = self.nb_supprimes
+        self._morts = None
+        self.nb_supprimes = 0
+        # les chunks sont renumérotés : tout l'index est repondéré
+        self._recalcul_complet = True
+        self._perime = True
+        return nb
+
+    def _meilleurs(self, indices, scores, k, seuil):
+        """meilleurs_scores, sans les chunks supprimés en attente de compactage."""
+        if self._morts is not None:
+            vivants = ~self._morts[indices]
+            indices, scores = indices[vivants], scores[vivants]
+        return meilleurs_scores(indices, scores, k, seuil)
+
+    def document_inchange(self, nom, chemin):
+        """Indique si le fichier chemin correspond toujours au document nom tel qu'il a été indexé."""
+        meta = self.documents.get(nom)
+        if not meta or "taille" not in meta:
+            return False
+        stat = os.stat(chemin)
+        if stat.st_size != meta["taille"]:
+            return False
+        if stat.st_mtime == meta["mtime"]:
+            return True
+        # date modifiée mais même taille : on tranche avec l'empreinte du contenu
+        if empreinte_fichier(chemin) == meta["sha256"]:
+            meta["mtime"] = stat.st_mtime
+            return True
+        return False
+
+    def _rafraichir(self):
+        """
+        Met à jour les poids et les segments après une modification. Calcul complet (poids IDF et
+        statistiques BM25 de tout l'index, un seul segment) s'il est demandé ou si les poids ont trop
+        vieilli (voir _recalcul_necessaire) ; sinon les chunks ajoutés forment un nouveau segment,
+        pondéré avec les poids courants, et les derniers segments sont fusionnés s'ils ont des tailles
+        voisines. Dans ce cas, le coût ne dépend que des chunks ajoutés (et des segments fusionnés).
+        """
+        if self._recalcul_necessaire():
+            self._recalculer()
+        else:
+            debut = self._segments[-1].fin
+            if debut < len(self.chunks):
+                self._segments = self._fusionner(self._segments + [self._segment(debut, len(self.chunks))])
+                self._bm25 = None
+        self._perime = False
+
+    def _recalcul_necessaire(self):
+        """
+        Calcul complet si aucun n'a été fait, s'il est demandé, si les chunks ajoutés depuis le dernier
+        dépassent config.IDF_REFRESH_DRIFT fois le nombre de chunks d'alors, ou s'il date de plus de
+        config.IDF_REFRESH_INTERVAL secondes.
+        """
+        if self._idf is None or self._recalcul_complet or not self._segments:
+            return True
+        if self._globales is not None:
+            # partition d'un index réparti : le coordinateur décide du recalcul (voir repartition.IndexReparti._publier)
+            return False
+        nb, horodatage = self._calcul
+        nouveaux = len(self.chunks) - nb
+        return nouveaux > config.IDF_REFRESH_DRIFT * nb or (
+            nouveaux > 0 and time.time() - horodatage > config.IDF_REFRESH_INTERVAL)
+
+    def _recalculer(self):
+        """Poids IDF (même formule que TfidfVectorizer) et statistiques BM25 de tout l'index, en un seul segment."""
+        n = len(self.chunks)
+        if self._globales is not None:
+            statistiques = self._globales
+        else:
+            # copie : les fréquences de l'index changent à chaque ajout, celles des poids jusqu'au prochain calcul
+            statistiques = (self._df.copy(), n, self._longueur_totale / n if n else 1.0)
+        df, nb_chunks = statistiques[0], statistiques[1]
+        # IDF lissé : log((1 + n) / (1 + df)) + 1
+        self._idf = np.log((1.0 + nb_chunks) / (1.0 + df)) + 1.0
+        self._statistiques_idf = statistiques
+        self._calcul = (n, time.time())
+        self._segments = [self._segment(0, n)]
+        self._bm25 = None
+        self._recalcul_complet = False
+
+    def _segment(self, debut, fin):
+        return _Segment(debut, fin, normaliser(self._comptes_plage(debut, fin).multiply(self._idf).tocsr()))
+
+    @staticmethod
+    def _fusionner(segments):
+        """
+        Fusionne les deux derniers segments tant que l'avant-dernier n'est pas plus de deux fois plus
+        grand que le dernier : les tailles décroissent au moins de moitié d'un segment au suivant, il
+        y a donc au plus log2(nombre de chunks) segments, et chaque chunk est refusionné autant de fois.
+        """
+        while len(segments) > 1 and len(segments[-2]) <= 2 * len(segments[-1]):
+            dernier, avant = segments.pop(), segments.pop()
+            segments.append(_Segment(avant.debut, dernier.fin,
+                                     sparse.vstack([avant.matrice, dernier.matrice], format="csr")))
+        return segments
+
+    def _transposee(self, segment):
+        """Copie "terme -> chunks" (transposée CSR) de la matrice d'un segment, construite au premier besoin."""
+        if segment.transposee is None:
+            segment.transposee = segment.matrice.T.tocsr()
+        return segment.transposee
+
+    def _postings_segment(self, segment):
+        """Listes BM25 d'un segment, construites au premier besoin avec les statistiques des poids courants."""
+        if segment.bm25 is None:
+            segment.bm25 = PostingsBM25.construire(self._comptes_plage(segment.debut, segment.fin), config.BM25_K1,
+                                                   config.BM25_B, self._statistiques_idf)
+        return segment.bm25
+
+    def _a_jour(self):
+        if self._perime or self._idf is None:
+            self._rafraichir()
+
+    def matrice(self):
+        """Matrice TF-IDF de tous les chunks (les segments sont assemblés s'il y en a plusieurs)."""
+        self._a_jour()
+        if len(self._segments) == 1:
+            return self._segments[0].matrice
+        return sparse.vstack([segment.matrice for segment in self._segments], format="csr")
+
+    def matrice_transposee(self):
+        """
+        Matrice (termes x chunks) au format CSR : chaque ligne est la liste des chunks
+        contenant un terme. Multiplier une question par cette matrice ne parcourt que
+        les lignes de ses termes, au lieu de toute la matrice des chunks.
+        Les recherches utilisent celle de chaque segment ; celle-ci est assemblée pour la sauvegarde.
+        """
+        self._a_jour()
+        if len(self._segments) == 1:
+            return self._transposee(self._segments[0])
+        return self.matrice().T.tocsr()
+
+    def postings_bm25(self):
+        """
+        Listes inversées BM25 des chunks (voir bm25.py) : celles du segment unique, ou SegmentsBM25
+        sur tous les segments. Seules les listes des nouveaux segments sont construites après un ajout.
+        """
+        self._a_jour()
+        if self._bm25 is None:
+            listes = [self._postings_segment(segment) for segment in self._segments]
+            if len(listes) == 1:
+                self._bm25 = listes[0].avec_normes(self._normes_bm25)
+            else:
+                self._bm25 = SegmentsBM25(listes, [segment.debut for segment in self._segments], self._normes_bm25)
+        return self._bm25
+
+    # --- Partition d'un index réparti (voir repartition.py) ---
+
+    def statistiques_locales(self):
+        """Fréquences documentaires, nombre de chunks et somme des longueurs (en termes) des chunks de cet index."""
+        return self._df, len(self.chunks), self._longueur_totale
+
+    def fixer_statistiques(self, df, nb_chunks, longueur_moyenne):
+        """Statistiques de toutes les partitions : les poids IDF et BM25 de cet index en seront recalculés."""
+        self._verifier_modifiable()
+        self._globales = (df, nb_chunks, longueur_moyenne)
+        self._normes_bm25 = None
+        self._recalcul_complet = True
+        self._perime = True
+
+    def fixer_normes_bm25(self, normes):
+        """Bornes des impacts BM25 de toutes les partitions, qui normalisent les scores BM25 de cet index."""
+        self._verifier_modifiable()
+        self._normes_bm25 = normes
+        if self._bm25 is not None:
+            # copie : les listes peuvent être partagées avec la version publiée de l'index
+            self._bm25 = self._bm25.avec_normes(normes)
+
+    def transformer(self, textes):
+        """Vectorise des questions avec les poids IDF courants de l'index."""
+        self._a_jour()
+        return normaliser(self.vectorizer.transform(textes).multiply(self._idf).tocsr())
+
+    def rechercher(self, textes, k=1, seuil=0.0, mode="tfidf"):
+        """
+        Pour chaque texte, retourne la liste des (indice du chunk, score) des k chunks
+        les plus proches dont le score dépasse seuil, du meilleur au moins bon.
+        mode choisit le score : "tfidf", "bm25", "dense" (similarité des vecteurs denses)
+        ou "hybride" (combinaison de deux d'entre eux, voir rechercher_hybride).
+        """
+        methodes = methodes_du_mode(mode)
+        if mode == "hybride":
+            return self.rechercher_hybride(textes, k, seuil, methodes)
+        return getattr(self, f"rechercher_{mode}")(textes, k, seuil)
+
+    def passages(self, textes, k=1, seuil=0.0, mode="tfidf"):
+        """
+        Comme rechercher, avec pour chaque chunk trouvé (indice, score, texte du chunk,
+        document, position dans le document). Seuls les textes de ces chunks sont décodés.
+        """
+        chunks = self.chunks
+        return [[(i, score, chunks[i], chunks.document(i), chunks.source(i)) for i, score in trouves]
+                for trouves in self.rechercher(textes, k, seuil, mode)]
+
+    def rechercher_tfidf(self, textes, k=1, seuil=0.0):
+        """
+        Recherche TF-IDF. Les scores restent creux de bout en bout : seuls les chunks
+        partageant au moins un terme avec la question sont considérés.
+        """
+        scores = self._scores_tfidf(self.transformer(textes))
+        resultats = []
+        for i in range(scores.shape[0]):
+            debut, fin = scores.indptr[i], scores.indptr[i + 1]
+            indices, valeurs = self._meilleurs(scores.indices[debut:fin], scores.data[debut:fin], k, seuil)
+            resultats.append([(int(j), float(v)) for j, v in zip(indices, valeurs)])
+        return resultats
+
+    def _scores_tfidf(self, requetes):
+        # scores (questions x chunks), creux : seuls les chunks contenant un terme de la question apparaissent ;
+        # un bloc de colonnes par segment
+        self._a_jour()
+        blocs = [requetes @ self._transposee(segment) for segment in self._segments]
+        scores = blocs[0].tocsr() if len(blocs) == 1 else sparse.hstack(blocs, format="csr")
+        scores.sort_indices()
+        return scores
+
+    def rechercher_bm25(self, textes, k=1, seuil=0.0):
+        """
+        Recherche BM25 sur les listes inversées : seules les listes des termes de la
+        question sont lues, et celles des termes les moins discriminants seulement
+        pour les chunks qui peuvent encore faire partie des k meilleurs (voir bm25.py).
+        """
+        postings = self.postings_bm25()
+        requetes = self.vectorizer.transform(textes).tocsr()
+        resultats = []
+        for i in range(requetes.shape[0]):
+            debut, fin = requetes.indptr[i], requetes.indptr[i + 1]
+            candidats, scores = postings.candidats(requetes.indices[debut:fin], requetes.data[debut:fin], k, seuil,
+                                                   self._morts)
+            indices, valeurs = meilleurs_scores(candidats, scores, k, seuil)
+            resultats.append([(int(j), float(v)) for j, v in zip(indices, valeurs)])
+        return resultats
+
+    def _verifier_dense(self):
+        if self.denses is None or self.encodeur is None:
+            raise RuntimeError("Index sans vecteurs denses : RETRIEVAL_MODE doit valoir \"dense\" ou \"hybride\".")
+
+    def rechercher_dense(self, textes, k=1, seuil=0.0, nprobe=None):
+        """
+        Recherche par similarité des vecteurs denses : exhaustive sous config.DENSE_IVF_MIN_VECTORS
+        vecteurs, sinon limitée aux nprobe listes IVF les plus proches de chaque question.
+        """
+        self._verifier_dense()
+        return self._rechercher_vecteurs(self.encodeur.encoder(list(textes)), k, seuil, nprobe)
+
+    def _rechercher_vecteurs(self, requetes, k, seuil, nprobe=None):
+        nprobe = nprobe or config.DENSE_NPROBE
+        resultats = []
+        if not self.denses.ivf:
+            # recherche exhaustive, par groupes de questions pour borner la taille des scores
+            for debut in range(0, len(requetes), 64):
+                scores = self.denses.scores(requetes[debut:debut + 64])
+                tous = np.arange(len(self.denses))
+                for colonne in range(scores.shape[1]):
+                    indices, valeurs = self._meilleurs(tous, scores[:, colonne], k, seuil)
+                    resultats.append([(int(j), float(v)) for j, v in zip(indices, valeurs)])
+            return resultats
+        for requete in requetes:
+            candidats = self.denses.candidats(requete, nprobe)
+            indices, valeurs = self._meilleurs(candidats, self.denses.scores(requete[None, :], candidats)[:, 0], k, seuil)
+            resultats.append([(int(j), float(v)) for j, v in zip(indices, valeurs)])
+        return resultats
+
+    def _evaluer(self, methode, textes, nb):
+        """
+        Prépare une méthode pour rechercher_hybride : retourne les nb meilleurs chunks de
+        chaque question (tableaux d'indices) et une fonction exacts(i, candidats) qui donne
+        le score exact de chunks quelconques (indices triés) pour la question i. Chaque
+        question n'est vectorisée ou encodée qu'une fois pour les deux usages.
+        """
+        meilleurs = []
+        if methode == "tfidf":
+            scores = self._scores_tfidf(self.transformer(textes))
+
+            def exacts(i, candidats):
+                # valeur du candidat dans la ligne creuse (triée) des scores, 0 s'il en est absent
+                indices = scores.indices[scores.indptr[i]:scores.indptr[i + 1]]
+                valeurs = scores.data[scores.indptr[i]:scores.indptr[i + 1]]
+                resultat = np.zeros(len(candidats))
+                if len(indices):
+                    positions = np.minimum(np.searchsorted(indices, candidats), len(indices) - 1)
+                    presents = indices[positions] == candidats
+                    resultat[presents] = valeurs[positions[presents]]
+                return resultat
+
+            for i in range(len(textes)):
+                debut, fin = scores.indptr[i], scores.indptr[i + 1]
+                meilleurs.append(self._meilleurs(scores.indices[debut:fin], scores.data[debut:fin], nb, 0.0)[0])
+        elif methode == "bm25":
+            postings = self.postings_bm25()
+            requetes = self.vectorizer.transform(textes).tocsr()
+
+            def termes(i):
+                return requetes.indices[requetes.indptr[i]:requetes.indptr[i + 1]], \
+                    requetes.data[requetes.indptr[i]:requetes.indptr[i + 1]]
+
+            def exacts(i, candidats):
+                return postings.scores(*termes(i), candidats)
+
+            for i in range(len(textes)):
+                meilleurs.append(meilleurs_scores(*postings.candidats(*termes(i), nb, 0.0, self._morts), nb, 0.0)[0])
+        else:
+            self._verifier_dense()
+            requetes = self.encodeur.encoder(list(textes))
+
+            def exacts(i, candidats):
+                return self.denses.scores(requetes[i][None, :], candidats)[:, 0]
+
+            meilleurs = [np.array([j for j, _ in trouves], dtype=np.int64)
+                         for trouves in self._rechercher_vecteurs(requetes, nb, -1.0)]
+        return meilleurs, exacts
+
+    def rechercher_hybride(self, textes, k=1, seuil=0.0, methodes=None):
+        """
+        Combine deux méthodes (config.HYBRID_METHODS par défaut) : les candidats sont les
+        meilleurs chunks de chacune (config.HYBRID_CANDIDATES par k), puis chaque candidat
+        reçoit le score HYBRID_WEIGHT * score de la première + (1 - HYBRID_WEIGHT) * score
+        de la seconde, ses deux scores étant recalculés exactement (un chunk trouvé par
+        une seule méthode garde ainsi le score que lui donne l'autre).
+        """
+        premiere, seconde = methodes or methodes_du_mode("hybride")
+        nb = k * config.HYBRID_CANDIDATES
+        poids = config.HYBRID_WEIGHT
+        meilleurs_1, exacts_1 = self._evaluer(premiere, textes, nb)
+        meilleurs_2, exacts_2 = self._evaluer(seconde, textes, nb)
+        resultats = []
+        for i in range(len(textes)):
+            candidats = np.union1d(meilleurs_1[i], meilleurs_2[i]).astype(np.int64)
+            if not len(candidats):
+                resultats.append([])
+                continue
+            scores = poids * exacts_1(i, candidats) + (1.0 - poids) * exacts_2(i, candidats)
+            indices, valeurs = meilleurs_scores(candidats, scores, k, seuil)
+            resultats.append([(int(j), float(v)) for j, v in zip(indices, valeurs)])
+        return resultats
+
+    def statistiques(self):
+        """Quelques informations sur la taille de l'index."""
+        return {
+            "chunks": len(self.chunks),
+            "chunks_supprimes": self.nb_supprimes,
+            "documents": len(self.documents),
+            "termes": int(np.count_nonzero(self._df)),
+            "nnz": int(sum(bloc.nnz for bloc in self._blocs)),
+            "octets": int(sum(
+                tableau.nbytes
+                for matrice in (*self._blocs, *(segment.matrice for segment in self._segments),
+                                *(segment.transposee for segment in self._segments)) if matrice is not None
+                for tableau in (matrice.data, matrice.indices, matrice.indptr)
+            )),
+            # poids calculés sur tous les chunks de l'index (aucun segment pondéré avec des poids antérieurs)
+            "idf_a_jour": not self._perime and self._calcul is not None and self._calcul[0] == len(self.chunks),
+            "segments": len(self._segments),
+            "vecteurs_denses": len(self.denses) if self.denses is not None else 0,
+            "octets_denses": self.denses.octets() if self.denses is not None else 0,
+            "octets_bm25": self._bm25.octets() if self._bm25 is not None else 0,
+            "octets_chunks": self.chunks.octets(),
+        }
+
+    # --- Instantané sur disque ---
+
+    def sauvegarder(self, dossier):
+        """
+        Écrit l'index dans dossier sous une nouvelle génération, puis remplace
+        atomiquement le manifeste. Un lecteur voit donc soit l'ancienne, soit la
+        nouvelle génération, jamais un mélange des deux.
+        Les segments sont assemblés : l'instantané rechargé n'a qu'un segment, avec les mêmes
+        poids. Le coût de la sauvegarde reste celui de tout l'index (elle est faite hors du
+        verrou des modifications, voir chatbotcol.Chatbot.sauvegarder_index).
+        """
+        matrice = self.matrice()
+        matrice_t = self.matrice_transposee()
+        comptes = self._comptes()
+        bm25 = self._bm25
+        if isinstance(bm25, SegmentsBM25):
+            bm25 = PostingsBM25.construire(comptes, config.BM25_K1, config.BM25_B, self._statistiques_idf)
+        generation = f"{time.time_ns():x}-{os.getpid()}"
+        os.makedirs(dossier, exist_ok=True)
+        tableaux = {
+            "comptes_data": comptes.data, "comptes_indices": comptes.indices, "comptes_indptr": comptes.indptr,
+            "matrice_data": matrice.data, "matrice_indices": matrice.indices, "matrice_indptr": matrice.indptr,
+            "transposee_data": matrice_t.data, "transposee_indices": matrice_t.indices,
+            "transposee_indptr": matrice_t.indptr,
+            "df": self._df, "idf": self._idf, "df_reference": self._statistiques_idf[0],
+        }
+        if self.denses is not None:
+            tableaux.update(self.denses.tableaux())
+        if bm25 is not None:
+            tableaux.update(bm25.tableaux())
+        if self._morts is not None:
+            tableaux["supprimes"] = self._morts
+        tableaux.update(self.chunks.tableaux())
+        for nom, tableau in tableaux.items():
+            np.save(os.path.join(dossier, f"{nom}-{generation}.npy"), tableau)
+        with open(os.path.join(dossier, f"chunks-{generation}.json"), "w", encoding="utf-8") as f:
+            json.dump({"chunks": self.chunks.description(), "plages": self.plages}, f, ensure_ascii=False)
+        manifeste = {
+            "format": FORMAT_INDEX,
+            "generation": generation,
+            "n_features": self.n_features,
+            "ngram_range": list(self.ngram_range),
+            "taille_chunk": config.CHUNK_SIZE,
+            "nb_chunks": len(self.chunks),
+            "nb_supprimes": self.nb_supprimes,
+            "documents": self.documents,
+            "longueur_totale": self._longueur_totale,
+            # statistiques des poids (fréquences dans df_reference), chunks et date de leur calcul complet
+            "reference": {"nb_chunks": int(self._statistiques_idf[1]),
+                          "longueur_moyenne": float(self._statistiques_idf[2]),
+                          "globales": self._globales is not None,
+                          "chunks_calcul": self._calcul[0], "horodatage": self._calcul[1]},
+        }
+        if self.denses is not None:
+            manifeste["dense"] = dict(self.denses.description(self.encodeur), nb_entrainement=self.denses.nb_entrainement)
+        if bm25 is not None:
+            manifeste["bm25"] = bm25.description()
+        temporaire = os.path.join(dossier, f"{MANIFESTE}.{generation}.tmp")
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(manifeste, f, ensure_ascii=False)
+        os.replace(temporaire, os.path.join(dossier, MANIFESTE))
+        # nettoyage des générations précédentes (un fichier encore ouvert ailleurs peut refuser la suppression)
+        for ancien in glob.glob(os.path.join(dossier, "*-*.npy")) + glob.glob(os.path.join(dossier, "chunks-*.json")):
+            if generation not in os.path.basename(ancien):
+                try:
+                    os.remove(ancien)
+                except OSError:
+                    pass
+        self.generation = generation
+        return generation
+
+    @classmethod
+    def charger(cls, dossier):
+        """
+        Recharge l'instantané de dossier, ou retourne None s'il est absent,
+        incomplet ou incompatible avec la configuration courante.
+        Les matrices sont ouvertes en mmap (lecture seule) plutôt que copiées en mémoire.
+        """
+        try:
+            with open(os.path.join(dossier, MANIFESTE), "r", encoding="utf-8") as f:
+                manifeste = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (manifeste.get("format") != FORMAT_INDEX
+                or manifeste.get("n_features") != config.HASH_FEATURES
+                or manifeste.get("taille_chunk") != config.CHUNK_SIZE):
+            print("Instantané de l'index incompatible avec la configuration, reconstruction.")
+            return None
+        # vecteurs denses : même encodeur et même quantification que la configuration courante
+        encodeur, dense = encodeur_configure(), manifeste.get("dense")
+        if encodeur is not None and manifeste.get("nb_chunks") and (
+                dense is None or dense.get("encodeur") != encodeur.nom
+                or dense.get("quantification") != config.DENSE_QUANTIZATION):
+            print("Instantané de l'index sans les vecteurs denses de la configuration, reconstruction.")
+            return None
+        generation = manifeste["generation"]
+
+        def _charger(nom, mmap_mode="r"):
+            return np.load(os.path.join(dossier, f"{nom}-{generation}.npy"), mmap_mode=mmap_mode)
+
+        def _charger_optionnel(nom):
+            chemin = os.path.join(dossier, f"{nom}-{generation}.npy")
+            return np.load(chemin, mmap_mode="r") if os.path.exists(chemin) else None
+
+        try:
+            index = cls(n_features=manifeste["n_features"], ngram_range=tuple(manifeste["ngram_range"]))
+            with open(os.path.join(dossier, f"chunks-{generation}.json"), "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            forme = (manifeste["nb_chunks"], index.n_features)
+            comptes = sparse.csr_matrix(
+                (_charger("comptes_data"), _charger("comptes_indices"), _charger("comptes_indptr")), shape=forme, copy=False)
+            matrice = sparse.csr_matrix(
+                (_charger("matrice_data"), _charger("matrice_indices"), _charger("matrice_indptr")), shape=forme, copy=False)
+            matrice_t = sparse.csr_matrix(
+                (_charger("transposee_data"), _charger("transposee_indices"), _charger("transposee_indptr")),
+                shape=forme[::-1], copy=False)
+            # les fréquences documentaires sont modifiées à chaque ajout : copie en mémoire
+            index._df = np.array(_charger("df", mmap_mode=None))
+            index._idf = _charger("idf")
+            # statistiques des poids (un instantané sans elles a été écrit juste après un calcul complet)
+            reference = manifeste.get("reference")
+            nb_chunks = manifeste["nb_chunks"]
+            if "longueur_totale" in manifeste:
+                index._longueur_totale = float(manifeste["longueur_totale"])
+            else:
+                index._longueur_totale = float(comptes.sum())
+            if reference is not None:
+                index._statistiques_idf = (_charger("df_reference"), reference["nb_chunks"], reference["longueur_moyenne"])
+                index._calcul = (reference["chunks_calcul"], reference["horodatage"])
+                if reference["globales"]:
+                    index._globales = index._statistiques_idf
+            else:
+                index._statistiques_idf = (index._df, nb_chunks, index._longueur_totale / nb_chunks if nb_chunks else 1.0)
+                index._calcul = (nb_chunks, time.time())
+            if encodeur is not None and dense is not None:
+                index.denses = VecteursDenses.depuis_tableaux(dense, _charger_optionnel, dense.get("nb_entrainement", 0))
+            # listes BM25 : rechargées si elles ont les paramètres courants, sinon reconstruites au premier besoin
+            bm25 = manifeste.get("bm25")
+            if bm25 == {"k1": config.BM25_K1, "b": config.BM25_B}:
+                bm25 = PostingsBM25.depuis_tableaux(bm25, _charger, manifeste["nb_chunks"])
+            else:
+                bm25 = None
+            # pierres tombales : copiées en mémoire (remplacées, jamais modifiées sur place)
+            if manifeste.get("nb_supprimes"):
+                index._morts = np.array(_charger("supprimes", mmap_mode=None))
+                index.nb_supprimes = manifeste["nb_supprimes"]
+            # textes des chunks : laissés en mmap, décodés à la lecture d'un passage
+            magasin = MagasinChunks.depuis_tableaux(chunks["chunks"], _charger)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Instantané de l'index illisible ({e}), reconstruction.")
+            return None
+        index.chunks = magasin
+        index.documents = manifeste["documents"]
+        index.plages = {nom: tuple(plage) for nom, plage in chunks["plages"].items()}
+        index._blocs = [comptes] if forme[0] else []
+        index._segments = [_Segment(0, forme[0], matrice, matrice_t, bm25)]
+        index._perime = False
+        index.generation = generation
+        return index
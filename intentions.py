@@ -0,0 +1,89 @@
+"""
+Détection des intentions en un seul passage sur le message (automate d'Aho-Corasick).
+
+Toutes les phrases de toutes les intentions sont compilées au chargement dans
+un seul automate. La recherche parcourt le message une seule fois, caractère
+par caractère, et trouve toutes les phrases présentes, quelle que soit leur
+nombre. Une phrase n'est reconnue que sur des limites de mots : "super" ne
+correspond pas à "superieur", ni "aide" à "aides". Les phrases exactes (clé
+"exact_phrases" de data.json, par exemple "aide") ne sont reconnues que si elles
+forment tout le message : "aide" répond à "aide", pas à "comment obtenir une aide
+financiere".
+"""
+
+from collections import deque
+
+
+class AutomateIntentions:
+    def __init__(self, intents, exactes=()):
+        # noms des intentions, dans l'ordre de data.json (qui sert d'ordre de priorité)
+        self.noms = list(intents)
+        # transitions[etat] : caractère -> état suivant ; l'état 0 est la racine
+        self._transitions = [{}]
+        self._echecs = [0]
+        # sorties[etat] : (intention, longueur) des phrases qui se terminent dans cet état
+        self._sorties = [set()]
+        # phrase exacte -> intentions (reconnues seulement si la phrase est tout le message)
+        self._exactes = {}
+        exactes = set(exactes)
+        for priorite, nom in enumerate(self.noms):
+            for phrase in intents[nom]:
+                if phrase in exactes:
+                    self._exactes.setdefault(phrase.strip(), set()).add(priorite)
+                elif phrase:
+                    self._ajouter(phrase, priorite)
+        self._construire_echecs()
+
+    def _ajouter(self, phrase, priorite):
+        etat = 0
+        for caractere in phrase:
+            suivant = self._transitions[etat].get(caractere)
+            if suivant is None:
+                suivant = len(self._transitions)
+                self._transitions[etat][caractere] = suivant
+                self._transitions.append({})
+                self._echecs.append(0)
+                self._sorties.append(set())
+            etat = suivant
+        self._sorties[etat].add((priorite, len(phrase)))
+
+    def _construire_echecs(self):
+        """Liens d'échec en largeur : le plus long suffixe de l'état qui est aussi un préfixe connu."""
+        file = deque(self._transitions[0].values())
+        while file:
+            etat = file.popleft()
+            for caractere, suivant in self._transitions[etat].items():
+                file.append(suivant)
+                echec = self._echecs[etat]
+                while echec and caractere not in self._transitions[echec]:
+                    echec = self._echecs[echec]
+                cible = self._transitions[echec].get(caractere, 0)
+                self._echecs[suivant] = cible if cible != suivant else 0
+                # une phrase qui se termine dans l'état d'échec se termine aussi ici
+                self._sorties[suivant] |= self._sorties[self._echecs[suivant]]
+
+    def trouver(self, message):
+        """Indices (priorités) de toutes les intentions dont une phrase apparaît dans le message."""
+        trouvees = set(self._exactes.get(message.strip(), ()))
+        transitions, echecs, sorties = self._transitions, self._echecs, self._sorties
+        etat = 0
+        for fin, caractere in enumerate(message):
+            while etat and caractere not in transitions[etat]:
+                etat = echecs[etat]
+            etat = transitions[etat].get(caractere, 0)
+            if sorties[etat]:
+                for priorite, longueur in sorties[etat]:
+                    if priorite not in trouvees and _sur_des_limites(message, fin + 1 - longueur, fin + 1):
+                        trouvees.add(priorite)
+        return trouvees
+
+    def intentions(self, message):
+        """Noms des intentions présentes dans le message, par ordre de priorité."""
+        return [self.noms[i] for i in sorted(self.trouver(message))]
+
+
+def _sur_des_limites(message, debut, fin):
+    """La phrase message[debut:fin] ne coupe pas de mot (elle ne prolonge pas un mot à gauche ou à droite)."""
+    if debut > 0 and message[debut - 1].isalnum() and message[debut].isalnum():
+        return False
+    return not (fin < len(message) and message[fin - 1].isalnum() and message[fin].isalnum())
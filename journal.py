@@ -0,0 +1,180 @@
+"""
+Journal des interactions en ajout seul (JSON Lines).
+
+Chaque interaction est une ligne JSON ajoutée à la fin du fichier : on ne relit
+et ne réécrit jamais l'historique existant. Les écritures sont confiées à un
+thread d'arrière-plan qui regroupe les interactions par lots (écriture après
+taille_lot interactions ou intervalle_flush secondes). Quand le fichier dépasse
+taille_max_octets, il est renommé en <fichier>.1 (les archives plus anciennes
+sont décalées jusqu'à nb_archives).
+
+L'historique des versions précédentes (un fichier JSON contenant la liste de
+toutes les interactions, réécrit à chaque question) est repris une fois : ses
+interactions sont converties dans <fichier>.ancien, lu avant les archives, et
+l'ancien fichier est renommé en <ancien>.migre.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+
+class JournalInteractions:
+    def __init__(self, chemin, taille_max_octets, nb_archives=5, intervalle_flush=1.0, taille_lot=100, anciens=()):
+        self.chemin = chemin
+        self.taille_max_octets = taille_max_octets
+        self.nb_archives = nb_archives
+        self.intervalle_flush = intervalle_flush
+        self.taille_lot = taille_lot
+        self._file = queue.Queue()
+        self._ferme = False
+        for ancien in dict.fromkeys(os.path.abspath(chemin) for chemin in anciens):
+            self._migrer(ancien)
+        self._thread = threading.Thread(target=self._boucle, name="journal-interactions", daemon=True)
+        self._thread.start()
+        # les interactions encore en attente sont écrites à l'arrêt du processus
+        atexit.register(self.fermer)
+
+    def ajouter(self, interaction):
+        """Met une interaction en file d'attente (ne bloque pas sur le disque)."""
+        self._file.put(interaction)
+
+    def ajouter_lot(self, interactions):
+        """Met plusieurs interactions en file d'attente en une seule opération."""
+        if interactions:
+            self._file.put(list(interactions))
+
+    def vider(self, timeout=None):
+        """
+        Force l'écriture de tout ce qui est en attente et attend qu'elle soit faite. Retourne
+        False si elle n'a pas été faite dans le délai, ou si le journal est fermé (fermer a déjà
+        tout écrit, et ce qui a été ajouté ensuite ne le sera plus).
+        """
+        if self._ferme:
+            return False
+        fait = threading.Event()
+        self._file.put(fait)
+        limite = None if timeout is None else time.monotonic() + timeout
+        # le thread peut s'arrêter (fermer) avant d'avoir traité la demande : l'attente ne dure pas au-delà
+        while not fait.wait(0.1):
+            if not self._thread.is_alive() or (limite is not None and time.monotonic() >= limite):
+                return fait.is_set()
+        return True
+
+    def fermer(self):
+        if self._ferme:
+            return
+        self._ferme = True
+        self._file.put(None)
+        self._thread.join(timeout=10)
+
+    def _boucle(self):
+        lot = []
+        echeance = time.monotonic() + self.intervalle_flush
+        while True:
+            try:
+                element = self._file.get(timeout=max(0.0, echeance - time.monotonic()))
+            except queue.Empty:
+                element = False # délai écoulé : on écrit ce qui est en attente
+            if isinstance(element, (dict, list)):
+                if isinstance(element, dict):
+                    lot.append(element)
+                else:
+                    lot.extend(element)
+                if len(lot) < self.taille_lot:
+                    continue
+            if lot:
+                self._ecrire(lot)
+                lot = []
+            echeance = time.monotonic() + self.intervalle_flush
+            if isinstance(element, threading.Event):
+                element.set()
+            elif element is None:
+                return
+
+    def _ecrire(self, lot):
+        lignes = "".join(json.dumps(interaction, ensure_ascii=False) + "\n" for interaction in lot)
+        try:
+            dossier = os.path.dirname(self.chemin)
+            if dossier:
+                os.makedirs(dossier, exist_ok=True)
+            # un seul write en mode ajout : les lignes d'un lot ne sont pas entrelacées avec celles d'un autre processus
+            with open(self.chemin, "a", encoding="utf-8") as f:
+                f.write(lignes)
+                taille = f.tell()
+            if taille >= self.taille_max_octets:
+                self._rotation()
+        except OSError as e:
+            print(f"Erreur lors de l'écriture de l'historique: {e}")
+
+    def _rotation(self):
+        """historique.jsonl -> historique.jsonl.1 -> historique.jsonl.2 ... (la plus ancienne est supprimée)."""
+        for i in range(self.nb_archives - 1, 0, -1):
+            source = f"{self.chemin}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.chemin}.{i + 1}")
+        if self.nb_archives > 0:
+            os.replace(self.chemin, f"{self.chemin}.1")
+        else:
+            os.remove(self.chemin)
+
+    def fichiers(self):
+        """Fichiers du journal, du plus ancien au plus récent (l'historique repris des versions précédentes d'abord)."""
+        archives = [f"{self.chemin}.ancien"] + [f"{self.chemin}.{i}" for i in range(self.nb_archives, 0, -1)]
+        return [f for f in archives + [self.chemin] if os.path.exists(f)]
+
+    def _migrer(self, ancien):
+        """
+        Convertit l'ancien historique JSON (liste d'interactions) en lignes ajoutées à <chemin>.ancien,
+        puis le renomme en <ancien>.migre. Le fichier est d'abord renommé sous un nom propre à ce
+        processus : si plusieurs workers démarrent ensemble, un seul le reprend.
+        Retourne le nombre d'interactions reprises.
+        """
+        en_cours = f"{ancien}.{os.getpid()}.migration"
+        try:
+            os.rename(ancien, en_cours)
+        except OSError:
+            return 0 # absent, ou déjà repris par un autre processus
+        try:
+            with open(en_cours, "r", encoding="utf-8") as f:
+                interactions = json.load(f)
+            if not isinstance(interactions, list):
+                raise ValueError("liste d'interactions attendue")
+            destination = f"{self.chemin}.ancien"
+            if os.path.dirname(destination):
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+            temporaire = f"{destination}.{os.getpid()}.tmp"
+            with open(temporaire, "w", encoding="utf-8") as f:
+                if os.path.exists(destination):
+                    with open(destination, "r", encoding="utf-8") as precedent:
+                        f.write(precedent.read())
+                f.write("".join(json.dumps(interaction, ensure_ascii=False) + "\n" for interaction in interactions))
+            os.replace(temporaire, destination)
+        except (OSError, ValueError) as e:
+            print(f"Ancien historique {ancien} non repris ({e}), laissé en place.")
+            os.replace(en_cours, ancien)
+            return 0
+        os.replace(en_cours, f"{ancien}.migre")
+        print(f"Ancien historique {ancien} repris dans le journal ({len(interactions)} interactions).")
+        return len(interactions)
+
+    def lire(self):
+        """Parcourt l'historique (archives comprises) sans le charger entièrement en mémoire."""
+        for fichier in self.fichiers():
+            try:
+                with open(fichier, "r", encoding="utf-8") as f:
+                    for ligne in f:
+                        ligne = ligne.strip()
+                        if not ligne:
+                            continue
+                        try:
+                            yield json.loads(ligne)
+                        except ValueError:
+                            # ligne tronquée (arrêt brutal pendant une écriture) : ignorée
+                            continue
+            except FileNotFoundError:
+                # archive déplacée par une rotation pendant la lecture
+                continue
@@ -0,0 +1,246 @@
+"""
+Stockage compact des chunks de l'index : textes, documents et sources.
+
+Plutôt qu'une liste de chaînes Python (plus de 50 octets d'en-tête par objet, et
+une chaîne de nom et un dictionnaire de source par chunk), tous les textes sont
+encodés en UTF-8 dans un seul tableau d'octets, délimités par un tableau de
+décalages : le texte du chunk i occupe les octets decalages[i] à decalages[i + 1].
+Le document de chaque chunk est un numéro (dans la liste des noms), et sa source
+(positions de début et de fin, première et dernière unité) tient dans deux
+tableaux d'entiers.
+
+Dans un instantané de l'index, ces tableaux sont des fichiers .npy ouverts en
+mmap : les textes restent sur disque et ne sont lus et décodés que pour les
+passages effectivement retournés par une recherche.
+
+Comme les matrices de IndexIncremental, les tableaux ne sont jamais modifiés sur
+place : ajouter et filtrer retournent un nouvel objet, que les versions
+précédentes de l'index ne voient pas. Pour qu'un ajout ne recopie pas tous les
+textes (ce qui lirait en mémoire ceux de l'instantané en mmap), les chunks sont
+rangés par segments de chunks consécutifs : un ajout crée un segment, fusionné
+avec les précédents de taille comparable (comme les segments de IndexIncremental,
+chaque chunk est recopié O(log n) fois) ; le segment chargé en mmap n'est jamais
+fusionné. filtrer (compactage) et tableaux (sauvegarde) réunissent les segments,
+ce qu'ils faisaient déjà en recopiant les textes.
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+# colonnes du tableau des sources : positions (début, fin) en caractères dans le document (-1 : pas de source)
+# et unité (numéro du nom de l'unité, première, dernière ; -1 : pas d'unité)
+SANS_SOURCE = (-1, -1)
+SANS_UNITE = (-1, -1, -1)
+
+
+class _Segment:
+    """Tableaux d'une suite de chunks consécutifs."""
+
+    __slots__ = ("texte", "decalages", "documents", "positions", "unites", "mmap")
+
+    def __init__(self, texte, decalages, documents, positions, unites, mmap=False):
+        # textes UTF-8 bout à bout, et décalage (en octets) du début de chaque chunk, plus la fin du dernier
+        self.texte = texte
+        self.decalages = decalages
+        # numéro du document de chaque chunk dans MagasinChunks.noms (les chunks d'un document sont contigus)
+        self.documents = documents
+        # sources des chunks (voir SANS_SOURCE et SANS_UNITE)
+        self.positions = positions
+        self.unites = unites
+        # tableaux d'un instantané en mmap : jamais recopiés par une fusion
+        self.mmap = mmap
+
+    def __len__(self):
+        return len(self.documents)
+
+    def tableaux(self):
+        return self.texte, self.decalages, self.documents, self.positions, self.unites
+
+
+def _reunir(segments):
+    """Segment unique avec les chunks des segments (recopiés, sauf s'il n'y en a qu'un)."""
+    if len(segments) == 1:
+        return segments[0]
+    decalages = [segments[0].decalages]
+    for segment in segments[1:]:
+        decalages.append(decalages[-1][-1] + segment.decalages[1:])
+    return _Segment(np.concatenate([segment.texte for segment in segments]), np.concatenate(decalages),
+                    *(np.concatenate(tableaux) for tableaux in zip(*(s.tableaux()[2:] for s in segments))))
+
+
+class MagasinChunks:
+    """
+    Séquence des textes des chunks (magasin[i] décode le texte du chunk i), avec le
+    document (document(i)) et la source (source(i)) de chacun.
+    """
+
+    __slots__ = ("segments", "debuts", "noms", "noms_unites")
+
+    def __init__(self):
+        self.segments = (_Segment(np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                                  np.zeros((0, 2), dtype=np.int64), np.zeros((0, 3), dtype=np.int32)),)
+        # indice du premier chunk de chaque segment, plus le nombre de chunks
+        self.debuts = (0, 0)
+        self.noms = ()
+        # noms des unités des sources ("page", "paragraphe"...)
+        self.noms_unites = ()
+
+    def __len__(self):
+        return self.debuts[-1]
+
+    def _trouver(self, i):
+        """(segment, indice dans le segment) du chunk i."""
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if len(self.segments) == 1:
+            return self.segments[0], i
+        if not 0 <= i < len(self):
+            raise IndexError(f"chunk {i} hors du magasin ({len(self)} chunks)")
+        numero = bisect_right(self.debuts, i) - 1
+        return self.segments[numero], i - self.debuts[numero]
+
+    def __getitem__(self, i):
+        """Texte du chunk i, décodé à la demande."""
+        segment, i = self._trouver(i)
+        debut, fin = segment.decalages[i:i + 2].tolist()
+        return segment.texte[debut:fin].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def longueurs(self):
+        """Longueur en octets (UTF-8) du texte de chaque chunk."""
+        return np.concatenate([np.diff(segment.decalages) for segment in self.segments])
+
+    def document(self, i):
+        """Nom du document du chunk i."""
+        segment, i = self._trouver(i)
+        return self.noms[int(segment.documents[i])]
+
+    def source(self, i):
+        """Source du chunk i (dictionnaire produit par decoupage.decouper_segments), ou None."""
+        segment, i = self._trouver(i)
+        debut, fin = segment.positions[i].tolist()
+        if debut < 0:
+            return None
+        source = {"debut": debut, "fin": fin}
+        unite, premiere, derniere = segment.unites[i].tolist()
+        if unite >= 0:
+            source[self.noms_unites[unite]] = [premiere, derniere]
+        return source
+
+    def _copie(self, segments):
+        copie = MagasinChunks.__new__(MagasinChunks)
+        copie.noms = self.noms
+        copie.noms_unites = self.noms_unites
+        copie.segments = tuple(segments)
+        copie.debuts = tuple(np.concatenate(([0], np.cumsum([len(segment) for segment in segments]))).tolist())
+        return copie
+
+    def ajouter(self, documents):
+        """
+        Nouvel objet avec les chunks des documents (nom, textes, sources) ajoutés à la fin ;
+        sources (une par chunk) peut être None.
+        """
+        encodes, noms, nb_par_document, positions, unites = [], [], [], [], []
+        noms_unites = list(self.noms_unites)
+        for nom, textes, sources in documents:
+            encodes.extend(texte.encode("utf-8") for texte in textes)
+            noms.append(nom)
+            nb_par_document.append(len(textes))
+            for source in (sources if sources is not None else [None] * len(textes)):
+                position, unite = _coder_source(source, noms_unites)
+                positions.append(position)
+                unites.append(unite)
+        if not encodes:
+            return self
+        longueurs = np.fromiter(map(len, encodes), dtype=np.int64, count=len(encodes))
+        numeros = np.arange(len(self.noms), len(self.noms) + len(noms), dtype=np.int32)
+        nouveau = _Segment(np.frombuffer(b"".join(encodes), dtype=np.uint8),
+                           np.concatenate(([0], np.cumsum(longueurs))).astype(np.int64),
+                           np.repeat(numeros, nb_par_document),
+                           np.array(positions, dtype=np.int64).reshape(-1, 2),
+                           np.array(unites, dtype=np.int32).reshape(-1, 3))
+        segments = [segment for segment in self.segments if len(segment)] + [nouveau]
+        # fusion des derniers segments tant que le précédent n'est pas plus de deux fois plus grand
+        while len(segments) > 1 and not segments[-2].mmap and len(segments[-2]) <= 2 * len(segments[-1]):
+            segments[-2:] = [_reunir(segments[-2:])]
+        copie = self._copie(segments)
+        copie.noms = self.noms + tuple(noms)
+        copie.noms_unites = tuple(noms_unites)
+        return copie
+
+    def filtrer(self, garder):
+        """
+        Nouvel objet avec seulement les chunks gardés (masque booléen). Les chunks étant
+        retirés par documents entiers, le texte est recopié par plages contiguës.
+        """
+        garder = np.asarray(garder, dtype=bool)
+        textes = []
+        for segment, debut, fin in zip(self.segments, self.debuts, self.debuts[1:]):
+            # plages [debut, fin) de chunks gardés consécutifs dans le segment
+            bords = np.flatnonzero(np.diff(np.concatenate(([False], garder[debut:fin], [False])).astype(np.int8)))
+            textes.extend(segment.texte[segment.decalages[a]:segment.decalages[b]] for a, b in bords.reshape(-1, 2))
+        longueurs = self.longueurs()[garder]
+        # les noms des documents qui n'ont plus de chunks sont oubliés
+        gardes, documents = np.unique(self._colonne("documents")[garder], return_inverse=True)
+        segment = _Segment(np.concatenate(textes or [np.zeros(0, dtype=np.uint8)]),
+                           np.concatenate(([0], np.cumsum(longueurs))).astype(np.int64),
+                           documents.astype(np.int32), self._colonne("positions")[garder],
+                           self._colonne("unites")[garder])
+        copie = self._copie([segment])
+        copie.noms = tuple(self.noms[numero] for numero in gardes)
+        return copie
+
+    def _colonne(self, nom):
+        """Tableau nom (documents, positions ou unites) de tous les chunks."""
+        if len(self.segments) == 1:
+            return getattr(self.segments[0], nom)
+        return np.concatenate([getattr(segment, nom) for segment in self.segments])
+
+    def description(self):
+        """Noms des documents et des unités, sauvegardés avec l'instantané (hors des tableaux)."""
+        return {"noms": list(self.noms), "unites": list(self.noms_unites)}
+
+    def tableaux(self):
+        """Tableaux à sauvegarder avec l'instantané de l'index (nom -> tableau)."""
+        segment = _reunir(self.segments)
+        return {"chunks_texte": segment.texte, "chunks_decalages": segment.decalages,
+                "chunks_documents": segment.documents, "chunks_positions": segment.positions,
+                "chunks_unites": segment.unites}
+
+    @classmethod
+    def depuis_tableaux(cls, description, charger):
+        """
+        Recrée l'objet à partir d'un instantané ; charger(nom) retourne le tableau (en mmap).
+        Les tableaux restent en mmap, vus comme des ndarray simples (plus rapides à indexer que np.memmap).
+        """
+        segment = _Segment(*(np.asarray(charger(f"chunks_{nom}"))
+                             for nom in ("texte", "decalages", "documents", "positions", "unites")), mmap=True)
+        magasin = cls()._copie([segment])
+        magasin.noms = tuple(description["noms"])
+        magasin.noms_unites = tuple(description["unites"])
+        return magasin
+
+    def octets(self):
+        return int(sum(tableau.nbytes for segment in self.segments for tableau in segment.tableaux()))
+
+
+def _coder_source(source, noms_unites):
+    """(positions, unité) d'une source de chunk ; le nom d'une nouvelle unité est ajouté à noms_unites."""
+    if source is None:
+        return SANS_SOURCE, SANS_UNITE
+    autres = [cle for cle in source if cle not in ("debut", "fin")]
+    if len(autres) > 1:
+        raise ValueError(f"Source de chunk avec plusieurs unités : {source}")
+    position = (source["debut"], source["fin"])
+    if not autres:
+        return position, SANS_UNITE
+    nom = autres[0]
+    if nom not in noms_unites:
+        noms_unites.append(nom)
+    premiere, derniere = source[nom]
+    return position, (noms_unites.index(nom), premiere, derniere)
@@ -0,0 +1,144 @@
+"""
+Métriques du chatbot au format texte de Prometheus.
+
+Les durées sont comptées dans des histogrammes à bornes fixes : une observation
+coûte une recherche dichotomique et deux additions sous un verrou (de l'ordre
+de la microseconde), ce qui permet de les laisser actives en production. Les
+valeurs instantanées (taille de l'index, compteurs des caches...) ne sont pas
+tenues à jour en continu : elles sont lues au moment de l'export, par des
+fonctions enregistrées avec Registre.jauge.
+"""
+
+import bisect
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+# bornes (en secondes) des histogrammes de durée : de 50 µs à 1 min
+BORNES_DUREE = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _etiquettes(noms, valeurs, supplement=""):
+    paires = [f'{nom}="{str(valeur)}"' for nom, valeur in zip(noms, valeurs)]
+    if supplement:
+        paires.append(supplement)
+    return "{" + ",".join(paires) + "}" if paires else ""
+
+
+def _nombre(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Histogramme:
+    def __init__(self, nom, aide, etiquettes=(), bornes=BORNES_DUREE):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self.bornes = tuple(bornes)
+        # valeurs des étiquettes -> [comptes par borne (+ dépassement), somme, nombre]
+        self._series = {}
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur, *etiquettes):
+        self._ajouter(valeur, 1, etiquettes)
+
+    def observer_lot(self, duree, nombre, *etiquettes):
+        """Durée d'une étape faite en une fois pour nombre éléments : observe nombre fois duree / nombre."""
+        if nombre > 0:
+            self._ajouter(duree / nombre, nombre, etiquettes)
+
+    def _ajouter(self, valeur, nombre, etiquettes):
+        position = bisect.bisect_left(self.bornes, valeur)
+        with self._verrou:
+            serie = self._series.get(etiquettes)
+            if serie is None:
+                serie = self._series[etiquettes] = [[0] * (len(self.bornes) + 1), 0.0, 0]
+            serie[0][position] += nombre
+            serie[1] += valeur * nombre
+            serie[2] += nombre
+
+    @contextmanager
+    def chronometrer(self, *etiquettes):
+        """with histogramme.chronometrer("etape"): ... observe la durée du bloc."""
+        debut = perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(perf_counter() - debut, *etiquettes)
+
+    def exporter(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} histogram"]
+        with self._verrou:
+            series = {cle: (list(comptes), somme, nombre) for cle, (comptes, somme, nombre) in self._series.items()}
+        for valeurs, (comptes, somme, nombre) in sorted(series.items()):
+            cumul = 0
+            for borne, compte in zip(self.bornes + (float("inf"),), comptes):
+                cumul += compte
+                etiquettes = _etiquettes(self.etiquettes, valeurs, f'le="{_nombre(borne)}"')
+                lignes.append(f"{self.nom}_bucket{etiquettes} {cumul}")
+            etiquettes = _etiquettes(self.etiquettes, valeurs)
+            lignes.append(f"{self.nom}_sum{etiquettes} {_nombre(somme)}")
+            lignes.append(f"{self.nom}_count{etiquettes} {nombre}")
+        return lignes
+
+
+class Registre:
+    def __init__(self):
+        self._histogrammes = []
+        # (nom, aide, type, etiquettes, fonction) : fonction() retourne une valeur, ou {valeurs des étiquettes: valeur}
+        self._jauges = []
+
+    def histogramme(self, nom, aide, etiquettes=(), bornes=BORNES_DUREE):
+        histogramme = Histogramme(nom, aide, etiquettes, bornes)
+        self._histogrammes.append(histogramme)
+        return histogramme
+
+    def jauge(self, nom, aide, fonction, etiquettes=(), type_metrique="gauge"):
+        """Enregistre une valeur lue à l'export (type "gauge", ou "counter" pour un total croissant)."""
+        self._jauges.append((nom, aide, type_metrique, tuple(etiquettes), fonction))
+
+    def exporter(self):
+        """Texte de toutes les métriques, au format d'exposition de Prometheus (version 0.0.4)."""
+        lignes = []
+        for histogramme in self._histogrammes:
+            lignes.extend(histogramme.exporter())
+        for nom, aide, type_metrique, etiquettes, fonction in self._jauges:
+            try:
+                valeur = fonction()
+            except Exception:
+                # une source indisponible (bot absent, index en cours de rechargement) ne bloque pas l'export
+                continue
+            if valeur is None:
+                continue
+            lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type_metrique}")
+            valeurs = valeur if isinstance(valeur, dict) else {(): valeur}
+            for cle, nombre in sorted(valeurs.items()):
+                cle = cle if isinstance(cle, tuple) else (cle,)
+                lignes.append(f"{nom}{_etiquettes(etiquettes, cle)} {_nombre(nombre)}")
+        return "\n".join(lignes) + "\n"
+
+
+# registre global du processus et histogrammes du chatbot
+REGISTRE = Registre()
+
+DUREE_ETAPE = REGISTRE.histogramme(
+    "chatbot_etape_duree_secondes",
+    "Durée de chaque étape de Chatbot.repondre (nettoyage, cache, intentions, faq_exacte, "
+    "faq_approximative, documents, persistance, total) ; dans Chatbot.repondre_batch, "
+    "durée de l'étape du lot répartie entre ses questions.",
+    ("etape",),
+)
+DUREE_LOT = REGISTRE.histogramme(
+    "chatbot_lot_duree_secondes",
+    "Durée totale de Chatbot.repondre_batch, par lot de questions.",
+)
+DUREE_INGESTION = REGISTRE.histogramme(
+    "chatbot_ingestion_duree_secondes",
+    "Durée des étapes d'ingestion (extraction, decoupage, vectorisation) par type de fichier, "
+    "et de la publication et du compactage de l'index.",
+    ("etape", "type"),
+)
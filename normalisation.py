@@ -0,0 +1,129 @@
+"""
+Normalisation et découpage en mots du texte, partagés par les questions et les documents.
+
+Deux usages :
+  - nettoyer(texte) : forme canonique d'une question ou d'une clé de la FAQ
+    (minuscules, sans accents ni ponctuation, espaces simples), utilisée pour
+    les correspondances exactes, le cache des réponses et les statistiques ;
+  - Analyseur : analyseur du vectoriseur de l'index (mots puis n-grammes de mots),
+    appliqué aux chunks à l'indexation et aux questions à la recherche. Les accents
+    sont retirés comme pour nettoyer : "hypothèque" et "hypotheque" ont la même colonne.
+
+Le retrait des accents est la décomposition NFD suivie de la suppression des
+marques combinantes. Pour un texte en alphabet latin (le cas courant), tout se
+fait dans des fonctions en C, sans boucle Python sur les caractères : NFD, une
+expression régulière retire les diacritiques, puis une table de traduction
+d'octets précalculée supprime la ponctuation (ou la remplace par une espace),
+et une dernière passe (str.split) découpe les mots ou regroupe les espaces.
+Un texte qui garde d'autres caractères (œ, grec, ligatures...) passe par une
+table de traduction de caractères précalculée de la même façon, et au-delà de
+LIMITE_TABLE par le calcul caractère par caractère : le résultat est toujours
+celui de l'ancien nettoyage (NFD, suppression des catégories Mn, puis de [^\\w\\s]).
+
+Les textes courts (questions) sont souvent répétés : leur résultat est mémorisé.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# la table de caractères couvre les codes inférieurs à cette limite (latin étendu, grec, cyrillique...)
+LIMITE_TABLE = 0x2000
+# au-delà de cette longueur (chunks de documents), le résultat n'est pas mémorisé
+LONGUEUR_MAX_MEMO = 256
+TAILLE_MEMO = 65536
+
+_PONCTUATION = re.compile(r"[^\w\s]")
+# bloc des diacritiques combinants (U+0300 à U+036F, tous de catégorie Mn) : les accents du latin après NFD
+_DIACRITIQUES = re.compile("[\u0300-\u036f]+")
+
+
+def _sans_accents(texte):
+    """Décomposition NFD puis suppression des marques combinantes (accents)."""
+    return "".join(c for c in unicodedata.normalize("NFD", texte) if unicodedata.category(c) != "Mn")
+
+
+def _table_caracteres(remplacement):
+    """Table de str.translate : accents retirés, ponctuation remplacée par remplacement."""
+    table = {}
+    for code in range(LIMITE_TABLE):
+        caractere = chr(code)
+        resultat = _PONCTUATION.sub(remplacement, _sans_accents(caractere))
+        if resultat != caractere:
+            table[code] = resultat or None
+    return table
+
+
+# ponctuation ASCII, au sens de l'expression [^\w\s]
+_PONCTUATION_ASCII = bytes(code for code in range(128) if _PONCTUATION.match(chr(code)))
+# questions et clés de la FAQ : ponctuation supprimée ("l'hypothèque" -> "lhypotheque")
+TABLE_NETTOYAGE = _table_caracteres("")
+# analyse des documents et des questions : la ponctuation sépare les mots ("l'hypothèque" -> "l hypotheque")
+TABLE_ANALYSE = _table_caracteres(" ")
+_OCTETS_ANALYSE = bytes.maketrans(_PONCTUATION_ASCII, b" " * len(_PONCTUATION_ASCII))
+
+
+def _plier(texte, analyse):
+    """Minuscules, sans accents, ponctuation supprimée (ou remplacée par une espace si analyse)."""
+    texte = texte.lower()
+    if not texte.isascii():
+        latin = _DIACRITIQUES.sub("", unicodedata.normalize("NFD", texte))
+        if not latin.isascii():
+            table, remplacement = (TABLE_ANALYSE, " ") if analyse else (TABLE_NETTOYAGE, "")
+            plie = texte.translate(table)
+            if not plie.isascii() and max(plie) >= chr(LIMITE_TABLE):
+                return _PONCTUATION.sub(remplacement, _sans_accents(texte))
+            return plie
+        texte = latin
+    if analyse:
+        return texte.encode("ascii").translate(_OCTETS_ANALYSE).decode("ascii")
+    return texte.encode("ascii").translate(None, _PONCTUATION_ASCII).decode("ascii")
+
+
+def _nettoyer(texte):
+    # str.split() coupe sur les mêmes espaces que \s : espaces regroupées et retirées aux extrémités
+    return " ".join(_plier(texte, False).split())
+
+
+_nettoyer_memo = lru_cache(maxsize=TAILLE_MEMO)(_nettoyer)
+
+
+def nettoyer(texte):
+    """Minuscules, sans accents ni ponctuation, espaces multiples réduits à un seul."""
+    if len(texte) <= LONGUEUR_MAX_MEMO:
+        return _nettoyer_memo(texte)
+    return _nettoyer(texte)
+
+
+@lru_cache(maxsize=TAILLE_MEMO)
+def _mots_memo(texte):
+    return tuple(_plier(texte, True).split())
+
+
+def mots(texte):
+    """Mots du texte normalisé (minuscules, sans accents), la ponctuation servant de séparateur."""
+    if len(texte) <= LONGUEUR_MAX_MEMO:
+        return list(_mots_memo(texte))
+    return _plier(texte, True).split()
+
+
+class Analyseur:
+    """
+    Analyseur du vectoriseur (paramètre analyzer de scikit-learn) : mots d'au moins deux
+    caractères (comme le motif par défaut de scikit-learn), puis n-grammes de mots de
+    ngram_range[0] à ngram_range[1] mots.
+    """
+
+    def __init__(self, ngram_range=(1, 2)):
+        self.ngram_range = tuple(ngram_range)
+
+    def __call__(self, texte):
+        retenus = [mot for mot in mots(texte) if len(mot) > 1]
+        minimum, maximum = self.ngram_range
+        termes = retenus[:] if minimum == 1 else []
+        for n in range(max(minimum, 2), maximum + 1):
+            if n == 2:
+                termes += [premier + " " + second for premier, second in zip(retenus, retenus[1:])]
+            else:
+                termes += [" ".join(retenus[i:i + n]) for i in range(len(retenus) - n + 1)]
+        return termes
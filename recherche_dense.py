@@ -0,0 +1,393 @@
+"""
+Recherche dense (vecteurs d'embeddings) pour les passages des documents.
+
+Chaque chunk est représenté par un vecteur de dimension fixe, normalisé (le
+produit scalaire est la similarité cosinus). Deux encodeurs, tous deux locaux
+et exécutés sur CPU :
+  - EncodeurSentenceTransformers : un modèle sentence-transformers stocké dans
+    un dossier local (config.DENSE_MODEL_PATH), jamais téléchargé ;
+  - EncodeurHachage : encodeur intégré sans modèle ni dépendance supplémentaire,
+    qui projette les n-grammes de caractères et les mots dans un petit espace
+    de hachage signé. Il n'est pas sémantique (pas de synonymes), mais il est
+    robuste aux fautes de frappe et aux variantes de mots, et permet de faire
+    fonctionner toute la chaîne hors ligne.
+
+Les vecteurs sont gardés en float32 ou quantifiés en int8 (une échelle par
+vecteur, 4 fois moins de mémoire). Au-delà de config.DENSE_IVF_MIN_VECTORS
+vecteurs, la recherche passe par un index IVF : les vecteurs sont répartis
+entre des centroïdes (k-means sphérique) et une question n'est comparée
+qu'aux vecteurs des config.DENSE_NPROBE listes les plus proches. Les
+centroïdes sont réutilisés d'une version de l'index à la suivante (les
+nouveaux vecteurs sont simplement affectés à leur liste) et ne sont
+ré-entraînés que lorsque le nombre de vecteurs a beaucoup augmenté.
+
+Les tableaux sont sauvegardés avec l'instantané de l'index (voir
+indexation.IndexIncremental.sauvegarder) et rechargés en mmap.
+"""
+
+import os
+
+import numpy as np
+from scipy import sparse
+
+import config # Importation de la configuration centralisée
+from dependances import disponible, importer # sentence-transformers et scikit-learn importés au premier encodage
+
+# nombre de lignes converties en float32 à la fois lors d'une recherche exhaustive sur des vecteurs int8
+TAILLE_BLOC = 65536
+# nombre d'itérations du k-means et nombre de vecteurs d'entraînement par centroïde
+ITERATIONS_KMEANS = 10
+ECHANTILLON_PAR_CENTROIDE = 64
+# méthodes de score des passages (un mode de recherche est l'une d'elles, ou "hybride" pour en combiner deux)
+METHODES = ("tfidf", "bm25", "dense")
+# les centroïdes sont ré-entraînés quand le nombre de vecteurs a été multiplié par ce facteur depuis l'entraînement
+FACTEUR_REENTRAINEMENT = 4
+
+
+def normaliser_lignes(vecteurs):
+    """Normalisation L2 des lignes d'un tableau dense (une ligne nulle reste nulle)."""
+    normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+    return vecteurs / np.maximum(normes, 1e-12)
+
+
+class EncodeurHachage:
+    """
+    Encodeur intégré : n-grammes de caractères (3 et 4, dans les mots) et mots,
+    hachés avec signe dans dimension colonnes (chaque vecteur est une projection
+    aléatoire de ses comptes de n-grammes), comptes amortis par log puis normalisation.
+    """
+
+    def __init__(self, dimension=256):
+        self.dimension = dimension
+        self.nom = f"hachage-{dimension}"
+        self._vectoriseurs = None
+
+    def _preparer(self):
+        if self._vectoriseurs is None:
+            texte = importer("sklearn.feature_extraction.text")
+            options = dict(n_features=self.dimension, alternate_sign=True, norm=None, strip_accents="unicode")
+            self._vectoriseurs = (
+                texte.HashingVectorizer(analyzer="char_wb", ngram_range=(3, 4), **options),
+                texte.HashingVectorizer(analyzer="word", **options),
+            )
+        return self._vectoriseurs
+
+    def encoder(self, textes):
+        caracteres, mots = self._preparer()
+        vecteurs = np.empty((len(textes), self.dimension), dtype=np.float32)
+        for debut in range(0, len(textes), config.DENSE_BATCH_SIZE):
+            lot = textes[debut:debut + config.DENSE_BATCH_SIZE]
+            comptes = (caracteres.transform(lot) + 2.0 * mots.transform(lot)).toarray()
+            vecteurs[debut:debut + len(lot)] = np.sign(comptes) * np.log1p(np.abs(comptes))
+        return normaliser_lignes(vecteurs).astype(np.float32, copy=False)
+
+
+class EncodeurSentenceTransformers:
+    """Modèle sentence-transformers stocké localement (dossier du modèle), exécuté sur CPU."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.nom = f"sentence-transformers:{os.path.basename(os.path.normpath(chemin))}"
+        self._modele = None
+
+    def _preparer(self):
+        if self._modele is None:
+            # aucun accès réseau : le modèle doit déjà être dans le dossier
+            os.environ.setdefault("HF_HUB_OFFLINE", "1")
+            self._modele = importer("sentence_transformers").SentenceTransformer(self.chemin, device="cpu")
+        return self._modele
+
+    @property
+    def dimension(self):
+        return self._preparer().get_sentence_embedding_dimension()
+
+    def encoder(self, textes):
+        vecteurs = self._preparer().encode(
+            list(textes), batch_size=config.DENSE_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vecteurs, dtype=np.float32).reshape(len(textes), -1)
+
+
+_ENCODEURS = {}
+
+
+def methodes_du_mode(mode):
+    """Méthodes de score utilisées par un mode de recherche : "hybride" combine les deux de config.HYBRID_METHODS."""
+    methodes = tuple(config.HYBRID_METHODS) if mode == "hybride" else (mode,)
+    inconnues = [methode for methode in methodes if methode not in METHODES]
+    if inconnues or len(methodes) != (2 if mode == "hybride" else 1):
+        raise ValueError(f"Mode de recherche invalide : {mode!r} (méthodes {methodes}, parmi {', '.join(METHODES)})")
+    return methodes
+
+
+def encodeur_configure():
+    """
+    Encodeur choisi par la configuration (partagé par tout le processus), ou None
+    si config.RETRIEVAL_MODE n'utilise pas de vecteurs denses.
+    """
+    if "dense" not in methodes_du_mode(config.RETRIEVAL_MODE):
+        return None
+    cle = (config.DENSE_MODEL_PATH, config.DENSE_DIMENSION)
+    if cle not in _ENCODEURS:
+        if config.DENSE_MODEL_PATH:
+            if not disponible("sentence_transformers"):
+                raise RuntimeError("DENSE_MODEL_PATH est défini mais sentence-transformers n'est pas installé.")
+            _ENCODEURS[cle] = EncodeurSentenceTransformers(config.DENSE_MODEL_PATH)
+        else:
+            _ENCODEURS[cle] = EncodeurHachage(config.DENSE_DIMENSION)
+    return _ENCODEURS[cle]
+
+
+def quantifier(vecteurs):
+    """Quantification int8 symétrique, une échelle par vecteur : vecteur ≈ codes * échelle."""
+    echelles = np.abs(vecteurs).max(axis=1) / 127.0
+    echelles[echelles == 0] = 1.0
+    codes = np.rint(vecteurs / echelles[:, None]).astype(np.int8)
+    return codes, echelles.astype(np.float32)
+
+
+def kmeans_spherique(vecteurs, nb_centroides, graine=0):
+    """Centroïdes normalisés (k-means sur la similarité cosinus) d'un échantillon de vecteurs float32."""
+    rng = np.random.default_rng(graine)
+    centroides = vecteurs[rng.choice(len(vecteurs), nb_centroides, replace=False)].copy()
+    for _ in range(ITERATIONS_KMEANS):
+        etiquettes = np.argmax(vecteurs @ centroides.T, axis=1)
+        # somme des vecteurs de chaque liste (matrice d'appartenance creuse x vecteurs)
+        appartenance = sparse.csr_matrix((np.ones(len(vecteurs), dtype=np.float32), (etiquettes, np.arange(len(vecteurs)))),
+                                         shape=(nb_centroides, len(vecteurs)))
+        sommes = np.asarray(appartenance @ vecteurs)
+        vides = np.bincount(etiquettes, minlength=nb_centroides) == 0
+        # un centroïde sans vecteur est replacé sur un vecteur tiré au hasard
+        sommes[vides] = vecteurs[rng.choice(len(vecteurs), int(vides.sum()))]
+        centroides = normaliser_lignes(sommes).astype(np.float32)
+    return centroides
+
+
+class _Segment:
+    """
+    Vecteurs d'une suite de chunks consécutifs, avec leurs listes IVF. Un segment n'est jamais
+    modifié : preparer le remplace par un nouveau segment qui partage ses vecteurs.
+    """
+
+    __slots__ = ("vecteurs", "echelles", "etiquettes", "ordre", "debuts", "mmap")
+
+    def __init__(self, vecteurs, echelles, etiquettes, ordre=None, debuts=None, mmap=False):
+        self.vecteurs = vecteurs
+        self.echelles = echelles
+        # liste IVF de chaque vecteur (-1 = pas encore affecté), vecteurs du segment rangés par liste
+        self.etiquettes = etiquettes
+        self.ordre = ordre
+        self.debuts = debuts
+        # tableaux d'un instantané en mmap : jamais recopiés par une fusion
+        self.mmap = mmap
+
+    def __len__(self):
+        return len(self.vecteurs)
+
+    def en_float32(self, indices=None):
+        vecteurs = self.vecteurs if indices is None else self.vecteurs[indices]
+        if self.echelles is None:
+            return np.asarray(vecteurs, dtype=np.float32)
+        echelles = self.echelles if indices is None else self.echelles[indices]
+        return vecteurs.astype(np.float32) * echelles[:, None]
+
+    def scores(self, requetes):
+        """Similarités (nb vecteurs x nb requêtes) de tous les vecteurs, int8 décodés par blocs."""
+        if self.echelles is None:
+            return np.asarray(self.vecteurs) @ requetes.T
+        resultat = np.empty((len(self), len(requetes)), dtype=np.float32)
+        for debut in range(0, len(self), TAILLE_BLOC):
+            fin = min(debut + TAILLE_BLOC, len(self))
+            resultat[debut:fin] = (self.vecteurs[debut:fin].astype(np.float32) @ requetes.T) \
+                * self.echelles[debut:fin, None]
+        return resultat
+
+    def ranger(self, centroides):
+        """Segment avec ses vecteurs non affectés affectés au centroïde le plus proche, et rangés par liste."""
+        etiquettes = self.etiquettes
+        a_affecter = np.flatnonzero(etiquettes < 0)
+        if len(a_affecter):
+            etiquettes = np.array(etiquettes)
+            for debut in range(0, len(a_affecter), TAILLE_BLOC):
+                bloc = a_affecter[debut:debut + TAILLE_BLOC]
+                etiquettes[bloc] = np.argmax(self.en_float32(bloc) @ centroides.T, axis=1)
+        ordre = np.argsort(etiquettes, kind="stable").astype(np.int64)
+        debuts = np.searchsorted(etiquettes[ordre], np.arange(len(centroides) + 1))
+        return _Segment(self.vecteurs, self.echelles, etiquettes, ordre, debuts, self.mmap)
+
+    def tableaux(self):
+        return tuple(tableau for tableau in (self.vecteurs, self.echelles, self.etiquettes, self.ordre, self.debuts)
+                     if tableau is not None)
+
+
+def _reunir(segments):
+    """Segment unique avec les vecteurs des segments (recopiés, sauf s'il n'y en a qu'un), listes IVF à ranger."""
+    if len(segments) == 1:
+        return segments[0]
+    echelles = None if segments[0].echelles is None else np.concatenate([s.echelles for s in segments])
+    return _Segment(np.concatenate([s.vecteurs for s in segments]), echelles,
+                    np.concatenate([s.etiquettes for s in segments]))
+
+
+class VecteursDenses:
+    """
+    Vecteurs des chunks (une ligne par chunk, dans l'ordre de l'index) et index IVF.
+    Comme les matrices de IndexIncremental, les tableaux ne sont jamais modifiés sur
+    place : ajouter et filtrer retournent un nouvel objet, que les versions
+    précédentes de l'index ne voient pas. Comme les textes de magasin_chunks.MagasinChunks,
+    les vecteurs sont rangés par segments : un ajout crée un segment (avec ses propres
+    listes IVF), fusionné avec les précédents de taille comparable, sans recopier les
+    vecteurs de l'instantané en mmap ; filtrer et tableaux réunissent les segments.
+    """
+
+    def __init__(self, dimension, quantification):
+        self.dimension = dimension
+        self.quantification = quantification
+        self.segments = ()
+        # indice du premier vecteur de chaque segment, plus le nombre de vecteurs
+        self.debuts_segments = (0,)
+        # centroïdes IVF (None : recherche exhaustive), partagés par tous les segments
+        self.centroides = None
+        # nombre de vecteurs au dernier entraînement des centroïdes
+        self.nb_entrainement = 0
+
+    def __len__(self):
+        return self.debuts_segments[-1]
+
+    @property
+    def ivf(self):
+        """Vrai si la recherche passe par les listes IVF (voir preparer)."""
+        return self.centroides is not None and all(segment.ordre is not None for segment in self.segments)
+
+    def description(self, encodeur):
+        """Ce qui doit correspondre entre un instantané sur disque et la configuration courante."""
+        return {"encodeur": encodeur.nom, "dimension": self.dimension, "quantification": self.quantification}
+
+    def _copie(self, segments):
+        copie = VecteursDenses.__new__(VecteursDenses)
+        copie.__dict__.update(self.__dict__)
+        copie.segments = tuple(segments)
+        copie.debuts_segments = tuple(np.concatenate(([0], np.cumsum([len(s) for s in segments]))).tolist())
+        return copie
+
+    def ajouter(self, vecteurs):
+        """Nouvel objet avec les vecteurs (float32, normalisés) ajoutés à la fin."""
+        if self.quantification == "int8":
+            codes, echelles = quantifier(vecteurs)
+        else:
+            codes, echelles = vecteurs.astype(np.float32, copy=False), None
+        segments = list(self.segments) + [_Segment(codes, echelles, np.full(len(vecteurs), -1, dtype=np.int32))]
+        # fusion des derniers segments tant que le précédent n'est pas plus de deux fois plus grand
+        while len(segments) > 1 and not segments[-2].mmap and len(segments[-2]) <= 2 * len(segments[-1]):
+            segments[-2:] = [_reunir(segments[-2:])]
+        return self._copie(segments)
+
+    def filtrer(self, garder):
+        """Nouvel objet avec seulement les vecteurs des chunks gardés (masque booléen)."""
+        garder = np.asarray(garder, dtype=bool)
+        gardes = []
+        for segment, debut, fin in zip(self.segments, self.debuts_segments, self.debuts_segments[1:]):
+            masque = garder[debut:fin]
+            gardes.append(_Segment(segment.vecteurs[masque],
+                                   segment.echelles[masque] if segment.echelles is not None else None,
+                                   segment.etiquettes[masque]))
+        return self._copie([_reunir(gardes)] if gardes else [])
+
+    def _localiser(self, indices):
+        """Pour chaque segment : (segment, positions dans indices, indices dans le segment) des indices qu'il contient."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(self.segments) == 1:
+            return [(self.segments[0], slice(None), indices)]
+        numeros = np.searchsorted(self.debuts_segments, indices, side="right") - 1
+        resultat = []
+        for numero in np.unique(numeros):
+            positions = np.flatnonzero(numeros == numero)
+            resultat.append((self.segments[numero], positions, indices[positions] - self.debuts_segments[numero]))
+        return resultat
+
+    def en_float32(self, indices=None):
+        """Vecteurs (tous, ou ceux des indices donnés) décodés en float32."""
+        if indices is None:
+            return np.concatenate([segment.en_float32() for segment in self.segments]
+                                  or [np.zeros((0, self.dimension), dtype=np.float32)])
+        resultat = np.empty((len(indices), self.dimension), dtype=np.float32)
+        for segment, positions, locaux in self._localiser(indices):
+            resultat[positions] = segment.en_float32(locaux)
+        return resultat
+
+    def preparer(self):
+        """
+        Construit l'index IVF s'il est utile : centroïdes (ré-)entraînés si besoin,
+        affectation des vecteurs qui n'en ont pas encore, listes de chaque segment rangées
+        par centroïde. Seuls les segments ajoutés depuis le dernier appel sont rangés.
+        """
+        n = len(self)
+        if n < config.DENSE_IVF_MIN_VECTORS:
+            self.centroides = None
+            return
+        if self.centroides is None or n > FACTEUR_REENTRAINEMENT * self.nb_entrainement:
+            nb_centroides = min(4096, int(4 * np.sqrt(n)))
+            rng = np.random.default_rng(0)
+            echantillon = rng.choice(n, min(n, nb_centroides * ECHANTILLON_PAR_CENTROIDE), replace=False)
+            self.centroides = kmeans_spherique(self.en_float32(np.sort(echantillon)), nb_centroides)
+            self.nb_entrainement = n
+            # toutes les affectations sont à refaire
+            self.segments = tuple(_Segment(s.vecteurs, s.echelles, np.full(len(s), -1, dtype=np.int32), mmap=s.mmap)
+                                  for s in self.segments)
+        self.segments = tuple(s if s.ordre is not None else s.ranger(self.centroides) for s in self.segments)
+
+    def candidats(self, requete, nprobe):
+        """Indices des vecteurs des nprobe listes les plus proches de la requête, ou None (tous)."""
+        if not self.ivf:
+            return None
+        nprobe = min(nprobe, len(self.centroides))
+        listes = np.argpartition(-(self.centroides @ requete), nprobe - 1)[:nprobe]
+        return np.concatenate([segment.ordre[segment.debuts[l]:segment.debuts[l + 1]] + debut
+                               for segment, debut in zip(self.segments, self.debuts_segments) for l in listes]
+                              or [np.zeros(0, dtype=np.int64)])
+
+    def scores(self, requetes, indices=None):
+        """
+        Similarités (nb vecteurs x nb requêtes) entre les requêtes (float32 normalisées) et les
+        vecteurs des indices donnés (tous si None). Les vecteurs int8 sont décodés par blocs.
+        """
+        if indices is not None:
+            return self.en_float32(indices) @ requetes.T
+        if len(self.segments) == 1:
+            return self.segments[0].scores(requetes)
+        resultat = np.empty((len(self), len(requetes)), dtype=np.float32)
+        for segment, debut in zip(self.segments, self.debuts_segments):
+            resultat[debut:debut + len(segment)] = segment.scores(requetes)
+        return resultat
+
+    def tableaux(self):
+        """Tableaux à sauvegarder avec l'instantané de l'index (nom -> tableau), segments réunis."""
+        self.preparer()
+        segment = _reunir(self.segments) if self.segments else _Segment(
+            np.zeros((0, self.dimension), dtype=np.int8 if self.quantification == "int8" else np.float32),
+            np.zeros(0, dtype=np.float32) if self.quantification == "int8" else None, np.zeros(0, dtype=np.int32))
+        if self.centroides is not None and segment.ordre is None:
+            segment = segment.ranger(self.centroides)
+        tableaux = {"dense_vecteurs": segment.vecteurs, "dense_etiquettes": segment.etiquettes}
+        if segment.echelles is not None:
+            tableaux["dense_echelles"] = segment.echelles
+        if self.centroides is not None:
+            tableaux.update(dense_centroides=self.centroides, dense_ordre=segment.ordre, dense_debuts=segment.debuts)
+        return tableaux
+
+    @classmethod
+    def depuis_tableaux(cls, description, charger, nb_entrainement):
+        """Recrée l'objet à partir des tableaux d'un instantané ; charger(nom) retourne le tableau (en mmap) ou None."""
+        denses = cls(description["dimension"], description["quantification"])
+        denses.centroides = charger("dense_centroides")
+        avec_listes = denses.centroides is not None
+        segment = _Segment(charger("dense_vecteurs"),
+                           charger("dense_echelles") if denses.quantification == "int8" else None,
+                           charger("dense_etiquettes"),
+                           charger("dense_ordre") if avec_listes else None,
+                           charger("dense_debuts") if avec_listes else None, mmap=True)
+        denses.nb_entrainement = nb_entrainement
+        return denses._copie([segment] if len(segment) else [])
+
+    def octets(self):
+        return int(sum(tableau.nbytes for segment in self.segments for tableau in segment.tableaux())
+                   + (self.centroides.nbytes if self.centroides is not None else 0))
@@ -0,0 +1,77 @@
+"""
+Index de recherche approximative pour les clés de la base de connaissances.
+
+difflib.get_close_matches compare la question à chaque clé avec un
+SequenceMatcher (coût O(N·L²) par question). Ici, le nombre d'occurrences de
+chaque caractère de chaque clé est calculé une fois pour toutes. Pour une
+question, on en déduit d'un seul calcul vectoriel la borne quick_ratio de
+difflib pour toutes les clés (le ratio exact ne peut pas la dépasser). Seules
+les clés dont la borne atteint le seuil sont comparées avec les mêmes tests que
+difflib, de la borne la plus haute à la plus basse, et la comparaison s'arrête
+dès que la borne passe sous le meilleur ratio trouvé. Le résultat est donc
+exactement celui de difflib.get_close_matches(..., n=1).
+"""
+
+import difflib
+from collections import Counter
+
+try:
+    import numpy as np # calcul vectoriel des bornes
+except ImportError:
+    np = None
+
+
+class IndexFlou:
+    def __init__(self, cles):
+        self.cles = list(cles)
+        if np is None:
+            return
+        # colonne de chaque caractère rencontré dans les clés
+        self._colonnes = {c: i for i, c in enumerate(sorted(set("".join(self.cles))))}
+        self._longueurs = np.array([len(cle) for cle in self.cles], dtype=np.int64)
+        # nombre d'occurrences de chaque caractère, par clé
+        self._comptes = np.zeros((len(self.cles), len(self._colonnes)), dtype=np.int32)
+        for i, cle in enumerate(self.cles):
+            for caractere, nombre in Counter(cle).items():
+                self._comptes[i, self._colonnes[caractere]] = nombre
+
+    def __len__(self):
+        return len(self.cles)
+
+    def bornes(self, requete):
+        """quick_ratio de difflib entre la requête et chaque clé (majorant du ratio exact)."""
+        requete_comptes = np.zeros(len(self._colonnes), dtype=np.int32)
+        for caractere, nombre in Counter(requete).items():
+            colonne = self._colonnes.get(caractere)
+            if colonne is not None:
+                requete_comptes[colonne] = nombre
+        communs = np.minimum(self._comptes, requete_comptes).sum(axis=1)
+        totaux = self._longueurs + len(requete)
+        # même convention que difflib : deux chaînes vides ont un ratio de 1.0
+        return np.where(totaux > 0, 2.0 * communs / np.maximum(totaux, 1), 1.0)
+
+    def meilleure_correspondance(self, requete, cutoff):
+        """Même résultat que difflib.get_close_matches(requete, cles, n=1, cutoff=cutoff), ou None."""
+        if not self.cles:
+            return None
+        if np is None:
+            correspondance = difflib.get_close_matches(requete, self.cles, n=1, cutoff=cutoff)
+            return correspondance[0] if correspondance else None
+        bornes = self.bornes(requete)
+        candidats = np.flatnonzero(bornes >= cutoff)
+        ordre = candidats[np.argsort(-bornes[candidats], kind="stable")]
+        s = difflib.SequenceMatcher()
+        s.set_seq2(requete)
+        meilleur = None
+        for i in ordre:
+            # aucune clé restante ne peut dépasser le meilleur ratio (une égalité reste possible)
+            if meilleur is not None and bornes[i] < meilleur[0]:
+                break
+            cle = self.cles[i]
+            s.set_seq1(cle)
+            if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff and s.ratio() >= cutoff:
+                # même départage que difflib : le plus grand (score, clé)
+                resultat = (s.ratio(), cle)
+                if meilleur is None or resultat > meilleur:
+                    meilleur = resultat
+        return meilleur[1] if meilleur else None
@@ -0,0 +1,93 @@
+"""
+Regroupement des requêtes concurrentes en lots (micro-batching) pour l'API.
+
+Chaque requête /recherche traitée seule paie le coût fixe d'un appel : nettoyage,
+vectorisation de la question, produit creux par la matrice des documents,
+sélection des passages, écriture dans le journal. Sous charge, des centaines de
+requêtes par seconde paient ce coût chacune de leur côté.
+
+Le Regroupeur s'exécute dans la boucle d'événements de l'API : une requête y
+dépose son entrée et attend son résultat. Le premier arrivé d'un lot déclenche
+une minuterie de attente_max secondes ; le lot part quand la minuterie expire ou
+dès qu'il atteint taille_max entrées. Le lot est traité en un seul appel de
+traiter_lot(entrees) dans le pool de threads, et chaque appelant reçoit son
+propre résultat (ou l'exception levée par le traitement du lot).
+
+Quand aucun lot n'est en cours de traitement, il n'y a pas de raison d'attendre :
+le lot part au tour suivant de la boucle d'événements (avec les requêtes arrivées
+pendant ce tour). Une requête isolée ne paie donc pas attente_max ; l'attente ne
+sert que sous charge, quand les requêtes s'accumulent pendant qu'un lot est traité.
+"""
+
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+
+class Regroupeur:
+    def __init__(self, traiter_lot, taille_max=32, attente_max=0.002):
+        # traiter_lot(entrees) -> liste des résultats, dans l'ordre des entrées (appelée dans le pool de threads)
+        self.traiter_lot = traiter_lot
+        self.taille_max = taille_max
+        self.attente_max = attente_max
+        # (entrée, future) en attente du prochain lot
+        self._file = []
+        self._minuterie = None
+        # lots en cours de traitement dans le pool de threads (la boucle ne garde pas de référence aux tâches)
+        self._en_cours = 0
+        self._taches = set()
+        # nombre de lots traités et d'entrées qu'ils contenaient (taille moyenne des lots)
+        self.nb_lots = 0
+        self.nb_entrees = 0
+
+    async def soumettre(self, entree):
+        """Ajoute entree au prochain lot et retourne son résultat une fois le lot traité."""
+        boucle = asyncio.get_running_loop()
+        future = boucle.create_future()
+        self._file.append((entree, future))
+        if len(self._file) >= self.taille_max:
+            self._lancer()
+        elif self._minuterie is None:
+            if self._en_cours and self.attente_max > 0:
+                self._minuterie = boucle.call_later(self.attente_max, self._lancer)
+            else:
+                self._minuterie = boucle.call_soon(self._lancer)
+        return await future
+
+    def _lancer(self):
+        if self._minuterie is not None:
+            self._minuterie.cancel()
+            self._minuterie = None
+        lot, self._file = self._file[:self.taille_max], self._file[self.taille_max:]
+        if self._file:
+            # entrées au-delà de taille_max : elles partent au tour suivant de la boucle
+            self._minuterie = asyncio.get_running_loop().call_soon(self._lancer)
+        if lot:
+            self.nb_lots += 1
+            self.nb_entrees += len(lot)
+            self._en_cours += 1
+            tache = asyncio.get_running_loop().create_task(self._executer(lot))
+            self._taches.add(tache)
+            tache.add_done_callback(self._taches.discard)
+
+    async def _executer(self, lot):
+        try:
+            resultats = await run_in_threadpool(self.traiter_lot, [entree for entree, _ in lot])
+        except Exception as e:
+            for _, future in lot:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._en_cours -= 1
+        for (_, future), resultat in zip(lot, resultats):
+            # un appelant déconnecté a pu annuler sa future
+            if not future.done():
+                future.set_result(resultat)
+
+    def statistiques(self):
+        return {
+            "lots": self.nb_lots,
+            "requetes": self.nb_entrees,
+            "taille_moyenne": round(self.nb_entrees / self.nb_lots, 2) if self.nb_lots else 0.0,
+        }
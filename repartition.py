@@ -0,0 +1,653 @@
+"""
+Index réparti : les chunks sont répartis entre plusieurs partitions, chacune servie par son propre processus.
+
+Un IndexIncremental garde toutes les matrices dans le processus de l'API : la
+taille du corpus est bornée par la mémoire d'une machine, et chaque recherche
+n'utilise qu'un cœur. Avec config.INDEX_SHARDS > 1 (ou config.SHARD_ADDRESSES),
+les documents sont répartis entre plusieurs partitions : chaque document va
+entier dans une partition, choisie par une empreinte de son nom, si bien qu'un
+remplacement ou une suppression va toujours à la même partition. Chaque
+partition est un IndexIncremental servi par un processus (servir_partition).
+Ce processus est lancé sur la même machine par le coordinateur, ou sur une autre
+machine (config.SHARD_ADDRESSES).
+
+Le coordinateur (IndexReparti) remplace l'IndexIncremental du Chatbot :
+  - recherche : les questions sont envoyées à toutes les partitions à la fois.
+    Chacune retourne ses k meilleurs passages, et le coordinateur garde les k
+    meilleurs de l'ensemble. Une partition qui n'a pas répondu après
+    config.SHARD_TIMEOUT_MS millisecondes est ignorée : la réponse est faite avec
+    les autres partitions, et l'absence est comptée (hors_delai, exporté sur /metrics) ;
+  - IDF global : des scores venus de partitions différentes ne sont comparables que
+    si les partitions utilisent les mêmes poids. À chaque publication, le
+    coordinateur additionne les fréquences documentaires, les nombres de chunks et
+    les longueurs de toutes les partitions. Comme un IndexIncremental, il ne fait
+    recalculer les poids des partitions qu'au-delà de config.IDF_REFRESH_DRIFT ou de
+    config.IDF_REFRESH_INTERVAL (et après un compactage) : il leur envoie alors les
+    statistiques globales ; sinon chaque partition pondère ses nouveaux chunks avec
+    les poids courants. Pour BM25, il leur renvoie aussi le maximum des bornes de
+    chaque terme (seulement si config.RETRIEVAL_MODE utilise BM25 : sinon une
+    recherche "bm25" explicite garde la normalisation propre à chaque partition).
+    Chaque partition calcule ainsi ses poids TF-IDF et BM25 comme un index unique
+    contenant tous les chunks, et ses scores sont ceux de cet index unique.
+    Les fréquences et les bornes sont échangées en creux (termes et valeurs), et
+    seulement celles qui ont changé depuis la publication précédente : le volume
+    échangé dépend des documents modifiés, pas de config.HASH_FEATURES ;
+  - modifications : comme pour IndexIncremental, elles sont faites sur un brouillon
+    dans chaque partition concernée, puis publiées par figer(). Pendant ce temps,
+    les recherches continuent sur l'index publié de chaque partition.
+
+En mode "hybride", chaque partition combine ses propres candidats ; en mode "dense",
+chaque partition a son propre index IVF.
+
+Les appels passent par multiprocessing.connection : les objets Python sont
+sérialisés par pickle, et la connexion est authentifiée par la clé
+config.SHARD_AUTHKEY. Plusieurs appels peuvent être en cours sur la même
+connexion ; chaque réponse est rattachée à son appel par un numéro. La clé doit
+rester secrète : qui la connaît peut exécuter du code dans le processus d'une partition.
+
+Pour des partitions sur d'autres machines, lancer sur chacune :
+
+    SHARD_AUTHKEY=... python repartition.py --adresse 0.0.0.0:7001 --dossier index/partition-0
+
+puis l'API avec SHARD_ADDRESSES=machine1:7001,machine2:7001 et la même SHARD_AUTHKEY.
+Les workers en mode "lecteur" (INDEX_ROLE=lecteur) exigent SHARD_ADDRESSES : ils
+interrogent les partitions que constructeur_index.py alimente avec les mêmes adresses.
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as DelaiDepasse
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+import config # Importation de la configuration centralisée
+from indexation import IndexIncremental
+from recherche_dense import methodes_du_mode
+
+# appels exécutés en même temps par le processus d'une partition (une recherche n'attend pas une modification)
+APPELS_SIMULTANES = 4
+# temps maximal (secondes) de démarrage d'un processus de partition (chargement de son instantané compris)
+DELAI_DEMARRAGE = 300
+
+
+def partition_du_document(nom, nb_partitions):
+    """Numéro de la partition d'un document : empreinte stable de son nom (la même dans tous les processus)."""
+    return zlib.crc32(nom.encode("utf-8")) % nb_partitions
+
+
+def adresse_reseau(texte):
+    """"hôte:port" -> (hôte, port)"""
+    hote, _, port = texte.rpartition(":")
+    return hote, int(port)
+
+
+# --- Côté partition ---
+
+class Partition:
+    """
+    Une partition dans son processus : l'IndexIncremental publié (lu par les recherches) et le
+    brouillon des modifications en cours, publié à la demande du coordinateur (preparer puis publier).
+    """
+
+    # méthodes que le coordinateur peut appeler
+    METHODES = {"passages", "etat", "statistiques", "modifier", "abandonner", "frequences", "preparer",
+                "publier", "sauvegarder"}
+
+    def __init__(self, dossier=None):
+        # dossier de l'instantané de la partition (None : rien n'est écrit sur disque)
+        self.dossier = dossier
+        index = IndexIncremental.charger(dossier) if dossier else None
+        self.index = (index or IndexIncremental()).figer()
+        self._brouillon = None
+        # fréquences documentaires et bornes BM25 de toutes les partitions, telles que fixées en dernier par le
+        # coordinateur (il n'envoie que les valeurs qui ont changé)
+        self._df_global = None
+        self._normes = None
+        self._verrou = threading.Lock()
+
+    def passages(self, textes, k, seuil, mode):
+        index = self.index
+        if not len(index):
+            return [[] for _ in textes]
+        return index.passages(textes, k, seuil, mode)
+
+    def etat(self):
+        index = self.index
+        return {"documents": index.documents, "chunks": len(index), "supprimes": index.nb_supprimes,
+                "version": index.version, "generation": index.generation}
+
+    def statistiques(self):
+        return self.index.statistiques()
+
+    def _brouillon_courant(self):
+        if self._brouillon is None:
+            self._brouillon = self.index.copie()
+        return self._brouillon
+
+    def modifier(self, operation, *arguments):
+        """Applique operation (ajouter_documents, retirer_documents, compacter) au brouillon."""
+        with self._verrou:
+            return getattr(self._brouillon_courant(), operation)(*arguments)
+
+    def abandonner(self):
+        """Oublie le brouillon d'une modification interrompue."""
+        with self._verrou:
+            self._brouillon = None
+
+    def frequences(self, complet=False):
+        """
+        Statistiques locales (voir IndexIncremental.statistiques_locales) du brouillon, ou de l'index publié :
+        (termes, fréquences documentaires) en creux, nombre de chunks et somme des longueurs. Sauf si complet,
+        les fréquences sont leurs variations depuis l'index publié (celles du brouillon).
+        """
+        with self._verrou:
+            index = self._brouillon if self._brouillon is not None else self.index
+            df, nb_chunks, longueur = index.statistiques_locales()
+            if not complet:
+                df = df - self.index.statistiques_locales()[0]
+            termes = np.flatnonzero(df)
+            return termes, df[termes], nb_chunks, longueur
+
+    def preparer(self, statistiques=None):
+        """
+        Prépare la publication du brouillon. statistiques : None si les poids ne changent pas (les chunks
+        ajoutés sont pondérés avec les poids courants), sinon (termes, fréquences, complet, nombre de chunks,
+        longueur moyenne) de toutes les partitions, les fréquences étant en creux : toutes si complet, sinon
+        seulement celles qui ont changé. Retourne les bornes BM25 du brouillon en creux (termes, bornes) si le
+        mode les utilise : toutes après de nouvelles statistiques, sinon celles qui dépassent les normes courantes.
+        """
+        with self._verrou:
+            brouillon = self._brouillon_courant()
+            if statistiques is not None:
+                termes, frequences, complet, nb_chunks, longueur_moyenne = statistiques
+                if complet:
+                    df = np.zeros(brouillon.n_features, dtype=np.int64)
+                elif self._df_global is None:
+                    raise RuntimeError("statistiques globales inconnues : une publication complète est nécessaire")
+                else:
+                    df = self._df_global.copy()
+                df[termes] = frequences
+                self._df_global = df
+                brouillon.fixer_statistiques(df, nb_chunks, longueur_moyenne)
+            if not len(brouillon) or "bm25" not in methodes_du_mode(config.RETRIEVAL_MODE):
+                return None
+            maximums = brouillon.postings_bm25().maximums
+            if statistiques is None and self._normes is not None:
+                termes = np.flatnonzero(maximums > self._normes)
+            else:
+                termes = np.flatnonzero(maximums)
+            return termes, maximums[termes]
+
+    def publier(self, normes_bm25=None):
+        """
+        Fige et publie le brouillon préparé ; retourne le nouvel état de la partition. normes_bm25 :
+        (termes, bornes, complet) des bornes BM25 de toutes les partitions, en creux (toutes si complet,
+        sinon celles qui ont changé), ou None si le mode n'utilise pas BM25.
+        """
+        with self._verrou:
+            if normes_bm25 is not None:
+                termes, bornes, complet = normes_bm25
+                if complet or self._normes is None:
+                    normes = np.zeros(self.index.n_features, dtype=np.float32)
+                else:
+                    normes = self._normes.copy()
+                normes[termes] = bornes
+                self._normes = normes
+            if self._brouillon is not None:
+                if normes_bm25 is not None and len(self._brouillon):
+                    self._brouillon.fixer_normes_bm25(self._normes)
+                self.index = self._brouillon.figer()
+                self._brouillon = None
+        return self.etat()
+
+    def sauvegarder(self):
+        if self.dossier is None:
+            return None
+        return self.index.sauvegarder(self.dossier)
+
+
+def servir_partition(adresse, cle, dossier=None, parametres=None, pret=None):
+    """
+    Boucle du processus d'une partition. Chaque connexion (un coordinateur) est lue par un thread,
+    et chaque appel est exécuté dans un pool de threads. adresse None : adresse locale choisie par
+    le système, envoyée au processus parent par la connexion pret. parametres : valeurs de config
+    du coordinateur (un processus démarré par spawn relit config.py).
+    """
+    for nom, valeur in (parametres or {}).items():
+        setattr(config, nom, valeur)
+    partition = Partition(dossier)
+    ecoute = Listener(adresse, authkey=cle)
+    if pret is not None:
+        pret.send(ecoute.address)
+        pret.close()
+    with ThreadPoolExecutor(max_workers=APPELS_SIMULTANES) as pool:
+        while True:
+            try:
+                connexion = ecoute.accept()
+            except (OSError, multiprocessing.AuthenticationError) as e:
+                print(f"Connexion refusée : {e}")
+                continue
+            threading.Thread(target=_servir_connexion, args=(partition, connexion, pool), daemon=True).start()
+
+
+def _servir_connexion(partition, connexion, pool):
+    envoi = threading.Lock()
+
+    def executer(numero, methode, arguments):
+        try:
+            if methode not in Partition.METHODES:
+                raise AttributeError(f"méthode inconnue : {methode}")
+            reponse = (numero, True, getattr(partition, methode)(*arguments))
+        except Exception as e:
+            reponse = (numero, False, f"{type(e).__name__}: {e}")
+        try:
+            with envoi:
+                connexion.send(reponse)
+        except OSError:
+            pass
+
+    while True:
+        try:
+            numero, methode, arguments = connexion.recv()
+        except (EOFError, OSError):
+            break
+        pool.submit(executer, numero, methode, arguments)
+    connexion.close()
+
+
+# --- Côté coordinateur ---
+
+class ClientPartition:
+    """Connexion du coordinateur à une partition : appeler() envoie l'appel et retourne aussitôt une Future."""
+
+    def __init__(self, adresse, cle, processus=None):
+        self.adresse = adresse
+        # processus local de la partition (None pour une partition distante)
+        self.processus = processus
+        self._connexion = Client(adresse, authkey=cle)
+        self._envoi = threading.Lock()
+        # numéro de l'appel -> Future en attente de sa réponse
+        self._attente = {}
+        self._numeros = itertools.count()
+        threading.Thread(target=self._lire, name=f"partition-{adresse}", daemon=True).start()
+
+    def appeler(self, methode, *arguments):
+        future = Future()
+        numero = next(self._numeros)
+        self._attente[numero] = future
+        try:
+            with self._envoi:
+                self._connexion.send((numero, methode, arguments))
+        except (OSError, ValueError) as e:
+            self._attente.pop(numero, None)
+            future.set_exception(ConnectionError(f"partition {self.adresse} injoignable : {e}"))
+        return future
+
+    def _lire(self):
+        while True:
+            try:
+                numero, reussi, resultat = self._connexion.recv()
+            except (EOFError, OSError):
+                break
+            # la réponse d'un appel abandonné (délai dépassé) est simplement ignorée par l'appelant
+            future = self._attente.pop(numero, None)
+            if future is None:
+                continue
+            if reussi:
+                future.set_result(resultat)
+            else:
+                future.set_exception(RuntimeError(f"partition {self.adresse} : {resultat}"))
+        # connexion perdue : les appels en attente échouent
+        for numero in list(self._attente):
+            future = self._attente.pop(numero, None)
+            if future is not None:
+                future.set_exception(ConnectionError(f"partition {self.adresse} déconnectée"))
+
+    def fermer(self):
+        self._connexion.close()
+        if self.processus is not None:
+            self.processus.terminate()
+            self.processus.join()
+
+
+def demarrer_partitions(nb, dossier, cle):
+    """
+    Démarre nb processus de partition sur cette machine, l'instantané de la partition i étant
+    dans dossier/partition-i, et retourne leurs clients. Les processus sont démarrés par spawn
+    (pas de fork d'un processus qui a déjà des threads), avec la configuration de ce processus.
+    """
+    contexte = multiprocessing.get_context("spawn")
+    parametres = {nom: valeur for nom, valeur in vars(config).items() if nom.isupper()}
+    demarres = []
+    for numero in range(nb):
+        reception, envoi = contexte.Pipe(duplex=False)
+        processus = contexte.Process(
+            target=servir_partition, name=f"partition-{numero}", daemon=True,
+            args=(None, cle, os.path.join(dossier, f"partition-{numero}"), parametres, envoi))
+        processus.start()
+        envoi.close()
+        demarres.append((processus, reception))
+    clients = []
+    for numero, (processus, reception) in enumerate(demarres):
+        if not reception.poll(DELAI_DEMARRAGE):
+            for autre, _ in demarres:
+                autre.terminate()
+            raise RuntimeError(f"La partition {numero} n'a pas démarré après {DELAI_DEMARRAGE}s.")
+        clients.append(ClientPartition(reception.recv(), cle, processus))
+    return clients
+
+
+class IndexReparti:
+    """
+    Coordinateur d'un index réparti, utilisé par le Chatbot comme un IndexIncremental (copie,
+    modifications, figer, passages, statistiques, sauvegarder). Les textes des chunks restent
+    dans les partitions ; le coordinateur ne garde que la liste des documents et les compteurs.
+    """
+
+    def __init__(self, clients, lecture_seule=False):
+        self.clients = list(clients)
+        # en lecture seule, les partitions sont modifiées et publiées par un autre coordinateur
+        self.lecture_seule = lecture_seule
+        # signature du fichier source de chaque document, comme IndexIncremental.documents
+        self.documents = {}
+        self.nb_chunks = 0
+        self.nb_supprimes = 0
+        # nombre de termes distincts de toutes les partitions (relevé à la publication)
+        self.nb_termes = 0
+        self.version = 0
+        self.generation = None
+        self.fige = False
+        self._modifie = False
+        # (version, génération) de chaque partition au dernier état relu (voir actualiser)
+        self._versions = None
+        # recherches auxquelles chaque partition n'a pas répondu à temps, ou a répondu par une erreur
+        # (compteurs partagés par toutes les copies)
+        self.hors_delai = [0] * len(self.clients)
+        self.erreurs = [0] * len(self.clients)
+        self._verrou_compteurs = threading.Lock()
+        # statistiques de toutes les partitions à la dernière publication (partagées par les copies, les
+        # publications étant faites une à la fois) : fréquences documentaires, celles des poids courants,
+        # bornes BM25, nombre de chunks et date du dernier recalcul des poids, recalcul demandé (compactage) ;
+        # df à None : l'état des partitions est inconnu, tout leur est renvoyé à la publication suivante
+        self._publie = {"df": None, "df_poids": None, "normes": None, "calcul": None, "recalcul": False}
+
+    @classmethod
+    def ouvrir(cls, lecture_seule=False):
+        """
+        Coordinateur des partitions de la configuration : partitions distantes de config.SHARD_ADDRESSES,
+        ou config.INDEX_SHARDS processus démarrés sur cette machine (instantanés dans config.INDEX_DIR).
+        En lecture seule (workers "lecteur"), les partitions doivent être celles que le constructeur
+        alimente, donc des partitions de config.SHARD_ADDRESSES : des processus démarrés par chaque
+        worker ne recevraient jamais les documents du constructeur.
+        """
+        if lecture_seule and not config.SHARD_ADDRESSES:
+            raise RuntimeError("Index réparti en lecture seule (INDEX_ROLE=lecteur) : SHARD_ADDRESSES doit désigner "
+                               "les partitions alimentées par constructeur_index.py.")
+        if config.SHARD_ADDRESSES:
+            if not config.SHARD_AUTHKEY:
+                raise RuntimeError("SHARD_AUTHKEY doit être définie pour se connecter aux partitions de SHARD_ADDRESSES.")
+            cle = config.SHARD_AUTHKEY.encode("utf-8")
+            clients = [ClientPartition(adresse_reseau(adresse), cle) for adresse in config.SHARD_ADDRESSES]
+        else:
+            cle = config.SHARD_AUTHKEY.encode("utf-8") or secrets.token_bytes(32)
+            clients = demarrer_partitions(config.INDEX_SHARDS, config.INDEX_DIR, cle)
+        index = cls(clients, lecture_seule)
+        if lecture_seule:
+            index._relire(index._attendre(index._diffuser("etat")))
+        else:
+            # les statistiques globales sont refixées : les instantanés des partitions ont pu changer séparément
+            index._publier()
+        return index
+
+    def __len__(self):
+        return self.nb_chunks
+
+    def _diffuser(self, methode, *arguments):
+        """Envoie le même appel à toutes les partitions ; retourne leurs Futures, dans l'ordre des partitions."""
+        return [client.appeler(methode, *arguments) for client in self.clients]
+
+    @staticmethod
+    def _attendre(futures, delai=None):
+        return [future.result(timeout=delai) for future in futures]
+
+    def _compter(self, compteurs, numero):
+        with self._verrou_compteurs:
+            compteurs[numero] += 1
+
+    def _relire(self, etats):
+        """Documents et compteurs du coordinateur, d'après l'état de chaque partition."""
+        self.documents = {}
+        for etat in etats:
+            self.documents.update(etat["documents"])
+        self.nb_chunks = sum(etat["chunks"] for etat in etats)
+        self.nb_supprimes = sum(etat["supprimes"] for etat in etats)
+        self._versions = [(etat["version"], etat["generation"]) for etat in etats]
+
+    def _publier(self):
+        """
+        Publication en trois temps : statistiques locales de chaque partition, statistiques globales
+        fixées sur chaque brouillon si les poids doivent être recalculés (qui retourne ses bornes BM25),
+        puis maximum des bornes fixé et brouillons publiés. Seules les valeurs qui ont changé sont
+        échangées (voir Partition.frequences, preparer et publier).
+        """
+        publie = self._publie
+        complet = publie["df"] is None
+        try:
+            frequences = self._attendre(self._diffuser("frequences", complet))
+            df = np.zeros(config.HASH_FEATURES, dtype=np.int64) if complet else publie["df"].copy()
+            for termes, variations, _, _ in frequences:
+                df[termes] += variations
+            nb_chunks = sum(nb for _, _, nb, _ in frequences)
+            longueur_moyenne = sum(longueur for _, _, _, longueur in frequences) / nb_chunks if nb_chunks else 1.0
+            # même règle que IndexIncremental._recalcul_necessaire, sur l'ensemble des partitions
+            calcul = publie["calcul"]
+            recalcul = (complet or publie["recalcul"] or calcul is None
+                        or nb_chunks - calcul[0] > config.IDF_REFRESH_DRIFT * calcul[0]
+                        or (nb_chunks > calcul[0] and time.time() - calcul[1] > config.IDF_REFRESH_INTERVAL))
+            statistiques = None
+            if recalcul:
+                tout = complet or publie["df_poids"] is None
+                termes = np.flatnonzero(df) if tout else np.flatnonzero(df != publie["df_poids"])
+                statistiques = (termes, df[termes], tout, nb_chunks, longueur_moyenne)
+            bornes = [b for b in self._attendre(self._diffuser("preparer", statistiques)) if b is not None]
+            normes, envoi = publie["normes"], None
+            if bornes or (recalcul and normes is not None):
+                tout = recalcul or normes is None
+                normes = np.zeros(config.HASH_FEATURES, dtype=np.float32) if tout else normes.copy()
+                for termes, valeurs in bornes:
+                    normes[termes] = np.maximum(normes[termes], valeurs)
+                termes = np.flatnonzero(normes) if tout else np.flatnonzero(normes != publie["normes"])
+                envoi = (termes, normes[termes], tout)
+            self._relire(self._attendre(self._diffuser("publier", envoi)))
+        except Exception:
+            publie["df"] = None
+            raise
+        publie.update(df=df, normes=normes)
+        if recalcul:
+            publie.update(df_poids=df, calcul=(nb_chunks, time.time()), recalcul=False)
+        self.nb_termes = int(np.count_nonzero(df))
+
+    def copie(self):
+        """Copie modifiable du coordinateur, avec le numéro de version suivant (voir IndexIncremental.copie)."""
+        self._verifier_ecriture()
+        # brouillons restés dans les partitions après une modification interrompue
+        self._attendre(self._diffuser("abandonner"))
+        index = IndexReparti.__new__(IndexReparti)
+        index.__dict__.update(self.__dict__)
+        index.documents = {nom: dict(meta) for nom, meta in self.documents.items()}
+        index.version = self.version + 1
+        index.generation = None
+        index.fige = False
+        index._modifie = False
+        return index
+
+    def figer(self):
+        """Publie les brouillons des partitions (avec les nouvelles statistiques globales) si l'index a été modifié."""
+        if self.fige:
+            return self
+        if self._modifie:
+            self._publier()
+        self.fige = True
+        return self
+
+    def _verifier_ecriture(self):
+        if self.lecture_seule:
+            raise RuntimeError("Index réparti en lecture seule : les partitions sont modifiées par un autre coordinateur.")
+
+    def _verifier_modifiable(self):
+        self._verifier_ecriture()
+        if self.fige:
+            raise RuntimeError("Index figé : les modifications doivent être faites sur index.copie().")
+
+    def _modifier(self, groupes, operation):
+        """Applique operation à chaque partition de groupes (numéro -> arguments), en parallèle."""
+        self._modifie = True
+        futures = [self.clients[numero].appeler("modifier", operation, arguments) for numero, arguments in groupes.items()]
+        return sum(self._attendre(futures))
+
+    def ajouter_document(self, nom, chunks, signature=None, sources=None):
+        return self.ajouter_documents([(nom, chunks, signature, sources)])
+
+    def ajouter_documents(self, documents):
+        """Envoie chaque document (nom, chunks, signature, sources) à sa partition, qui le vectorise."""
+        self._verifier_modifiable()
+        groupes = {}
+        for document in documents:
+            groupes.setdefault(partition_du_document(document[0], len(self.clients)), []).append(document)
+        nb = self._modifier(groupes, "ajouter_documents")
+        for nom, _, signature, _ in documents:
+            self.documents[nom] = dict(signature or {})
+        return nb
+
+    def retirer_documents(self, noms):
+        self._verifier_modifiable()
+        groupes = {}
+        for nom in set(noms):
+            groupes.setdefault(partition_du_document(nom, len(self.clients)), []).append(nom)
+            self.documents.pop(nom, None)
+        return self._modifier(groupes, "retirer_documents")
+
+    def compacter(self):
+        self._verifier_modifiable()
+        self._modifie = True
+        # les chunks retirés ne comptent plus dans les fréquences : poids recalculés à la publication
+        self._publie["recalcul"] = True
+        return sum(self._attendre([client.appeler("modifier", "compacter") for client in self.clients]))
+
+    def proportion_supprimes(self):
+        return self.nb_supprimes / self.nb_chunks if self.nb_chunks else 0.0
+
+    document_inchange = IndexIncremental.document_inchange
+
+    @property
+    def chunks(self):
+        """Les textes des chunks restent dans les partitions : le coordinateur n'en a pas de séquence."""
+        raise RuntimeError("Index réparti : les textes des chunks sont dans les partitions, "
+                           "ils ne sont lus qu'avec les passages trouvés (voir passages).")
+
+    def matrice(self):
+        """Chaque partition a sa propre matrice TF-IDF : le coordinateur n'en a pas."""
+        raise RuntimeError("Index réparti : la matrice TF-IDF est partagée entre les partitions, "
+                           "le coordinateur n'en a pas (voir statistiques pour sa taille).")
+
+    def passages(self, textes, k=1, seuil=0.0, mode="tfidf"):
+        """
+        Recherche sur toutes les partitions à la fois : chacune retourne ses k meilleurs passages,
+        et les k meilleurs de l'ensemble sont gardés. Une partition qui n'a pas répondu dans
+        config.SHARD_TIMEOUT_MS millisecondes est ignorée (et comptée dans hors_delai).
+        L'indice d'un chunk est son indice dans sa partition * nombre de partitions + numéro de la partition.
+        """
+        textes = list(textes)
+        futures = self._diffuser("passages", textes, k, seuil, mode)
+        limite = time.monotonic() + config.SHARD_TIMEOUT_MS / 1000
+        nb = len(self.clients)
+        fusion = [[] for _ in textes]
+        for numero, future in enumerate(futures):
+            try:
+                resultats = future.result(timeout=max(0.0, limite - time.monotonic()))
+            except DelaiDepasse:
+                self._compter(self.hors_delai, numero)
+                continue
+            except (ConnectionError, RuntimeError) as e:
+                print(f"Partition {numero} ignorée : {e}")
+                self._compter(self.erreurs, numero)
+                continue
+            for trouves, passages in zip(resultats, fusion):
+                passages.extend((i * nb + numero, score, *reste) for i, score, *reste in trouves)
+        # score décroissant, puis indice croissant à score égal (comme indexation.meilleurs_scores)
+        return [sorted(passages, key=lambda passage: (-passage[1], passage[0]))[:k] for passages in fusion]
+
+    def rechercher(self, textes, k=1, seuil=0.0, mode="tfidf"):
+        """Comme IndexIncremental.rechercher : (indice du chunk, score) des k meilleurs de chaque texte."""
+        return [[(i, score) for i, score, *_ in trouves] for trouves in self.passages(textes, k, seuil, mode)]
+
+    def actualiser(self):
+        """
+        Lecture seule : nouveau coordinateur reflétant l'état courant des partitions (publié par un autre
+        coordinateur), ou None si aucune partition n'a changé.
+        """
+        etats = self._attendre(self._diffuser("etat"), config.SHARD_TIMEOUT_MS / 1000)
+        if [(etat["version"], etat["generation"]) for etat in etats] == self._versions:
+            return None
+        index = IndexReparti.__new__(IndexReparti)
+        index.__dict__.update(self.__dict__)
+        index._relire(etats)
+        index.version = self.version + 1
+        return index
+
+    def statistiques(self):
+        """Statistiques additionnées des partitions qui ont répondu dans le délai."""
+        futures = self._diffuser("statistiques")
+        limite = time.monotonic() + config.SHARD_TIMEOUT_MS / 1000
+        par_partition = []
+        for future in futures:
+            try:
+                par_partition.append(future.result(timeout=max(0.0, limite - time.monotonic())))
+            except (DelaiDepasse, ConnectionError, RuntimeError):
+                pass
+        resultat = {cle: sum(stats[cle] for stats in par_partition)
+                    for cle in ("chunks", "chunks_supprimes", "documents", "nnz", "octets", "vecteurs_denses",
+                                "octets_denses", "octets_bm25", "octets_chunks")}
+        resultat.update(
+            termes=self.nb_termes or max((stats["termes"] for stats in par_partition), default=0),
+            idf_a_jour=all(stats["idf_a_jour"] for stats in par_partition),
+            partitions=len(self.clients),
+            partitions_repondu=len(par_partition),
+            partitions_hors_delai=sum(self.hors_delai),
+        )
+        return resultat
+
+    def sauvegarder(self, dossier=None):
+        """Chaque partition écrit son instantané dans son propre dossier (dossier n'est pas utilisé)."""
+        self._verifier_ecriture()
+        generations = self._attendre(self._diffuser("sauvegarder"))
+        self.generation = "+".join(str(generation) for generation in generations)
+        return self.generation
+
+    def fermer(self):
+        """Ferme les connexions et arrête les processus de partition démarrés par ce coordinateur."""
+        for client in self.clients:
+            client.fermer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sert une partition de l'index réparti (voir SHARD_ADDRESSES dans config.py).")
+    parser.add_argument("--adresse", required=True, help="hôte:port d'écoute, par exemple 0.0.0.0:7001")
+    parser.add_argument("--dossier", help="dossier de l'instantané de la partition (chargé au démarrage, écrit à chaque sauvegarde)")
+    args = parser.parse_args()
+    if not config.SHARD_AUTHKEY:
+        parser.error("la variable d'environnement SHARD_AUTHKEY doit être définie")
+    print(f"Partition servie sur {args.adresse}")
+    servir_partition(adresse_reseau(args.adresse), config.SHARD_AUTHKEY.encode("utf-8"), args.dossier)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,4 +14,7 @@ else
 fi
 
 # Lancer le serveur sur toutes les interfaces (accessible depuis le réseau)
+# Pour plusieurs workers partageant un seul index en mémoire (voir constructeur_index.py) :
+#   python constructeur_index.py &
+#   INDEX_ROLE=lecteur uvicorn fastapi_main:app --host 0.0.0.0 --port 8000 --workers 4
 uvicorn fastapi_main:app --host 0.0.0.0 --port 8000 --reload
@@ -0,0 +1,187 @@
+"""
+Compteurs de statistiques des questions, tenus en mémoire.
+
+Les incréments ne touchent pas le disque : un thread d'arrière-plan écrit
+stats.json après flush_toutes incréments ou intervalle_flush secondes, en
+passant par un fichier temporaire renommé atomiquement (le fichier n'est
+jamais lu à moitié écrit). Les lectures (top N, comptes par fenêtre de temps)
+sont servies directement depuis la mémoire.
+
+Plusieurs workers peuvent partager stats.json : chacun n'écrit que ses
+incréments depuis sa dernière écriture, ajoutés au contenu du fichier relu sous
+un verrou exclusif (stats.json.lock) ; ses totaux en mémoire sont alors remis à
+jour avec ceux des autres workers. Si le fichier ne peut pas être lu, les
+incréments sont gardés pour l'écriture suivante (le fichier n'est jamais remplacé
+par les seuls incréments) ; un fichier corrompu est mis de côté (stats.json.corrompu).
+"""
+
+import atexit
+import heapq
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+
+class CompteurStatistiques:
+    def __init__(self, chemin, flush_toutes=50, intervalle_flush=5.0, granularite_s=60, retention_s=24 * 3600):
+        self.chemin = chemin
+        self.flush_toutes = flush_toutes
+        self.intervalle_flush = intervalle_flush
+        self.granularite_s = granularite_s
+        self.retention_s = retention_s
+        # total par question depuis le début (format historique de stats.json : {question: nombre})
+        self.totaux = self._charger()
+        # incréments pas encore écrits dans le fichier
+        self._delta = Counter()
+        # compteurs par tranche de granularite_s secondes, pour les comptes par fenêtre de temps
+        self._tranches = OrderedDict()
+        self._en_attente = 0
+        self._verrou = threading.Lock()
+        self._reveil = threading.Event()
+        self._ferme = False
+        self._thread = threading.Thread(target=self._boucle, name="statistiques", daemon=True)
+        self._thread.start()
+        atexit.register(self.fermer)
+
+    def _charger(self):
+        """Compteurs du fichier au démarrage (vides s'il ne peut pas être lu : ils sont relus à chaque écriture)."""
+        try:
+            with _verrou_fichier(f"{self.chemin}.lock"):
+                return self._lire()
+        except OSError as e:
+            print(f"Statistiques illisibles ({e}), compteurs relus à la prochaine écriture.")
+            return Counter()
+
+    def _lire(self):
+        """
+        Compteurs du fichier, verrou du fichier tenu. Un fichier absent donne des compteurs vides,
+        un fichier corrompu est renommé en chemin.corrompu ; une erreur de lecture est levée (OSError).
+        """
+        try:
+            with open(self.chemin, "r", encoding="utf-8") as f:
+                return Counter(json.load(f))
+        except FileNotFoundError:
+            return Counter()
+        except (ValueError, TypeError) as e:
+            corrompu = f"{self.chemin}.corrompu"
+            os.replace(self.chemin, corrompu)
+            print(f"Statistiques illisibles ({e}), fichier mis de côté : {corrompu}")
+            return Counter()
+
+    def incrementer(self, question):
+        self.incrementer_lot([question])
+
+    def incrementer_lot(self, questions):
+        """Incrémente plusieurs questions sous une seule prise du verrou."""
+        if not questions:
+            return
+        maintenant = time.time()
+        tranche = int(maintenant // self.granularite_s) * self.granularite_s
+        with self._verrou:
+            self.totaux.update(questions)
+            self._delta.update(questions)
+            compteur = self._tranches.get(tranche)
+            if compteur is None:
+                compteur = self._tranches[tranche] = Counter()
+                self._purger(maintenant)
+            compteur.update(questions)
+            self._en_attente += len(questions)
+            if self._en_attente >= self.flush_toutes:
+                self._reveil.set()
+
+    def _purger(self, maintenant):
+        """Oublie les tranches plus anciennes que la rétention. Verrou déjà tenu."""
+        limite = maintenant - self.retention_s
+        while self._tranches and next(iter(self._tranches)) < limite:
+            self._tranches.popitem(last=False)
+
+    # --- Lecture (mémoire uniquement) ---
+
+    def top(self, n=10):
+        """Les n questions les plus posées depuis le début."""
+        with self._verrou:
+            return heapq.nlargest(n, self.totaux.items(), key=lambda item: item[1])
+
+    def fenetre(self, secondes, n=10):
+        """Nombre de questions et top n sur les dernières secondes (limité par la rétention)."""
+        debut = time.time() - secondes
+        total = Counter()
+        with self._verrou:
+            for tranche, compteur in reversed(self._tranches.items()):
+                if tranche + self.granularite_s <= debut:
+                    break
+                total.update(compteur)
+        return {"questions": sum(total.values()), "distinctes": len(total), "top": total.most_common(n)}
+
+    # --- Écriture sur disque ---
+
+    def vider(self):
+        """Ajoute immédiatement les incréments en attente aux compteurs du fichier."""
+        with self._verrou:
+            if not self._delta:
+                return
+            delta, self._delta = self._delta, Counter()
+            self._en_attente = 0
+        temporaire = f"{self.chemin}.{os.getpid()}.tmp"
+        try:
+            with _verrou_fichier(f"{self.chemin}.lock"):
+                donnees = self._lire()
+                donnees.update(delta)
+                with open(temporaire, "w", encoding="utf-8") as f:
+                    json.dump(dict(donnees), f, ensure_ascii=False, indent=4)
+                os.replace(temporaire, self.chemin)
+        except OSError as e:
+            # fichier illisible ou non écrit : les incréments sont gardés pour l'écriture suivante
+            print(f"Erreur lors de l'écriture des statistiques: {e}")
+            with self._verrou:
+                delta.update(self._delta)
+                self._delta = delta
+            return
+        with self._verrou:
+            # totaux de tous les workers, plus les incréments arrivés pendant l'écriture ;
+            # mis à jour sur place (chatbotcol.Chatbot.statistiques_questions est le même objet)
+            donnees.update(self._delta)
+            self.totaux.clear()
+            self.totaux.update(donnees)
+
+    def _boucle(self):
+        while not self._ferme:
+            self._reveil.wait(self.intervalle_flush)
+            self._reveil.clear()
+            self.vider()
+
+    def fermer(self):
+        if self._ferme:
+            return
+        self._ferme = True
+        self._reveil.set()
+        self._thread.join(timeout=10)
+        self.vider()
+
+
+@contextmanager
+def _verrou_fichier(chemin):
+    """Verrou exclusif entre processus, tenu sur le fichier chemin (créé au besoin)."""
+    with open(chemin, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
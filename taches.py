@@ -0,0 +1,78 @@
+"""
+File de tâches d'arrière-plan (indexation des documents uploadés).
+
+Les tâches sont exécutées une par une par un thread dédié, hors de la boucle
+d'événements de l'API : une requête peut donc soumettre une tâche longue et
+répondre immédiatement avec son identifiant. Le statut de chaque tâche
+(en_attente, en_cours, termine, erreur) est gardé en mémoire ; seules les
+nb_historique dernières tâches terminées sont conservées.
+"""
+
+import datetime
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class FileTaches:
+    def __init__(self, nb_historique=1000):
+        self.nb_historique = nb_historique
+        # identifiant -> statut de la tâche, de la plus ancienne à la plus récente
+        self._taches = OrderedDict()
+        self._file = queue.Queue()
+        self._verrou = threading.Lock()
+        self._thread = threading.Thread(target=self._boucle, name="taches", daemon=True)
+        self._thread.start()
+
+    def soumettre(self, fonction, *args, description=None):
+        """Met fonction(*args) en file d'attente et retourne l'identifiant de la tâche."""
+        identifiant = uuid.uuid4().hex
+        with self._verrou:
+            self._taches[identifiant] = {
+                "id": identifiant,
+                "statut": "en_attente",
+                "description": description,
+                "cree": self._maintenant(),
+                "debut": None,
+                "fin": None,
+                "resultat": None,
+                "erreur": None,
+            }
+        self._file.put((identifiant, fonction, args))
+        return identifiant
+
+    def statut(self, identifiant):
+        """Copie du statut de la tâche, ou None si elle est inconnue (ou trop ancienne)."""
+        with self._verrou:
+            tache = self._taches.get(identifiant)
+            return dict(tache) if tache is not None else None
+
+    def en_attente(self):
+        return self._file.qsize()
+
+    def _maintenant(self):
+        return datetime.datetime.now().isoformat()
+
+    def _mettre_a_jour(self, identifiant, **valeurs):
+        with self._verrou:
+            self._taches[identifiant].update(valeurs)
+
+    def _boucle(self):
+        while True:
+            identifiant, fonction, args = self._file.get()
+            self._mettre_a_jour(identifiant, statut="en_cours", debut=self._maintenant())
+            try:
+                resultat = fonction(*args)
+            except Exception as e:
+                self._mettre_a_jour(identifiant, statut="erreur", erreur=str(e), fin=self._maintenant())
+            else:
+                self._mettre_a_jour(identifiant, statut="termine", resultat=resultat, fin=self._maintenant())
+            self._purger()
+
+    def _purger(self):
+        """Oublie les tâches terminées les plus anciennes au-delà de nb_historique."""
+        with self._verrou:
+            terminees = [i for i, t in self._taches.items() if t["statut"] in ("termine", "erreur")]
+            for identifiant in terminees[:max(0, len(terminees) - self.nb_historique)]:
+                del self._taches[identifiant]
@@ -0,0 +1,61 @@
+"""
+Configuration commune des tests : modules de la racine du projet et corpus synthétique
+des benchmarks importables, fichiers du chatbot (documents, index, caches, journal,
+statistiques) redirigés vers un dossier temporaire propre à chaque test.
+"""
+
+import os
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for chemin in (RACINE, os.path.join(RACINE, "benchmarks")):
+    if chemin not in sys.path:
+        sys.path.insert(0, chemin)
+
+import config # noqa: E402
+
+
+@pytest.fixture
+def configuration(tmp_path, monkeypatch):
+    """Chemins de config.py dans tmp_path, ingestion dans le processus, sans cache de réponses ni partitions."""
+    valeurs = {
+        "DATA_DIR": str(tmp_path / "data"),
+        "STATS_FILE": str(tmp_path / "stats.json"),
+        "HISTORY_FILE": str(tmp_path / "historique.jsonl"),
+        "LEGACY_HISTORY_FILES": [],
+        "INDEX_DIR": str(tmp_path / "index"),
+        "EXTRACTION_CACHE_DIR": str(tmp_path / "cache" / "extraction"),
+        "INGESTION_WORKERS": 1,
+        "QUERY_CACHE_SIZE": 0,
+        "PRELOAD_IMPORTS": False,
+        "RETRIEVAL_MODE": "tfidf",
+        "INDEX_ROLE": "autonome",
+        "INDEX_SHARDS": 1,
+        "SHARD_ADDRESSES": [],
+    }
+    for nom, valeur in valeurs.items():
+        monkeypatch.setattr(config, nom, valeur, raising=False)
+    os.makedirs(config.DATA_DIR)
+    return tmp_path
+
+
+@pytest.fixture
+def creer_chatbot(configuration):
+    """Fabrique de Chatbot sur la configuration du test ; journal, statistiques et partitions fermés à la fin."""
+    from chatbotcol import Chatbot
+
+    crees = []
+
+    def creer():
+        bot = Chatbot()
+        crees.append(bot)
+        return bot
+
+    yield creer
+    for bot in crees:
+        bot.journal.fermer()
+        bot.statistiques.fermer()
+        if hasattr(bot.index, "fermer"):
+            bot.index.fermer()
@@ -0,0 +1,80 @@
+"""Listes BM25 (bm25.py) : MaxScore comparé au score BM25 exhaustif de tous les chunks."""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from bm25 import PostingsBM25, SegmentsBM25
+from indexation import meilleurs_scores
+
+K1, B = 1.2, 0.75
+
+
+def corpus_aleatoire(nb_chunks=3000, nb_termes=400, graine=0):
+    """Comptes (chunks x termes) avec des fréquences de termes très inégales, comme du texte."""
+    rng = np.random.default_rng(graine)
+    frequences = 1.0 / np.arange(1, nb_termes + 1)
+    frequences /= frequences.sum()
+    lignes = [np.bincount(rng.choice(nb_termes, rng.integers(5, 60), p=frequences), minlength=nb_termes)
+              for _ in range(nb_chunks)]
+    return sparse.csr_matrix(np.array(lignes, dtype=np.float64))
+
+
+def bm25_exhaustif(comptes, termes, poids):
+    """Scores BM25 normalisés de tous les chunks, calculés directement par la formule."""
+    denses = comptes.toarray()
+    n = len(denses)
+    longueurs = denses.sum(axis=1)
+    df = (denses > 0).sum(axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    tf = denses[:, termes]
+    impacts = idf[termes] * tf * (K1 + 1) / (tf + K1 * (1 - B + B * longueurs[:, None] / longueurs.mean()))
+    return impacts @ poids / (poids * impacts.max(axis=0)).sum()
+
+
+def questions_aleatoires(nb_termes, nb=40, graine=1):
+    rng = np.random.default_rng(graine)
+    for _ in range(nb):
+        termes = rng.choice(nb_termes, rng.integers(1, 12), replace=False)
+        yield termes, rng.integers(1, 3, len(termes)).astype(np.float64)
+
+
+def verifier_meilleurs(postings, comptes, k, morts=None, seuil=0.0):
+    for termes, poids in questions_aleatoires(comptes.shape[1]):
+        attendus = bm25_exhaustif(comptes, termes, poids)
+        if morts is not None:
+            attendus[morts] = -1.0
+        tous = np.arange(len(attendus))
+        attendus_indices, attendus_scores = meilleurs_scores(tous, attendus, k, seuil)
+        indices, scores = meilleurs_scores(*postings.candidats(termes, poids, k, seuil, morts), k, seuil)
+        # mêmes k meilleurs scores ; chaque chunk retenu a bien ce score (à égalité près, le même ensemble)
+        assert np.allclose(scores, attendus_scores, atol=1e-5)
+        assert np.allclose(scores, attendus[indices], atol=1e-5)
+        assert morts is None or not morts[indices].any()
+        assert np.allclose(postings.scores(termes, poids, np.sort(indices)), attendus[np.sort(indices)], atol=1e-5)
+
+
+@pytest.mark.parametrize("k", [1, 10, 100])
+def test_maxscore_egal_au_bm25_exhaustif(k):
+    comptes = corpus_aleatoire()
+    verifier_meilleurs(PostingsBM25.construire(comptes, K1, B), comptes, k)
+
+
+def test_maxscore_avec_seuil_et_chunks_supprimes():
+    comptes = corpus_aleatoire(graine=2)
+    postings = PostingsBM25.construire(comptes, K1, B)
+    morts = np.random.default_rng(3).random(comptes.shape[0]) < 0.3
+    verifier_meilleurs(postings, comptes, 10, morts)
+    verifier_meilleurs(postings, comptes, 10, morts, seuil=0.2)
+
+
+def test_segments_egaux_aux_listes_d_un_seul_tenant():
+    comptes = corpus_aleatoire(graine=4)
+    n = comptes.shape[0]
+    longueurs = np.asarray(comptes.sum(axis=1)).ravel()
+    globales = (np.diff(comptes.tocsc().indptr), n, longueurs.mean())
+    bornes = [0, 1700, 2600, n]
+    segments = SegmentsBM25([PostingsBM25.construire(comptes[debut:fin], K1, B, globales)
+                             for debut, fin in zip(bornes, bornes[1:])], bornes[:-1])
+    morts = np.random.default_rng(5).random(n) < 0.2
+    verifier_meilleurs(segments, comptes, 10, morts)
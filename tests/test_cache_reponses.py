@@ -0,0 +1,100 @@
+"""Cache des réponses (cache_reponses.py) : durée de vie, éviction LRU, invalidation par génération."""
+
+import os
+
+import config
+import cache_reponses
+from cache_reponses import CacheReponses
+
+
+class Horloge:
+    """time.monotonic de test, avancée à la main."""
+
+    def __init__(self):
+        self.maintenant = 1000.0
+
+    def __call__(self):
+        return self.maintenant
+
+
+def test_expiration_apres_la_duree_de_vie(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(cache_reponses.time, "monotonic", horloge)
+    cache = CacheReponses(10, 60)
+    assert cache.lire("q", 1) is None
+    cache.ecrire("q", 1, "r")
+    horloge.maintenant += 59
+    assert cache.lire("q", 1) == "r"
+    horloge.maintenant += 2
+    assert cache.lire("q", 1) is None
+    assert (cache.hits, cache.misses, cache.expirations) == (1, 2, 1)
+
+
+def test_eviction_de_la_moins_recemment_utilisee():
+    cache = CacheReponses(2, 60)
+    cache.lire("a", 1)
+    cache.ecrire("a", 1, "ra")
+    cache.ecrire("b", 1, "rb")
+    # "a" relue : "b" devient la moins récemment utilisée
+    assert cache.lire("a", 1) == "ra"
+    cache.ecrire("c", 1, "rc")
+    assert cache.evictions == 1
+    assert cache.lire("b", 1) is None
+    assert (cache.lire("a", 1), cache.lire("c", 1)) == ("ra", "rc")
+
+
+def test_changement_de_generation():
+    cache = CacheReponses(10, 60)
+    cache.lire("q", 1)
+    cache.ecrire("q", 1, "ancienne")
+    assert cache.lire("q", 2) is None and cache.invalidations == 1
+    # réponse calculée sur la génération précédente : pas enregistrée
+    cache.ecrire("q", 1, "ancienne")
+    assert cache.lire("q", 2) is None
+    cache.ecrire("q", 2, "nouvelle")
+    assert cache.lire("q", 2) == "nouvelle"
+
+
+QUESTION = "Que couvre le zorglub cryogénique ?"
+CONTENU = "Le zorglub cryogénique couvre les prêts des PME exportatrices."
+
+
+def reponse(bot):
+    return bot.repondre(QUESTION, k=1, seuil=0.0)["reponse"]
+
+
+def test_cache_vide_quand_l_index_change(creer_chatbot, monkeypatch):
+    monkeypatch.setattr(config, "QUERY_CACHE_SIZE", 100)
+    bot = creer_chatbot()
+    assert "zorglub" not in reponse(bot)
+    assert "zorglub" not in reponse(bot) and bot.cache_reponses.hits == 1
+
+    bot.ajouter_contenu(CONTENU, source="zorglub.txt")
+    assert "zorglub" in reponse(bot)
+    assert "zorglub" in reponse(bot) and bot.cache_reponses.hits == 2
+
+    with open(os.path.join(config.DATA_DIR, "zorglub.txt"), "w", encoding="utf-8") as f:
+        f.write(CONTENU)
+    assert bot.supprimer_document("zorglub.txt") > 0
+    assert "zorglub" not in reponse(bot)
+    assert bot.cache_reponses.invalidations == 2
+
+
+def test_cache_du_lecteur_vide_au_rechargement_de_l_index(creer_chatbot, monkeypatch):
+    monkeypatch.setattr(config, "QUERY_CACHE_SIZE", 100)
+    monkeypatch.setattr(config, "INDEX_RELOAD_INTERVAL", 0.0)
+    constructeur = creer_chatbot()
+    constructeur.sauvegarder_index()
+    monkeypatch.setattr(config, "INDEX_ROLE", "lecteur")
+    lecteur = creer_chatbot()
+    assert "zorglub" not in reponse(lecteur)
+    assert "zorglub" not in reponse(lecteur) and lecteur.cache_reponses.hits == 1
+
+    # nouvelle génération publiée par le constructeur : rechargée avant la lecture du cache
+    constructeur.ajouter_contenu(CONTENU, source="zorglub.txt")
+    constructeur.sauvegarder_index()
+    assert "zorglub" in reponse(lecteur)
+    # et la réponse est rangée sous la génération rechargée
+    assert "zorglub" in reponse(lecteur) and lecteur.cache_reponses.hits == 2
+    assert "zorglub" in lecteur.repondre_batch([QUESTION], k=1, seuil=0.0)[0]["reponse"]
+    assert lecteur.cache_reponses.hits == 3
@@ -0,0 +1,87 @@
+"""Tests du Chatbot sur des documents réels : suppression, compactage et instantané de l'index."""
+
+import os
+
+import pytest
+from corpus_synthetique import corpus
+
+import config
+
+
+def ecrire_documents(nb):
+    noms = []
+    for nom, texte in corpus(nb, nb_phrases=20):
+        with open(os.path.join(config.DATA_DIR, f"{nom}.txt"), "w", encoding="utf-8") as f:
+            f.write(texte)
+        noms.append(f"{nom}.txt")
+    return noms
+
+
+def test_suppression_de_tous_les_documents(creer_chatbot):
+    nom, = ecrire_documents(1)
+    bot = creer_chatbot()
+    assert len(bot.index) > 0 and nom in bot.index.documents
+
+    assert bot.supprimer_document(nom) > 0
+    # tous les chunks sont supprimés : le compactage en arrière-plan vide l'index et le sauvegarde
+    bot._compactage.join(timeout=30)
+    assert len(bot.index) == 0 and bot.index.nb_supprimes == 0
+    assert bot.rechercher_passages("garantie", k=3) == []
+
+    relu = creer_chatbot()
+    assert len(relu.index) == 0 and relu.index.nb_supprimes == 0 and not relu.index.documents
+    assert relu.rechercher_passages("garantie", k=3) == []
+
+
+def test_partitions_dont_une_vide(creer_chatbot, monkeypatch):
+    monkeypatch.setattr(config, "INDEX_SHARDS", 2)
+    nom, = ecrire_documents(1)
+    bot = creer_chatbot()
+    # le seul document est dans une partition, l'autre est vide : elles sont publiées et sauvegardées toutes les deux
+    assert len(bot.index) > 0 and list(bot.index.documents) == [nom]
+    etats = [client.appeler("etat").result(timeout=30) for client in bot.index.clients]
+    assert sorted(etat["chunks"] > 0 for etat in etats) == [False, True]
+    assert all(etat["generation"] is not None for etat in etats)
+    assert bot.rechercher_passages("garantie", k=3, seuil=0.0)
+    with pytest.raises(RuntimeError, match="Index réparti"):
+        bot.doc_chunks
+    with pytest.raises(RuntimeError, match="Index réparti"):
+        bot.doc_matrix
+    bot.index.fermer()
+
+    relu = creer_chatbot()
+    assert len(relu.index) == len(bot.index) and list(relu.index.documents) == [nom]
+
+
+def test_echec_de_sauvegarde_affiche(creer_chatbot, monkeypatch, capsys):
+    premier, second = ecrire_documents(2)
+    bot = creer_chatbot()
+
+    def echec(index, dossier):
+        raise ValueError("sauvegarde impossible")
+
+    monkeypatch.setattr(type(bot.index), "sauvegarder", echec)
+    # la suppression est publiée même si l'instantané ne peut pas être écrit
+    assert bot.supprimer_document(premier) > 0
+    assert list(bot.index.documents) == [second]
+    assert "sauvegarde impossible" in capsys.readouterr().out
+
+
+def test_etapes_mesurees_pour_un_lot(creer_chatbot):
+    from metriques import DUREE_ETAPE
+
+    ecrire_documents(2)
+    bot = creer_chatbot()
+
+    def nombres():
+        return {etiquettes[0]: serie[2] for etiquettes, serie in DUREE_ETAPE._series.items()}
+
+    avant = nombres()
+    questions = ["Quelle garantie pour les PME ?", "Comment fonctionne le fonds de garantie ?", "Bonjour"]
+    bot.repondre_batch(questions, k=2)
+    apres = nombres()
+    ajoutes = {etape: apres[etape] - avant.get(etape, 0) for etape in apres}
+    # chaque question du lot compte une fois dans chaque étape qu'elle a traversée
+    for etape in ("nettoyage", "cache", "intentions", "persistance", "total"):
+        assert ajoutes[etape] == len(questions)
+    assert 1 <= ajoutes["documents"] <= len(questions)
@@ -0,0 +1,60 @@
+"""
+Tests du découpage au fil de la lecture (decoupage.py) : mêmes chunks que l'ancien
+découpage de la chaîne entière (Chatbot.decouper_chunks avant le découpage par segments),
+quelle que soit la coupure du texte en segments.
+"""
+
+import random
+import re
+
+import pytest
+
+from corpus_synthetique import corpus
+
+from chatbotcol import decouper_chunks
+from decoupage import decouper_segments
+
+
+def ancien_decouper_chunks(text, taille_fenetre):
+    """Ancienne méthode Chatbot.decouper_chunks, recopiée telle quelle comme référence."""
+    phrases = re.split(r'(?<=[.!?])\s+', text)
+    chunks = []
+    for i in range(0, len(phrases), taille_fenetre):
+        chunk = ' '.join(phrases[i:i+taille_fenetre])
+        if chunk.strip():
+            chunks.append(chunk)
+    return chunks
+
+
+def textes():
+    """Textes du corpus synthétique, et cas limites de ponctuation et d'espaces."""
+    rng = random.Random(5)
+    morceaux = ["Phrase", "un", "deux", ".", "!", "?", "...", " ", "  ", "\n", "\n\n", "\t", "é", "«", "»", "3.5"]
+    yield from (texte for _, texte in corpus(20, nb_phrases=25))
+    yield from ("", " ", ".", ". ", "  . !  ?", "sans ponctuation", "Fin.", "Fin.\n", "Espaces finaux.   ")
+    for _ in range(200):
+        yield "".join(rng.choice(morceaux) for _ in range(rng.randint(1, 60)))
+
+
+def segments_aleatoires(texte, rng):
+    """Coupe texte en segments de longueurs aléatoires (y compris entre une ponctuation et ses espaces)."""
+    coupures = sorted(rng.sample(range(1, len(texte)), min(len(texte) - 1, rng.randint(0, 12)))) if len(texte) > 1 else []
+    bornes = [0] + coupures + [len(texte)]
+    return [texte[debut:fin] for debut, fin in zip(bornes, bornes[1:])]
+
+
+@pytest.mark.parametrize("taille_fenetre", [1, 2, 5])
+def test_memes_chunks_que_l_ancien_decoupage(taille_fenetre):
+    rng = random.Random(taille_fenetre)
+    for texte in textes():
+        attendus = ancien_decouper_chunks(texte, taille_fenetre)
+        assert decouper_chunks(texte, taille_fenetre) == attendus, texte
+        segments = [(segment, ("page", numero)) for numero, segment in enumerate(segments_aleatoires(texte, rng), 1)]
+        decoupes = list(decouper_segments(segments, taille_fenetre))
+        assert [chunk for chunk, _ in decoupes] == attendus, texte
+        # la source délimite dans le texte les phrases du chunk
+        for chunk, source in decoupes:
+            assert " ".join(re.split(r'(?<=[.!?])\s+', texte[source["debut"]:source["fin"]])) == chunk
+            if "page" in source:
+                premiere, derniere = source["page"]
+                assert 1 <= premiere <= derniere <= len(segments)
@@ -0,0 +1,224 @@
+"""Index TF-IDF incrémental (indexation.py) : ajout, retrait, compactage, instantané sur disque."""
+
+import numpy as np
+import pytest
+
+from corpus_synthetique import corpus, questions
+
+import config
+from decoupage import decouper_segments
+from indexation import IndexIncremental
+
+
+def documents(nb, graine=42):
+    """(nom, chunks, signature, sources) de nb documents synthétiques."""
+    resultat = []
+    for nom, texte in corpus(nb, nb_phrases=30, graine=graine):
+        segments = list(decouper_segments([(texte, None)]))
+        resultat.append((nom, [chunk for chunk, _ in segments], None, [source for _, source in segments]))
+    return resultat
+
+
+def publier(index, modifier):
+    """Comme Chatbot._publier_index : modification d'une copie, puis copie figée."""
+    copie = index.copie()
+    modifier(copie)
+    return copie.figer()
+
+
+def scores(index, qs, k=5, mode="tfidf"):
+    return [[(index.chunks[i], round(score, 9)) for i, score in trouves] for trouves in index.rechercher(qs, k, 0.0, mode)]
+
+
+def test_ajouts_successifs_egaux_a_un_ajout_unique(monkeypatch):
+    # poids recalculés à chaque ajout
+    monkeypatch.setattr(config, "IDF_REFRESH_DRIFT", 0.0)
+    docs = documents(30)
+    index = IndexIncremental().figer()
+    for doc in docs:
+        index = publier(index, lambda copie: copie.ajouter_documents([doc]))
+    ensemble = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs))
+    qs = questions(40)
+    assert len(index) == len(ensemble) == sum(len(doc[1]) for doc in docs)
+    assert scores(index, qs) == scores(ensemble, qs)
+
+
+@pytest.mark.parametrize("mode", ["tfidf", "bm25"])
+def test_segments_ponderes_avec_les_poids_du_dernier_calcul(monkeypatch, mode):
+    """
+    Sous le seuil de dérive, les chunks ajoutés forment des segments pondérés avec les poids du
+    dernier calcul complet : mêmes scores qu'un index reconstruit avec ces statistiques.
+    """
+    monkeypatch.setattr(config, "IDF_REFRESH_DRIFT", 10.0)
+    docs = documents(30)
+    qs = questions(40)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:10]))
+    df, nb, longueur = index.statistiques_locales()
+    figees = (df.copy(), nb, longueur / nb)
+    for doc in docs[10:]:
+        index = publier(index, lambda copie: copie.ajouter_documents([doc]))
+        index.rechercher(qs[:1], 1, 0.0, mode)
+    index = publier(index, lambda copie: copie.retirer_documents([docs[3][0], docs[20][0]]))
+    segments = index.statistiques()["segments"]
+    assert 1 < segments <= np.log2(len(index)) + 1
+    assert not index.statistiques()["idf_a_jour"]
+
+    def reconstruire(copie):
+        copie.ajouter_documents(docs)
+        copie.retirer_documents([docs[3][0], docs[20][0]])
+        copie.fixer_statistiques(*figees)
+
+    reference = publier(IndexIncremental(), reconstruire)
+    assert scores(index, qs, mode=mode) == scores(reference, qs, mode=mode)
+    hybride = index.rechercher_hybride(qs, 5, 0.0, ["tfidf", "bm25"])
+    attendu = reference.rechercher_hybride(qs, 5, 0.0, ["tfidf", "bm25"])
+    assert [[i for i, _ in trouves] for trouves in hybride] == [[i for i, _ in trouves] for trouves in attendu]
+    assert np.allclose([v for trouves in hybride for _, v in trouves], [v for trouves in attendu for _, v in trouves])
+
+
+def test_recalcul_au_dela_du_seuil_de_derive(monkeypatch):
+    monkeypatch.setattr(config, "IDF_REFRESH_DRIFT", 0.5)
+    docs = documents(30)
+    qs = questions(40)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:10]))
+    calcul = len(index)
+    for nb, doc in enumerate(docs[10:], 11):
+        index = publier(index, lambda copie: copie.ajouter_documents([doc]))
+        if len(index) - calcul > 0.5 * calcul:
+            break
+        assert not index.statistiques()["idf_a_jour"]
+    # plus de la moitié de chunks en plus depuis le dernier calcul : recalcul complet, comme un index reconstruit
+    assert index.statistiques()["segments"] == 1 and index.statistiques()["idf_a_jour"]
+    ensemble = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:nb]))
+    assert scores(index, qs) == scores(ensemble, qs)
+    # même chose quand le dernier calcul est trop ancien
+    monkeypatch.setattr(config, "IDF_REFRESH_INTERVAL", 0.0)
+    index = publier(index, lambda copie: copie.ajouter_documents([docs[nb]]))
+    assert index.statistiques()["idf_a_jour"]
+
+
+def test_poids_de_tfidfvectorizer():
+    """
+    Mêmes poids qu'un TfidfVectorizer ré-entraîné sur tous les chunks. Ses termes sont les
+    colonnes de hachage de l'index (répétées autant de fois que le terme apparaît), pour
+    que les collisions de hachage soient les mêmes des deux côtés.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    docs = documents(20)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs))
+
+    def colonnes(texte):
+        ligne = index.vectorizer.transform([texte])
+        return [str(colonne) for colonne, nb in zip(ligne.indices, ligne.data) for _ in range(int(nb))]
+
+    chunks = [chunk for doc in docs for chunk in doc[1]]
+    vectoriseur = TfidfVectorizer(analyzer=colonnes)
+    matrice = vectoriseur.fit_transform(chunks)
+    # questions faites de mots des chunks : TfidfVectorizer ignore les termes absents de son vocabulaire
+    qs = [" ".join(chunk.split()[:6]) for chunk in chunks[::10]]
+    assert np.allclose((matrice @ matrice.T).toarray(), (index.matrice() @ index.matrice().T).toarray())
+    assert np.allclose((vectoriseur.transform(qs) @ matrice.T).toarray(),
+                       (index.transformer(qs) @ index.matrice().T).toarray())
+
+
+def test_index_fige_non_modifiable():
+    docs = documents(3)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:2]))
+    with pytest.raises(RuntimeError):
+        index.ajouter_documents(docs[2:])
+    copie = index.copie()
+    copie.ajouter_documents(docs[2:])
+    assert len(index) == sum(len(doc[1]) for doc in docs[:2])
+    assert set(index.documents) == {docs[0][0], docs[1][0]}
+
+
+def test_retrait_puis_compactage():
+    docs = documents(25)
+    retires = {docs[3][0], docs[10][0]}
+    qs = questions(40)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs))
+    index = publier(index, lambda copie: copie.retirer_documents(retires))
+    assert index.nb_supprimes == sum(len(doc[1]) for doc in docs if doc[0] in retires)
+    assert retires.isdisjoint(index.documents)
+    for trouves in index.passages(qs, 10):
+        assert retires.isdisjoint(document for _, _, _, document, _ in trouves)
+
+    compacte = publier(index, lambda copie: copie.compacter())
+    reference = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(
+        [doc for doc in docs if doc[0] not in retires]))
+    assert compacte.nb_supprimes == 0
+    assert len(compacte) == len(reference)
+    assert compacte.plages == reference.plages
+    assert scores(compacte, qs) == scores(reference, qs)
+
+
+def test_remplacement_d_un_document():
+    docs = documents(5)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs))
+    nom = docs[1][0]
+    index = publier(index, lambda copie: copie.ajouter_document(nom, ["Le fonds de garantie couvre les PME."]))
+    debut, fin = index.plages[nom]
+    assert fin - debut == 1
+    assert index.chunks[debut] == "Le fonds de garantie couvre les PME."
+    assert index.passages(["fonds de garantie"], 1)[0][0][3] == nom
+
+
+@pytest.mark.parametrize("mode", ["tfidf", "bm25"])
+def test_sauvegarde_et_rechargement(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(config, "IDF_REFRESH_DRIFT", 10.0)
+    docs = documents(20)
+    qs = questions(30)
+    # plusieurs segments, assemblés dans l'instantané
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:12]))
+    for doc in docs[12:]:
+        index = publier(index, lambda copie: copie.ajouter_documents([doc]))
+    index = publier(index, lambda copie: copie.retirer_documents([docs[4][0]]))
+    index.rechercher(qs[:1], 1, 0.0, mode)
+    index.sauvegarder(str(tmp_path))
+    recharge = IndexIncremental.charger(str(tmp_path))
+    assert recharge is not None
+    assert len(recharge) == len(index)
+    assert recharge.nb_supprimes == index.nb_supprimes
+    assert recharge.documents.keys() == index.documents.keys()
+    assert recharge.plages == index.plages
+    assert scores(recharge.figer(), qs, mode=mode) == scores(index, qs, mode=mode)
+    assert [recharge.chunks.source(i) for i in range(len(recharge))] == \
+        [index.chunks.source(i) for i in range(len(index))]
+    # les ajouts suivants gardent les poids du dernier calcul complet
+    suivant = documents(2, graine=3)
+    assert scores(publier(recharge, lambda copie: copie.ajouter_documents(suivant)), qs, mode=mode) == \
+        scores(publier(index, lambda copie: copie.ajouter_documents(suivant)), qs, mode=mode)
+
+
+@pytest.mark.parametrize("mode", ["tfidf", "bm25"])
+def test_index_vide(tmp_path, mode):
+    qs = questions(3)
+    docs = documents(3)
+    vide = IndexIncremental().figer()
+    # tous les documents retirés puis compactés : l'index redevient vide
+    compacte = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs))
+    compacte = publier(compacte, lambda copie: copie.retirer_documents([nom for nom, *_ in docs]))
+    compacte = publier(compacte, lambda copie: copie.compacter())
+    for numero, index in enumerate((vide, compacte)):
+        assert len(index) == 0
+        assert index.rechercher(qs, 3, 0.0, mode) == [[], [], []]
+        dossier = str(tmp_path / str(numero))
+        index.sauvegarder(dossier)
+        recharge = IndexIncremental.charger(dossier)
+        assert recharge is not None and len(recharge) == 0 and not recharge.documents
+        assert recharge.figer().rechercher(qs, 3, 0.0, mode) == [[], [], []]
+        # l'index rechargé reste utilisable
+        recharge = publier(recharge, lambda copie: copie.ajouter_documents(docs[:1]))
+        attendu = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:1]))
+        assert scores(recharge, qs, mode=mode) == scores(attendu, qs, mode=mode)
+
+
+def test_instantane_absent_ou_incompatible(tmp_path, monkeypatch):
+    import config
+
+    assert IndexIncremental.charger(str(tmp_path)) is None
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(documents(2)))
+    index.sauvegarder(str(tmp_path))
+    monkeypatch.setattr(config, "CHUNK_SIZE", config.CHUNK_SIZE + 1)
+    assert IndexIncremental.charger(str(tmp_path)) is None
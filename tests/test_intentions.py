@@ -0,0 +1,34 @@
+"""Tests de la détection des intentions (intentions.py) avec la base de connaissances data.json."""
+
+import pytest
+
+import config
+from chatbotcol import Chatbot
+
+
+@pytest.fixture(scope="module")
+def chatbot():
+    """Chatbot réduit à la base de connaissances (sans documents, journal ni index)."""
+    bot = Chatbot.__new__(Chatbot)
+    bot.generation_base = 0
+    bot.recharger_base()
+    return bot
+
+
+@pytest.mark.parametrize("question, attendue", [
+    ("aide", "aide"),
+    ("Aide moi !", "aide"),
+    ("Bonjour", "saluer"),
+    ("bonjour, quelle est la procédure ?", "saluer"),
+    ("merci pour tout", "remercier"),
+    ("quelle est la date", "heure"),
+    # questions qui contiennent une phrase d'intention sans la demander
+    ("Comment obtenir une aide financière PME", None),
+    ("Quelles aides pour plaider au tribunal ?", None),
+    ("quel est le plafond supérieur", None),
+    ("la date de dépôt du dossier", None),
+    ("le salutaire rappel de la procédure", None),
+])
+def test_intention(chatbot, question, attendue):
+    assert config.KNOWLEDGE_BASE_FILE.endswith("data.json")
+    assert chatbot._intention(chatbot.nettoyer_message(question)) == attendue
@@ -0,0 +1,48 @@
+"""Tests du journal des interactions (journal.py) : reprise de l'ancien historique JSON, arrêt."""
+
+import json
+import os
+import threading
+
+from journal import JournalInteractions
+
+
+def journal(tmp_path, **options):
+    return JournalInteractions(str(tmp_path / "historique.jsonl"), 10**6, intervalle_flush=60.0, **options)
+
+
+def test_reprise_de_l_ancien_historique(tmp_path):
+    ancien = tmp_path / "historique.json"
+    anciennes = [{"question": f"q{i}", "reponse": f"r{i}"} for i in range(3)]
+    ancien.write_text(json.dumps(anciennes, indent=4), encoding="utf-8")
+
+    j = journal(tmp_path, anciens=[str(ancien), str(ancien)])
+    j.ajouter({"question": "nouvelle", "reponse": "r"})
+    assert j.vider(timeout=5)
+    assert list(j.lire()) == anciennes + [{"question": "nouvelle", "reponse": "r"}]
+    assert not ancien.exists() and (tmp_path / "historique.json.migre").exists()
+    j.fermer()
+
+    # reprise faite une seule fois
+    j = journal(tmp_path, anciens=[str(ancien)])
+    assert len(list(j.lire())) == 4
+    j.fermer()
+
+
+def test_ancien_historique_illisible_laisse_en_place(tmp_path):
+    ancien = tmp_path / "historique.json"
+    ancien.write_text("[{tronqué", encoding="utf-8")
+    j = journal(tmp_path, anciens=[str(ancien)])
+    assert ancien.exists() and list(j.lire()) == []
+    assert [f for f in os.listdir(tmp_path) if f != "historique.json"] == []
+    j.fermer()
+
+
+def test_vider_apres_fermer(tmp_path):
+    j = journal(tmp_path)
+    j.ajouter({"question": "q"})
+    j.fermer()
+    fin = threading.Event()
+    threading.Thread(target=lambda: (j.vider(), fin.set()), daemon=True).start()
+    assert fin.wait(5)
+    assert list(j.lire()) == [{"question": "q"}]
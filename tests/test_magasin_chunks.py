@@ -0,0 +1,63 @@
+"""Stockage des chunks (magasin_chunks.py) : ajouts par segments, filtrage, instantané en mmap."""
+
+import os
+
+import numpy as np
+
+from corpus_synthetique import corpus
+
+from decoupage import decouper_segments
+from magasin_chunks import MagasinChunks
+
+
+def documents(nb):
+    """(nom, textes, sources) de nb documents synthétiques, sources avec numéros de page."""
+    resultat = []
+    for nom, texte in corpus(nb, nb_phrases=10):
+        segments = list(decouper_segments([(texte, ("page", 1))]))
+        resultat.append((nom, [chunk for chunk, _ in segments], [source for _, source in segments]))
+    return resultat
+
+
+def contenu(magasin):
+    return [(magasin[i], magasin.document(i), magasin.source(i)) for i in range(len(magasin))]
+
+
+def sauvegarder_et_relire(magasin, dossier):
+    for nom, tableau in magasin.tableaux().items():
+        np.save(os.path.join(dossier, f"{nom}.npy"), tableau)
+    return MagasinChunks.depuis_tableaux(
+        magasin.description(), lambda nom: np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode="r"))
+
+
+def test_ajouts_successifs_egaux_a_un_ajout_unique():
+    docs = documents(60)
+    magasin = MagasinChunks()
+    for doc in docs:
+        magasin = magasin.ajouter([doc])
+    ensemble = MagasinChunks().ajouter(docs)
+    assert contenu(magasin) == contenu(ensemble)
+    assert np.array_equal(magasin.longueurs(), ensemble.longueurs())
+    # un décalage de fin de plus par segment
+    assert magasin.octets() - ensemble.octets() == 8 * (len(magasin.segments) - 1)
+    for nom, tableau in ensemble.tableaux().items():
+        assert np.array_equal(magasin.tableaux()[nom], tableau)
+    # segments fusionnés par tailles comparables
+    assert len(magasin.segments) <= 2 * np.log2(len(docs))
+
+    garder = np.arange(len(magasin)) % 3 != 0
+    assert contenu(magasin.filtrer(garder)) == contenu(ensemble.filtrer(garder))
+
+
+def test_ajout_sans_recopie_de_l_instantane(tmp_path):
+    docs = documents(40)
+    relu = sauvegarder_et_relire(MagasinChunks().ajouter(docs[:20]), tmp_path)
+    base = relu.segments[0].texte
+    magasin = relu
+    for doc in docs[20:]:
+        magasin = magasin.ajouter([doc])
+    # les textes de l'instantané restent le tableau en mmap, les ajouts sont dans d'autres segments
+    assert magasin.segments[0].texte is base
+    assert not any(np.shares_memory(base, segment.texte) for segment in magasin.segments[1:])
+    assert contenu(magasin) == contenu(MagasinChunks().ajouter(docs))
+    assert contenu(sauvegarder_et_relire(magasin, tmp_path)) == contenu(magasin)
@@ -0,0 +1,119 @@
+"""Recherche dense (recherche_dense.py) : quantification int8, segments, index IVF, chunks supprimés."""
+
+import os
+
+import numpy as np
+import pytest
+
+from corpus_synthetique import questions
+
+import config
+from indexation import IndexIncremental, meilleurs_scores
+from recherche_dense import VecteursDenses, normaliser_lignes, quantifier
+from test_indexation import documents, publier
+
+
+def vecteurs_groupes(nb, dimension=64, nb_centres=40, graine=0):
+    """Vecteurs normalisés regroupés autour de nb_centres centres, comme de vrais embeddings."""
+    rng = np.random.default_rng(graine)
+    centres = rng.standard_normal((nb_centres, dimension)).astype(np.float32)
+    vecteurs = centres[rng.integers(0, nb_centres, nb)] + 0.5 * rng.standard_normal((nb, dimension)).astype(np.float32)
+    return normaliser_lignes(vecteurs).astype(np.float32)
+
+
+def meilleurs(denses, requete, k, nprobe):
+    """Comme IndexIncremental._rechercher_vecteurs, pour une question."""
+    candidats = denses.candidats(requete, nprobe)
+    if candidats is None:
+        candidats = np.arange(len(denses))
+        scores = denses.scores(requete[None, :])[:, 0]
+    else:
+        scores = denses.scores(requete[None, :], candidats)[:, 0]
+    return meilleurs_scores(candidats, scores, k, -1.0)[0]
+
+
+def test_quantification_int8():
+    vecteurs = vecteurs_groupes(500)
+    codes, echelles = quantifier(vecteurs)
+    assert codes.dtype == np.int8 and echelles.dtype == np.float32
+    # chaque composante à une demi-échelle près
+    assert np.all(np.abs(codes * echelles[:, None] - vecteurs) <= echelles[:, None] / 2 + 1e-7)
+    denses = VecteursDenses(vecteurs.shape[1], "int8").ajouter(vecteurs)
+    assert np.allclose(denses.en_float32(), codes * echelles[:, None])
+    requetes = vecteurs_groupes(20, graine=1)
+    assert np.abs(denses.scores(requetes) - vecteurs @ requetes.T).max() < 0.02
+    assert np.allclose(denses.scores(requetes, [3, 1, 400]), denses.scores(requetes)[[3, 1, 400]], atol=1e-6)
+
+
+@pytest.mark.parametrize("quantification", ["float32", "int8"])
+def test_ajouts_par_segments(tmp_path, monkeypatch, quantification):
+    monkeypatch.setattr(config, "DENSE_IVF_MIN_VECTORS", 1000)
+    vecteurs = vecteurs_groupes(3000)
+    ensemble = VecteursDenses(vecteurs.shape[1], quantification).ajouter(vecteurs[:1200])
+    ensemble.preparer()
+    for nom, tableau in ensemble.tableaux().items():
+        np.save(os.path.join(tmp_path, f"{nom}.npy"), tableau)
+
+    def charger(nom):
+        chemin = os.path.join(tmp_path, f"{nom}.npy")
+        return np.load(chemin, mmap_mode="r") if os.path.exists(chemin) else None
+
+    description = {"dimension": ensemble.dimension, "quantification": quantification}
+    denses = VecteursDenses.depuis_tableaux(description, charger, ensemble.nb_entrainement)
+    base = denses.segments[0].vecteurs
+    for debut in range(1200, len(vecteurs), 100):
+        denses = denses.ajouter(vecteurs[debut:debut + 100])
+        denses.preparer()
+    # les vecteurs de l'instantané restent le tableau en mmap, rangés dans les listes IVF sans recopie
+    assert denses.segments[0].vecteurs is base and denses.ivf
+    assert len(denses.segments) <= 2 * np.log2(len(vecteurs))
+    unique = VecteursDenses(vecteurs.shape[1], quantification).ajouter(vecteurs)
+    assert np.array_equal(denses.en_float32(), unique.en_float32())
+    indices = np.random.default_rng(0).permutation(len(vecteurs))[:500]
+    assert np.array_equal(denses.en_float32(indices), unique.en_float32(indices))
+    requetes = vecteurs_groupes(5, graine=2)
+    assert np.allclose(denses.scores(requetes), unique.scores(requetes))
+    # toutes les listes sondées : mêmes candidats que la recherche exhaustive
+    for requete in requetes:
+        assert sorted(denses.candidats(requete, len(denses.centroides)).tolist()) == list(range(len(vecteurs)))
+    garder = np.arange(len(vecteurs)) % 4 != 0
+    assert np.array_equal(denses.filtrer(garder).en_float32(), unique.filtrer(garder).en_float32())
+
+
+def test_rappel_ivf(monkeypatch):
+    monkeypatch.setattr(config, "DENSE_IVF_MIN_VECTORS", 1000)
+    vecteurs = vecteurs_groupes(5000)
+    requetes = vecteurs_groupes(50, graine=3)
+    exhaustif = VecteursDenses(vecteurs.shape[1], "float32").ajouter(vecteurs)
+    denses = VecteursDenses(vecteurs.shape[1], "int8")
+    for debut in range(0, len(vecteurs), 500):
+        denses = denses.ajouter(vecteurs[debut:debut + 500])
+        denses.preparer()
+    assert denses.ivf and len(denses.segments) > 1
+    rappels = []
+    for requete in requetes:
+        attendus = set(meilleurs(exhaustif, requete, 10, None).tolist())
+        rappels.append(len(attendus & set(meilleurs(denses, requete, 10, 16).tolist())) / 10)
+    assert np.mean(rappels) >= 0.9
+
+
+@pytest.mark.parametrize("ivf", [False, True])
+def test_chunks_supprimes_ignores(monkeypatch, ivf):
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "dense")
+    monkeypatch.setattr(config, "DENSE_IVF_MIN_VECTORS", 50 if ivf else 10**9)
+    docs = documents(25)
+    retires = {docs[2][0], docs[11][0]}
+    qs = questions(30)
+    index = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs))
+    assert index.denses.ivf == ivf
+    index = publier(index, lambda copie: copie.retirer_documents(retires))
+    reference = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(
+        [doc for doc in docs if doc[0] not in retires]))
+    # toutes les listes sondées : même résultat qu'un index sans les documents retirés
+    nprobe = len(index.denses.centroides) if ivf else None
+    trouves = index.rechercher_dense(qs, 10, 0.0, nprobe)
+    attendus = reference.rechercher_dense(qs, 10, 0.0, nprobe)
+    for obtenu, attendu in zip(trouves, attendus):
+        assert all(index.chunks.document(i) not in retires for i, _ in obtenu)
+        assert [index.chunks[i] for i, _ in obtenu] == [reference.chunks[i] for i, _ in attendu]
+        assert np.allclose([score for _, score in obtenu], [score for _, score in attendu])
@@ -0,0 +1,58 @@
+"""Recherche approximative (recherche_floue.py) : même résultat que difflib.get_close_matches(..., n=1)."""
+
+import difflib
+import random
+
+import pytest
+
+import recherche_floue
+from recherche_floue import IndexFlou
+
+
+def attendu(requete, cles, cutoff):
+    correspondance = difflib.get_close_matches(requete, cles, n=1, cutoff=cutoff)
+    return correspondance[0] if correspondance else None
+
+
+def chaine(rng, alphabet, longueur_max):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, longueur_max)))
+
+
+@pytest.mark.parametrize("graine", range(4))
+def test_cles_et_questions_aleatoires(graine):
+    rng = random.Random(graine)
+    # petit alphabet et chaînes courtes : beaucoup de ratios égaux, de clés en double et de chaînes vides
+    alphabet = "abcd " if graine % 2 else "abcdefghij "
+    cles = [chaine(rng, alphabet, 8) for _ in range(300)]
+    index = IndexFlou(cles)
+    for _ in range(100):
+        requete = chaine(rng, alphabet, 10)
+        for cutoff in (0.0, 0.3, 0.6, 0.8, 1.0):
+            assert index.meilleure_correspondance(requete, cutoff) == attendu(requete, cles, cutoff)
+
+
+def test_egalites_departagees_comme_difflib():
+    # même ratio pour toutes les clés : difflib garde la plus grande clé
+    cles = ["ab", "ba", "ca", "ac"]
+    assert IndexFlou(cles).meilleure_correspondance("a", 0.5) == attendu("a", cles, 0.5) == "ca"
+
+
+def test_ratio_egal_au_seuil():
+    rng = random.Random(7)
+    cles = [chaine(rng, "abcdef", 12) for _ in range(100)]
+    index = IndexFlou(cles)
+    for _ in range(100):
+        requete = chaine(rng, "abcdef", 12)
+        # seuils égaux au ratio exact d'une clé, et juste au-dessus : la clé est gardée, puis écartée
+        cle = rng.choice(cles)
+        ratio = difflib.SequenceMatcher(None, requete, cle).ratio()
+        for cutoff in (ratio, min(ratio + 1e-9, 1.0)):
+            assert index.meilleure_correspondance(requete, cutoff) == attendu(requete, cles, cutoff)
+
+
+def test_sans_numpy(monkeypatch):
+    monkeypatch.setattr(recherche_floue, "np", None)
+    cles = ["garantie pme", "fonds de garantie", "credit bail"]
+    index = IndexFlou(cles)
+    assert index.meilleure_correspondance("garanti pme", 0.6) == attendu("garanti pme", cles, 0.6)
+    assert IndexFlou([]).meilleure_correspondance("garantie", 0.6) is None
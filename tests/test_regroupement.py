@@ -0,0 +1,72 @@
+"""Regroupement des requêtes en lots (regroupement.py) : taille maximale, attente, erreurs."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from regroupement import Regroupeur
+
+
+class Traitement:
+    """traiter_lot de test : note chaque lot et retourne le double de chaque entrée."""
+
+    def __init__(self, duree=0.0, erreur=None):
+        self.lots = []
+        self.duree = duree
+        self.erreur = erreur
+        self._verrou = threading.Lock()
+
+    def __call__(self, entrees):
+        with self._verrou:
+            self.lots.append(list(entrees))
+        time.sleep(self.duree)
+        if self.erreur is not None:
+            raise self.erreur
+        return [2 * entree for entree in entrees]
+
+
+def test_lots_limites_a_la_taille_maximale():
+    traitement = Traitement()
+    regroupeur = Regroupeur(traitement, taille_max=3, attente_max=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(regroupeur.soumettre(i) for i in range(7)))
+
+    assert asyncio.run(scenario()) == [2 * i for i in range(7)]
+    # deux lots pleins partent dès leur 3e entrée, la dernière après l'attente
+    assert traitement.lots == [[0, 1, 2], [3, 4, 5], [6]]
+    assert regroupeur.statistiques() == {"lots": 3, "requetes": 7, "taille_moyenne": 2.33}
+
+
+def test_lot_envoye_apres_l_attente_maximale():
+    traitement = Traitement(duree=0.3)
+    regroupeur = Regroupeur(traitement, taille_max=10, attente_max=0.05)
+
+    async def scenario():
+        # aucun lot en cours : la première requête part sans attendre
+        premiere = asyncio.ensure_future(regroupeur.soumettre(0))
+        await asyncio.sleep(0.01)
+        # un lot en cours : les suivantes attendent attente_max, puis partent ensemble sans attendre sa fin
+        debut = time.perf_counter()
+        suivantes = await asyncio.gather(regroupeur.soumettre(1), regroupeur.soumettre(2))
+        attente = time.perf_counter() - debut
+        return await premiere, suivantes, attente
+
+    premiere, suivantes, attente = asyncio.run(scenario())
+    assert (premiere, suivantes) == (0, [2, 4])
+    assert traitement.lots == [[0], [1, 2]]
+    assert 0.3 <= attente < 0.6
+
+
+def test_erreur_transmise_a_chaque_requete_du_lot():
+    regroupeur = Regroupeur(Traitement(erreur=ValueError("lot impossible")), taille_max=4, attente_max=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(regroupeur.soumettre(i) for i in range(4)), return_exceptions=True)
+
+    resultats = asyncio.run(scenario())
+    assert len(resultats) == 4 and all(isinstance(r, ValueError) for r in resultats)
+    with pytest.raises(ValueError, match="lot impossible"):
+        asyncio.run(regroupeur.soumettre(5))
@@ -0,0 +1,60 @@
+"""Index réparti (repartition.py) : mêmes scores qu'un index unique, statistiques échangées en creux."""
+
+import numpy as np
+import pytest
+
+from corpus_synthetique import questions
+
+import config
+from indexation import IndexIncremental
+from repartition import IndexReparti
+from test_indexation import documents, publier
+
+
+def scores(index, qs, mode):
+    return [[score for _, score, *_ in trouves] for trouves in index.passages(qs, 5, 0.0, mode)]
+
+
+def memes_scores(reference, index, qs, mode):
+    return all(len(a) == len(b) and np.allclose(a, b) for a, b in zip(scores(reference, qs, mode), scores(index, qs, mode)))
+
+
+@pytest.mark.parametrize("mode", ["tfidf", "bm25"])
+def test_ajouts_avec_et_sans_recalcul_des_poids(configuration, monkeypatch, mode):
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", mode)
+    monkeypatch.setattr(config, "INDEX_SHARDS", 2)
+    monkeypatch.setattr(config, "IDF_REFRESH_DRIFT", 10.0)
+    docs = documents(24)
+    qs = questions(30)
+    reference = publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs[:8]))
+    index = publier(IndexReparti.ouvrir(), lambda copie: copie.ajouter_documents(docs[:8]))
+    try:
+        calcul = index._publie["calcul"]
+        assert calcul[0] == len(reference)
+        assert memes_scores(reference, index, qs, mode)
+
+        # sous le seuil de dérive : les partitions pondèrent les nouveaux chunks avec les poids courants
+        for doc in docs[8:16]:
+            reference = publier(reference, lambda copie: copie.ajouter_documents([doc]))
+            index = publier(index, lambda copie: copie.ajouter_documents([doc]))
+        assert index._publie["calcul"] == calcul
+        assert memes_scores(reference, index, qs, mode)
+
+        # au-delà : statistiques globales renvoyées, poids recalculés partout
+        monkeypatch.setattr(config, "IDF_REFRESH_DRIFT", 0.0)
+        reference = publier(reference, lambda copie: copie.ajouter_documents(docs[16:]))
+        index = publier(index, lambda copie: copie.ajouter_documents(docs[16:]))
+        assert index._publie["calcul"][0] == len(reference) == len(index)
+        assert np.array_equal(index._publie["df"], reference.statistiques_locales()[0])
+        assert memes_scores(reference, index, qs, mode)
+        assert memes_scores(publier(IndexIncremental(), lambda copie: copie.ajouter_documents(docs)), index, qs, mode)
+    finally:
+        index.fermer()
+
+
+def test_lecteur_sans_adresses_des_partitions(configuration, monkeypatch):
+    # des partitions démarrées par chaque worker ne recevraient jamais les documents du constructeur
+    monkeypatch.setattr(config, "INDEX_ROLE", "lecteur")
+    monkeypatch.setattr(config, "INDEX_SHARDS", 2)
+    with pytest.raises(RuntimeError, match="SHARD_ADDRESSES"):
+        IndexReparti.ouvrir(lecture_seule=True)
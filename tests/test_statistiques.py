@@ -0,0 +1,64 @@
+"""Tests des compteurs de statistiques (statistiques.py) partagés entre plusieurs workers."""
+
+import json
+
+from statistiques import CompteurStatistiques
+
+
+def test_workers_sur_le_meme_fichier(tmp_path):
+    chemin = str(tmp_path / "stats.json")
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"ancienne": 4}, f)
+    # deux workers démarrés ensemble : chacun a lu le même fichier
+    premier = CompteurStatistiques(chemin, intervalle_flush=60.0)
+    second = CompteurStatistiques(chemin, intervalle_flush=60.0)
+    premier.incrementer_lot(["bonjour", "bonjour", "ancienne"])
+    second.incrementer_lot(["bonjour", "horaires"])
+    premier.vider()
+    second.vider()
+    premier.incrementer("horaires")
+    premier.fermer()
+    second.fermer()
+
+    with open(chemin, encoding="utf-8") as f:
+        assert json.load(f) == {"ancienne": 5, "bonjour": 3, "horaires": 2}
+    # chaque worker voit aussi les totaux des autres après son écriture
+    assert dict(premier.totaux) == {"ancienne": 5, "bonjour": 3, "horaires": 2}
+    assert premier.top(2) == [("ancienne", 5), ("bonjour", 3)]
+
+
+def test_erreur_de_lecture_sans_perte(tmp_path, monkeypatch):
+    import statistiques
+
+    chemin = str(tmp_path / "stats.json")
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"ancienne": 4}, f)
+    compteur = CompteurStatistiques(chemin, intervalle_flush=60.0)
+    compteur.incrementer_lot(["bonjour", "ancienne"])
+
+    def echec(f):
+        raise OSError("lecture impossible")
+
+    # lecture en échec : le fichier n'est pas remplacé par les seuls incréments, gardés pour la suite
+    monkeypatch.setattr(statistiques.json, "load", echec)
+    compteur.vider()
+    monkeypatch.undo()
+    with open(chemin, encoding="utf-8") as f:
+        assert json.load(f) == {"ancienne": 4}
+    compteur.incrementer("bonjour")
+    compteur.fermer()
+    with open(chemin, encoding="utf-8") as f:
+        assert json.load(f) == {"ancienne": 5, "bonjour": 2}
+
+
+def test_fichier_corrompu_mis_de_cote(tmp_path):
+    chemin = str(tmp_path / "stats.json")
+    with open(chemin, "w", encoding="utf-8") as f:
+        f.write('{"ancienne": 4, "bonj')
+    compteur = CompteurStatistiques(chemin, intervalle_flush=60.0)
+    compteur.incrementer("bonjour")
+    compteur.fermer()
+    with open(f"{chemin}.corrompu", encoding="utf-8") as f:
+        assert f.read() == '{"ancienne": 4, "bonj'
+    with open(chemin, encoding="utf-8") as f:
+        assert json.load(f) == {"bonjour": 1}